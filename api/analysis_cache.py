@@ -0,0 +1,244 @@
+"""
+Analysis Result Cache
+Content-addressed cache for GuinnessVisionProcessor results.
+
+Results are keyed by a SHA-256 of the raw image bytes plus the scoring
+version, so the same photo scored twice never hits Roboflow again until
+the scoring logic changes or the entry expires.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def image_hash(image_bytes) -> str:
+    """
+    Hash raw image bytes for use as a cache key.
+
+    Args:
+        image_bytes: bytes, bytearray or memoryview of the encoded image
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU backend with TTL expiry."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk backend shared between worker processes.
+
+    Each call opens its own connection, so the backend is safe to use from
+    multiple threads and from multiple gunicorn workers pointing at the
+    same file.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT NOT NULL,'
+                ' stored_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_analysis_cache_accessed_at '
+                'ON analysis_cache (accessed_at)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value, stored_at FROM analysis_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, stored_at = row
+            if now - stored_at > self.ttl_seconds:
+                conn.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                self.evictions += 1
+                return None
+
+            conn.execute('UPDATE analysis_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            return json.loads(value)
+
+    def set(self, key: str, value: Dict):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO analysis_cache (key, value, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, default=str), now, now)
+            )
+
+            expired = conn.execute(
+                'DELETE FROM analysis_cache WHERE stored_at < ?', (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = conn.execute(
+                'DELETE FROM analysis_cache WHERE key IN ('
+                ' SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += expired + overflow
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM analysis_cache')
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+
+
+class AnalysisCache:
+    """Hit/miss accounting in front of a pluggable cache backend."""
+
+    def __init__(self, backend, scoring_version: str):
+        self.backend = backend
+        self.scoring_version = scoring_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, digest: str) -> str:
+        """Combine an image digest with the scoring version."""
+        return f'{self.scoring_version}:{digest}'
+
+    def get(self, digest: str) -> Optional[Dict]:
+        try:
+            value = self.backend.get(self.make_key(digest))
+        except Exception as e:
+            logger.warning(f"Analysis cache read failed: {e}")
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        # Callers adjust top-level fields (e.g. score validation) in place
+        return dict(value)
+
+    def set(self, digest: str, result: Dict):
+        try:
+            self.backend.set(self.make_key(digest), dict(result))
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        """
+        Snapshot of cache counters.
+
+        Returns:
+            Dictionary with backend name, hits, misses, hit rate, size and evictions
+        """
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'scoring_version': self.scoring_version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self.backend),
+            'evictions': self.backend.evictions,
+        }
+
+
+def create_analysis_cache(config, scoring_version: str) -> Optional[AnalysisCache]:
+    """
+    Build the analysis cache described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+        scoring_version: Tag mixed into every key
+
+    Returns:
+        AnalysisCache, or None when caching is disabled
+    """
+    backend_name = config.ANALYSIS_CACHE_BACKEND
+
+    if backend_name == 'memory':
+        backend = MemoryCacheBackend(
+            max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.ANALYSIS_CACHE_TTL_SECONDS
+        )
+    elif backend_name == 'sqlite':
+        backend = SQLiteCacheBackend(
+            config.ANALYSIS_CACHE_PATH,
+            max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.ANALYSIS_CACHE_TTL_SECONDS
+        )
+    elif backend_name in ('none', 'off', ''):
+        return None
+    else:
+        raise ValueError(f"Unknown ANALYSIS_CACHE_BACKEND: {backend_name}")
+
+    return AnalysisCache(backend, scoring_version)
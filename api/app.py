@@ -3,19 +3,40 @@ Guinness Split the G API
 Flask API for scoring Guinness pints based on the "Split the G" technique.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
-from werkzeug.utils import secure_filename
-import os
+from werkzeug.exceptions import RequestEntityTooLarge
+import io
+import json
+import time
 import traceback
-from pathlib import Path
 
 from vision_processor import GuinnessVisionProcessor
-from models import db, Pub, Score, PubRating, TwitterSubmission
+from job_queue import QueueFullError, create_job_queue
+from load_governor import SHED_DEBUG_INFO
+from models import db, Pub, Score, PubRating, PubStats, TwitterSubmission
+from geo import parse_bbox
+from pub_queries import parse_fields, pub_page, pub_summaries, pubs_near
+from pub_stats import record_rating, record_score
 from config import Config
+from metrics import (
+    HTTP_REQUESTS, HTTP_REQUEST_SECONDS, REGISTRY,
+    instrument_sqlalchemy, stats_collector
+)
+
+
+class InMemoryUploadRequest(Request):
+    """Request that keeps multipart file uploads in memory instead of spooling to disk."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        # MAX_CONTENT_LENGTH bounds the whole body, so this stays capped
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 
 # Load configuration
 app.config.from_object(Config)
@@ -26,6 +47,7 @@ migrate = Migrate(app, db)
 
 # Create tables (for first-time setup)
 with app.app_context():
+    instrument_sqlalchemy(db.engine)
     db.create_all()
 
 # Configure CORS - Allow all origins for now (restrict in production)
@@ -36,16 +58,11 @@ CORS(app,
      max_age=3600)
 
 # Configuration
-UPLOAD_FOLDER = Path('uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
-# Ensure upload folder exists
-UPLOAD_FOLDER.mkdir(exist_ok=True)
-
 # Initialize the vision processor
 vision_processor = GuinnessVisionProcessor()
 
@@ -56,6 +73,151 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def read_upload(file):
+    """
+    Read an uploaded file into memory without touching the filesystem.
+
+    Args:
+        file: werkzeug FileStorage from request.files
+
+    Returns:
+        File contents as bytes
+
+    Raises:
+        RequestEntityTooLarge: If the file exceeds MAX_FILE_SIZE
+    """
+    stream = file.stream
+    if isinstance(stream, io.BytesIO):
+        data = stream.getvalue()
+    else:
+        data = stream.read(MAX_FILE_SIZE + 1)
+
+    if len(data) > MAX_FILE_SIZE:
+        raise RequestEntityTooLarge()
+
+    return data
+
+
+def parse_g_logo_box(raw):
+    """
+    Parse the optional 'g_logo_box' form field.
+
+    Args:
+        raw: JSON object with centre 'x', 'y' and 'width', 'height' of the
+            G-logo in image pixels (as found by the client's detector), or None
+
+    Returns:
+        Dictionary of floats, or None if the field was not sent
+
+    Raises:
+        ValueError: If the field is not a valid box
+    """
+    if not raw:
+        return None
+
+    try:
+        box = json.loads(raw)
+        box = {key: float(box[key]) for key in ('x', 'y', 'width', 'height')}
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('g_logo_box must be a JSON object with numeric x, y, width and height')
+
+    if box['width'] <= 0 or box['height'] <= 0:
+        raise ValueError('g_logo_box width and height must be positive')
+
+    return box
+
+
+def parse_timeout(raw):
+    """
+    Parse the optional 'timeout' query parameter.
+
+    Args:
+        raw: Seconds the client is willing to wait, or None
+
+    Returns:
+        Seconds (capped at ANALYSIS_DEADLINE_SECONDS), or None to use
+        ANALYSIS_DEADLINE_SECONDS
+
+    Raises:
+        ValueError: If the value is not a positive number
+    """
+    if not raw:
+        return None
+
+    try:
+        seconds = float(raw)
+    except ValueError:
+        raise ValueError('timeout must be a number of seconds')
+    if not seconds > 0:
+        raise ValueError('timeout must be positive')
+
+    # Clients can ask for less time than the server allows, not more
+    if Config.ANALYSIS_DEADLINE_SECONDS:
+        seconds = min(seconds, Config.ANALYSIS_DEADLINE_SECONDS)
+    return seconds
+
+
+def deadline_after(timeout):
+    """time.monotonic() deadline timeout seconds from now, or None for the default."""
+    return time.monotonic() + timeout if timeout is not None else None
+
+
+def parse_page_limit(raw):
+    """
+    Turn the optional 'limit' query parameter into a page size.
+
+    Args:
+        raw: Pubs per page, or None for PUBS_PAGE_SIZE
+
+    Returns:
+        Page size, capped at PUBS_PAGE_MAX
+
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if not raw:
+        return Config.PUBS_PAGE_SIZE
+
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, Config.PUBS_PAGE_MAX)
+
+
+def parse_near_point(raw_lat, raw_lng, raw_radius):
+    """
+    Turn the lat, lng and radius query parameters into a search circle.
+
+    Args:
+        raw_lat: Latitude in degrees
+        raw_lng: Longitude in degrees
+        raw_radius: Radius in metres, or None for PUBS_NEAR_RADIUS_M
+
+    Returns:
+        Tuple of (lat, lng, radius_m), the radius capped at PUBS_NEAR_MAX_RADIUS_M
+
+    Raises:
+        ValueError: If a value is missing, not a number or out of range
+    """
+    if not raw_lat or not raw_lng:
+        raise ValueError('lat and lng are required')
+
+    try:
+        lat, lng = float(raw_lat), float(raw_lng)
+        radius_m = float(raw_radius) if raw_radius else Config.PUBS_NEAR_RADIUS_M
+    except ValueError:
+        raise ValueError('lat, lng and radius must be numbers')
+    if not -90.0 <= lat <= 90.0 or not -180.0 <= lng <= 180.0:
+        raise ValueError('lat must be within -90..90 and lng within -180..180')
+    if not radius_m > 0:
+        raise ValueError('radius must be positive')
+
+    return lat, lng, min(radius_m, Config.PUBS_NEAR_MAX_RADIUS_M)
+
+
 def validate_score(score, distance_mm, g_detected, confidence):
     """
     Catch only extreme outliers - main scoring handles the rest.
@@ -84,16 +246,160 @@ def validate_score(score, distance_mm, g_detected, confidence):
     return round(score, 1)
 
 
+def finalize_result(result):
+    """
+    Apply score validation to a successful analysis result in place.
+
+    Args:
+        result: Dictionary returned by the vision processor
+
+    Returns:
+        The same dictionary
+    """
+    if 'score' in result:
+        result['score'] = validate_score(
+            score=result['score'],
+            distance_mm=result.get('distance_from_g_line_mm', 999),
+            g_detected=result.get('g_line_detected', False),
+            confidence=result.get('confidence', 0.5)
+        )
+    return result
+
+
+# Fields returned by /analyze-split in compact mode (the default)
+COMPACT_RESULT_FIELDS = (
+    'score',
+    'distance_from_g_line_mm',
+    'g_line_detected',
+    'confidence',
+    'feedback',
+    'model2_available',
+    'beer_line_in_zone',
+    'local_detector_used',
+)
+
+
+def shape_result(result):
+    """
+    Select the response fields requested by the client.
+
+    '?debug=1' returns the full result (including debug_info), '?fields=a,b'
+    returns just the named fields, and otherwise compact mode returns
+    COMPACT_RESULT_FIELDS. Error results are returned unchanged. While the
+    load governor sheds debug_info it is left out of every response.
+
+    Args:
+        result: Finalized analysis result
+
+    Returns:
+        Dictionary to serialize
+    """
+    if result is None or 'error' in result:
+        return result
+
+    governor = vision_processor.governor
+    if 'debug_info' in result and governor is not None and governor.sheds(SHED_DEBUG_INFO):
+        result = {name: value for name, value in result.items() if name != 'debug_info'}
+
+    if request.args.get('debug') == '1':
+        return result
+
+    fields = request.args.get('fields')
+    if fields:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+    elif Config.COMPACT_RESPONSES:
+        names = COMPACT_RESULT_FIELDS
+    else:
+        return result
+
+    return {name: result[name] for name in names if name in result}
+
+
+def run_analysis_job(image_bytes, image_name, g_logo_box=None, fast=False, timeout=None):
+    """
+    Analyze one queued image and validate its score (job queue handler).
+
+    The keyword arguments are the /analyze-split options; timeout counts
+    from when the job starts, not from when it was queued.
+    """
+    result = vision_processor.analyze_guinness_split(
+        image_bytes, image_name=image_name, g_logo_box=g_logo_box, fast=fast,
+        deadline=deadline_after(timeout)
+    )
+    return result if 'error' in result else finalize_result(result)
+
+
+# Local worker pool for /analyze-split?async=1
+job_queue = create_job_queue(Config, run_analysis_job)
+
+if vision_processor.governor is not None:
+    vision_processor.governor.queue_depth = job_queue.store.depth
+
+# Component stats exported as gauges on /metrics
+REGISTRY.add_collector(stats_collector(
+    'gsplit_analysis_cache', lambda: vision_processor.cache_stats(), 'Analysis cache'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_single_flight', lambda: vision_processor.single_flight_stats(), 'In-flight analysis coalescing'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_image_decode', lambda: vision_processor.image_loader.stats(), 'Image decode memory budget'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_cpu_pool', lambda: vision_processor.cpu_pool_stats(), 'CPU process pool'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_roboflow', lambda: vision_processor.roboflow.stats(), 'Roboflow client'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_load', lambda: vision_processor.governor_stats(), 'Load shedding level and signals'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_job_queue', lambda: job_queue.stats(), 'Async job queue'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_debug_writer', lambda: vision_processor.debug_writer.stats(), 'Debug artifact writer'))
+REGISTRY.add_collector(stats_collector(
+    'gsplit_roast_pool',
+    lambda: vision_processor.roast_pool.stats() if vision_processor.roast_pool else {},
+    'AI roast pool'))
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started for latency metrics."""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request, record its latency by route and report the shed level."""
+    if vision_processor.governor is not None:
+        response.headers['X-Shed-Level'] = str(vision_processor.governor.current_level())
+
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+
+    return response
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
         'service': 'guinness-split-scorer',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'analysis_cache': vision_processor.cache_stats(),
+        'roboflow': vision_processor.roboflow.stats(),
+        'job_queue': job_queue.stats(),
+        'load': vision_processor.governor_stats()
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: per-stage analysis timings, request counters, DB query timings."""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/analyze-split', methods=['POST'])
 def analyze_split():
     """
@@ -101,9 +407,24 @@ def analyze_split():
 
     Expects:
         - 'image' file in multipart/form-data
+        - Optional 'debug=1' (full result) or 'fields=a,b' query parameter;
+          by default only COMPACT_RESULT_FIELDS are returned
+        - Optional 'g_logo_box' form field (JSON x, y, width, height) from the
+          client's G detector; used by the local beer line detector if
+          Roboflow is unavailable
+        - Optional 'mode=fast' query parameter to score 'g_logo_box' locally
+          without calling Roboflow
+        - Optional 'timeout' query parameter: seconds to wait for Roboflow
+          (capped at ANALYSIS_DEADLINE_SECONDS) before scoring 'g_logo_box'
+          locally or failing with 504
+        - Optional 'async=1' query parameter to queue the analysis;
+          'g_logo_box', 'mode=fast' and 'timeout' are passed through to the
+          job, with 'timeout' counted from when a worker starts it
 
     Returns:
-        JSON with score, distance from G-line, and detailed analysis
+        JSON with score, distance from G-line, and detailed analysis, or
+        with '?async=1' a 202 with the job id to poll at
+        /analyze-split/jobs/<job_id>
     """
     try:
         # Validate request has file
@@ -129,39 +450,57 @@ def analyze_split():
                 'message': f'Allowed file types: {", ".join(ALLOWED_EXTENSIONS)}'
             }), 400
 
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = UPLOAD_FOLDER / filename
-        file.save(str(filepath))
+        # Process the image straight from memory
+        image_bytes = read_upload(file)
 
         try:
-            # Process the image
-            result = vision_processor.analyze_guinness_split(str(filepath))
-
-            # Clean up uploaded file
-            if filepath.exists():
-                filepath.unlink()
-
-            # Check if analysis was successful
-            if 'error' in result:
-                return jsonify(result), 400
-
-            # Validate score to catch extreme outliers
-            if 'score' in result:
-                result['score'] = validate_score(
-                    score=result['score'],
-                    distance_mm=result.get('distance_from_g_line_mm', 999),
-                    g_detected=result.get('g_line_detected', False),
-                    confidence=result.get('confidence', 0.5)
-                )
-
-            return jsonify(result), 200
-
-        except Exception as e:
-            # Clean up on error
-            if filepath.exists():
-                filepath.unlink()
-            raise e
+            g_logo_box = parse_g_logo_box(request.form.get('g_logo_box'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid g_logo_box', 'message': str(e)}), 400
+
+        try:
+            timeout = parse_timeout(request.args.get('timeout'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid timeout', 'message': str(e)}), 400
+
+        fast = request.args.get('mode') == 'fast'
+        if fast and g_logo_box is None:
+            return jsonify({
+                'error': 'Missing g_logo_box',
+                'message': 'mode=fast scores locally and needs the G-logo box from the client'
+            }), 400
+
+        if request.args.get('async') == '1':
+            try:
+                job_id = job_queue.submit(image_bytes, image_name=file.filename, options={
+                    'g_logo_box': g_logo_box, 'fast': fast, 'timeout': timeout
+                })
+            except QueueFullError:
+                return jsonify({
+                    'error': 'Queue full',
+                    'message': 'Too many pending analyses, please retry shortly'
+                }), 503, {'Retry-After': '5'}
+
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/analyze-split/jobs/{job_id}'
+            }), 202
+
+        result = vision_processor.analyze_guinness_split(
+            image_bytes, image_name=file.filename, g_logo_box=g_logo_box, fast=fast,
+            deadline=deadline_after(timeout)
+        )
+
+        # Check if analysis was successful
+        if 'error' in result:
+            return jsonify(result), 504 if result['error'] == 'Analysis timed out' else 400
+
+        # Validate score to catch extreme outliers
+        return jsonify(shape_result(finalize_result(result))), 200
+
+    except RequestEntityTooLarge:
+        raise
 
     except Exception as e:
         error_trace = traceback.format_exc()
@@ -174,6 +513,104 @@ def analyze_split():
         }), 500
 
 
+@app.route('/analyze-split/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """
+    Get the status of a queued analysis.
+
+    Returns:
+        JSON with 'status' (queued, running, done or failed), timestamps,
+        queue wait time and, once finished, the analysis 'result'
+    """
+    job = job_queue.get(job_id)
+
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job['result'] = shape_result(job['result'])
+    return jsonify(job), 200
+
+
+@app.route('/analyze-split/batch', methods=['POST'])
+def analyze_split_batch():
+    """
+    Analyze several Guinness pint images in one request.
+
+    Workflow calls run concurrently on the processor's batch thread pool.
+
+    Expects:
+        - One or more 'images' files in multipart/form-data
+
+    Returns:
+        JSON with one entry per image, in upload order. Entries that could
+        not be analyzed carry 'error' and 'message' instead of a score.
+    """
+    try:
+        # Batches legitimately exceed the single-image body limit
+        request.max_content_length = Config.BATCH_MAX_CONTENT_LENGTH
+
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({
+                'error': 'No image files provided',
+                'message': 'Please upload one or more image files with key "images"'
+            }), 400
+
+        if len(files) > Config.BATCH_MAX_IMAGES:
+            return jsonify({
+                'error': 'Too many images',
+                'message': f'Maximum {Config.BATCH_MAX_IMAGES} images per batch'
+            }), 400
+
+        results = [None] * len(files)
+        pending = []
+
+        for index, file in enumerate(files):
+            if not file.filename or not allowed_file(file.filename):
+                results[index] = {
+                    'error': 'Invalid file type',
+                    'message': f'Allowed file types: {", ".join(ALLOWED_EXTENSIONS)}'
+                }
+                continue
+
+            try:
+                pending.append((index, file.filename, read_upload(file)))
+            except RequestEntityTooLarge:
+                results[index] = {
+                    'error': 'File too large',
+                    'message': f'Maximum file size is {MAX_FILE_SIZE // (1024 * 1024)}MB'
+                }
+
+        analyzed = vision_processor.analyze_many(
+            [image_bytes for _, _, image_bytes in pending],
+            [filename for _, filename, _ in pending]
+        )
+        for (index, _, _), result in zip(pending, analyzed):
+            results[index] = result if 'error' in result else finalize_result(result)
+
+        return jsonify({
+            'results': [
+                dict(shape_result(result), index=index, filename=file.filename)
+                for index, (file, result) in enumerate(zip(files, results))
+            ],
+            'count': len(results),
+            'errors': sum(1 for result in results if 'error' in result)
+        }), 200
+
+    except RequestEntityTooLarge:
+        raise
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        app.logger.error(f"Error processing batch: {error_trace}")
+
+        return jsonify({
+            'error': 'Processing error',
+            'message': str(e),
+            'details': error_trace if app.debug else None
+        }), 500
+
+
 @app.route('/generate-pub-roast', methods=['POST'])
 def generate_pub_roast():
     """
@@ -218,106 +655,110 @@ def generate_pub_roast():
 
 @app.route('/api/pubs', methods=['GET'])
 def get_pubs():
-    """Get all pubs with aggregated data."""
+    """
+    Get pubs with aggregated data (constant number of queries, see pub_queries.py).
+
+    Without parameters, returns every pub as a list. With limit, cursor,
+    fields or bbox (west,south,east,north), returns one keyset page:
+    {'pubs': [...], 'nextCursor': ...}.
+    """
     try:
-        pubs = Pub.query.all()
-        result = []
-
-        for pub in pubs:
-            # Get top split
-            top_score = Score.query.filter_by(pub_id=pub.id)\
-                .order_by(Score.score.desc()).first()
-
-            # Get average rating
-            ratings = PubRating.query.filter_by(pub_id=pub.id).all()
-            avg_rating = None
-            if ratings:
-                avg_rating = sum(float(r.overall_rating) for r in ratings) / len(ratings)
-                avg_rating = round(avg_rating, 1)
-
-            # Get pints logged count
-            pints_logged = Score.query.filter_by(pub_id=pub.id).count()
-
-            # Get leaderboard (top 5)
-            top_scores = Score.query.filter_by(pub_id=pub.id)\
-                .order_by(Score.score.desc()).limit(5).all()
-            leaderboard = [
-                {
-                    'rank': idx + 1,
-                    'username': score.username or 'Anonymous',
-                    'score': float(score.score)
-                }
-                for idx, score in enumerate(top_scores)
-            ]
-
-            pub_data = pub.to_dict()
-            pub_data.update({
-                'topSplit': {
-                    'score': float(top_score.score),
-                    'username': top_score.username or 'Anonymous'
-                } if top_score else None,
-                'qualityRating': avg_rating,
-                'pintsLogged': pints_logged,
-                'leaderboard': leaderboard
-            })
-
-            result.append(pub_data)
-
-        return jsonify(result), 200
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid fields', 'message': str(e)}), 400
+
+        if fields is None and not any(name in request.args for name in ('limit', 'cursor', 'bbox')):
+            return jsonify(pub_summaries()), 200
+
+        bbox = None
+        if request.args.get('bbox'):
+            try:
+                bbox = parse_bbox(request.args['bbox'])
+            except ValueError as e:
+                return jsonify({'error': 'Invalid bbox', 'message': str(e)}), 400
+
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid limit', 'message': str(e)}), 400
+
+        try:
+            pubs, next_cursor = pub_page(limit, request.args.get('cursor'), fields, bbox=bbox)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid cursor', 'message': str(e)}), 400
+
+        return jsonify({'pubs': pubs, 'nextCursor': next_cursor}), 200
     except Exception as e:
         app.logger.error(f"Error fetching pubs: {str(e)}")
         return jsonify({'error': 'Failed to fetch pubs'}), 500
 
 
+@app.route('/api/pubs/near', methods=['GET'])
+def get_pubs_near():
+    """
+    Get the pubs within a radius of a point, nearest first.
+
+    Query parameters: lat, lng, radius (metres), limit and fields.
+    """
+    try:
+        try:
+            lat, lng, radius_m = parse_near_point(
+                request.args.get('lat'), request.args.get('lng'), request.args.get('radius'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid location', 'message': str(e)}), 400
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid fields', 'message': str(e)}), 400
+
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': 'Invalid limit', 'message': str(e)}), 400
+
+        return jsonify({'pubs': pubs_near(lat, lng, radius_m, limit, fields)}), 200
+    except Exception as e:
+        app.logger.error(f"Error fetching nearby pubs: {str(e)}")
+        return jsonify({'error': 'Failed to fetch pubs'}), 500
+
+
 @app.route('/api/pubs/<place_id>', methods=['GET'])
 def get_pub(place_id):
     """Get single pub with full details."""
     try:
-        pub = Pub.query.filter_by(place_id=place_id).first()
+        # The pub and its running aggregates (ratings, pint count) in one query
+        row = db.session.query(Pub, PubStats)\
+            .outerjoin(PubStats, PubStats.pub_id == Pub.id)\
+            .filter(Pub.place_id == place_id).first()
 
-        if not pub:
+        if not row:
             return jsonify({'error': 'Pub not found'}), 404
+        pub, pub_stats = row
 
-        # Get leaderboard
-        top_scores = Score.query.filter_by(pub_id=pub.id)\
-            .order_by(Score.score.desc()).limit(10).all()
+        # Get leaderboard (only the columns shown; split_image can be large).
+        # Ties go to the earlier pint, as in pub_stats and the map leaderboards
+        top_scores = db.session.query(Score.username, Score.score)\
+            .filter(Score.pub_id == pub.id)\
+            .order_by(Score.score.desc(), Score.created_at, Score.id).limit(10).all()
         leaderboard = [
             {
                 'rank': idx + 1,
-                'username': score.username or 'Anonymous',
-                'score': float(score.score)
+                'username': username or 'Anonymous',
+                'score': float(score)
             }
-            for idx, score in enumerate(top_scores)
+            for idx, (username, score) in enumerate(top_scores)
         ]
 
-        # Get ratings
-        ratings = PubRating.query.filter_by(pub_id=pub.id).all()
-        avg_rating = None
-        stats = None
-        if ratings:
-            avg_rating = sum(float(r.overall_rating) for r in ratings) / len(ratings)
-
-            # Calculate stats
-            stats = {
-                'taste': {
-                    'average': round(sum(float(r.taste) for r in ratings) / len(ratings), 1),
-                    'percentGood': round(len([r for r in ratings if float(r.taste) >= 4.0]) / len(ratings) * 100)
-                },
-                'temperature': {
-                    'average': round(sum(float(r.temperature) for r in ratings) / len(ratings), 1),
-                    'percentGood': round(len([r for r in ratings if float(r.temperature) >= 4.0]) / len(ratings) * 100)
-                },
-                'head': {
-                    'average': round(sum(float(r.head) for r in ratings) / len(ratings), 1),
-                    'percentGood': round(len([r for r in ratings if float(r.head) >= 4.0]) / len(ratings) * 100)
-                }
-            }
+        avg_rating = pub_stats.quality_rating() if pub_stats else None
+        stats = pub_stats.rating_stats() if pub_stats else None
 
         pub_data = pub.to_dict()
         pub_data.update({
             'leaderboard': leaderboard,
             'qualityRating': round(avg_rating, 1) if avg_rating else None,
-            'pintsLogged': len(leaderboard),
+            'pintsLogged': pub_stats.score_count if pub_stats else 0,
             'stats': stats
         })
 
@@ -400,6 +841,7 @@ def submit_score(place_id):
         )
 
         db.session.add(score)
+        record_score(score)
         db.session.commit()
 
         return jsonify(score.to_dict()), 201
@@ -447,6 +889,7 @@ def submit_rating(place_id):
         )
 
         db.session.add(rating)
+        record_rating(rating)
         db.session.commit()
 
         return jsonify(rating.to_dict()), 201
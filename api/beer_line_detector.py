@@ -0,0 +1,99 @@
+"""
+Local Beer Line Detector
+Classical OpenCV fallback for finding the stout/foam boundary in a G-logo crop
+without calling Roboflow.
+
+The crop is reduced to a vertical brightness profile (median of the central
+columns, so the glass edges and the G's strokes carry little weight). The
+beer line is the row with the largest step from light (foam / empty glass)
+above to dark (stout) below, measured with a box filter over a window of
+rows. Runs in well under a millisecond on a typical crop.
+
+Benchmark against archived Model 2 results with bench_beer_line_detector.py.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def detect_beer_line(crop: np.ndarray, column_band: Tuple[float, float] = (0.25, 0.75),
+                     max_height: int = 256, min_contrast: float = 0.08) -> Optional[Dict]:
+    """
+    Find the beer line in a G-logo crop.
+
+    Args:
+        crop: BGR or grayscale crop centred on the G-logo
+        column_band: Fraction of the width (start, end) used for the profile
+        max_height: Crops taller than this are downscaled first
+        min_contrast: Smallest light-to-dark step (0-1 of full brightness)
+            accepted as a beer line
+
+    Returns:
+        Dictionary with 'beer_line_y' (0-1, from the top of the crop) and
+        'contrast', or None if no clear boundary was found
+    """
+    if crop is None or crop.size == 0 or crop.shape[0] < 8 or crop.shape[1] < 2:
+        return None
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    height, width = gray.shape
+    if height > max_height:
+        width = max(2, round(width * max_height / height))
+        gray = cv2.resize(gray, (width, max_height), interpolation=cv2.INTER_AREA)
+        height = max_height
+
+    x0 = int(width * column_band[0])
+    x1 = max(x0 + 1, int(width * column_band[1]))
+    profile = np.median(gray[:, x0:x1], axis=1).astype(np.float32)
+
+    # Light smoothing so single-row noise can't win
+    profile = cv2.GaussianBlur(profile.reshape(-1, 1), (1, 5), 0).ravel()
+
+    # Step response: mean of `window` rows above each row minus mean below
+    window = max(2, height // 20)
+    if height < 2 * window + 1:
+        return None
+    cumulative = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+    rows = np.arange(window, height - window + 1)
+    above = (cumulative[rows] - cumulative[rows - window]) / window
+    below = (cumulative[rows + window] - cumulative[rows]) / window
+    step = above - below
+
+    best = int(np.argmax(step))
+    contrast = float(step[best]) / 255.0
+    if contrast < min_contrast:
+        return None
+
+    return {
+        'beer_line_y': float(rows[best]) / height,
+        'contrast': round(contrast, 4),
+    }
+
+
+def box_region(box: Dict, img_width: int, img_height: int, padding: int = 20) -> Dict:
+    """
+    Padded region around a centre-format box (x, y, width, height), clipped to the image.
+
+    Args:
+        box: Box with centre x/y and width/height in image pixels
+        img_width: Image width used for clipping
+        img_height: Image height used for clipping
+        padding: Pixels added on each side
+
+    Returns:
+        Dictionary with offset_x, offset_y, width, height
+    """
+    offset_x = max(0, int(box['x'] - box['width']/2) - padding)
+    offset_y = max(0, int(box['y'] - box['height']/2) - padding)
+    return {
+        'offset_x': offset_x,
+        'offset_y': offset_y,
+        'width': min(int(box['width']) + 2*padding, img_width - offset_x),
+        'height': min(int(box['height']) + 2*padding, img_height - offset_y),
+    }
+
@@ -0,0 +1,96 @@
+"""
+Benchmark the local beer line detector against archived Model 2 results.
+
+Uses workflow archive entries that have both a Model 2 split prediction and
+an archived G-logo crop (set WORKFLOW_ARCHIVE_CROPS=1 to collect them), runs
+detect_beer_line on each crop and compares its beer line and score with
+Model 2's.
+
+    python bench_beer_line_detector.py --db cache/workflow_archive.db
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from beer_line_detector import detect_beer_line
+from scoring import extract_inputs, score_local_beer_line
+from workflow_archive import WorkflowArchive
+from workflow_model import WorkflowResult
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the local beer line detector')
+    parser.add_argument('--db', default='cache/workflow_archive.db', help='Workflow archive path')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum archive entries to read')
+    parser.add_argument('--min-contrast', type=float, default=0.08, help='Detector contrast threshold')
+    args = parser.parse_args(argv)
+
+    archive = WorkflowArchive(args.db)
+
+    line_errors = []
+    score_errors = []
+    latencies = []
+    undetected = 0
+    skipped = 0
+
+    for record in archive.iter_records(limit=args.limit):
+        inputs = extract_inputs(WorkflowResult.from_outputs(record['outputs']))
+        if record['crop'] is None or np.isnan(inputs['split_y']):
+            skipped += 1
+            continue
+
+        crop = cv2.imdecode(np.frombuffer(record['crop'], dtype=np.uint8), cv2.IMREAD_COLOR)
+
+        started = time.perf_counter()
+        detected = detect_beer_line(crop, min_contrast=args.min_contrast)
+        latencies.append(time.perf_counter() - started)
+
+        if detected is None:
+            undetected += 1
+            continue
+
+        model2_line = (inputs['split_y'] - inputs['split_height'] / 2) / inputs['crop_height']
+        model2_score = score_local_beer_line(model2_line)['score']
+        local_score = score_local_beer_line(detected['beer_line_y'])['score']
+
+        line_errors.append(abs(detected['beer_line_y'] - model2_line))
+        score_errors.append(abs(local_score - model2_score))
+
+    evaluated = len(latencies)
+    print("=" * 80)
+    print("LOCAL BEER LINE DETECTOR vs MODEL 2")
+    print("=" * 80)
+    print(f"Archive: {args.db}")
+    print(f"Evaluated: {evaluated}  (skipped {skipped} without crop or Model 2 split)")
+
+    if not evaluated:
+        print("Nothing to compare - collect crops with WORKFLOW_ARCHIVE_CROPS=1")
+        return 1
+
+    print(f"Detected: {len(line_errors)}/{evaluated} ({len(line_errors) / evaluated:.1%}), "
+          f"no clear boundary: {undetected}")
+
+    if line_errors:
+        line_errors = np.array(line_errors)
+        score_errors = np.array(score_errors)
+        print(f"\nBeer line error (fraction of crop height):")
+        print(f"  mean {line_errors.mean():.4f} | median {np.median(line_errors):.4f} | "
+              f"p90 {np.percentile(line_errors, 90):.4f}")
+        print(f"  within 0.02: {np.mean(line_errors <= 0.02):.1%} | within 0.05: {np.mean(line_errors <= 0.05):.1%}")
+        print(f"\nScore error (points):")
+        print(f"  mean {score_errors.mean():.2f} | median {np.median(score_errors):.2f} | "
+              f"p90 {np.percentile(score_errors, 90):.2f} | max {score_errors.max():.2f}")
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"\nDetector latency (ms): p50 {np.percentile(latencies_ms, 50):.3f} | "
+          f"p95 {np.percentile(latencies_ms, 95):.3f} | max {latencies_ms.max():.3f}")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
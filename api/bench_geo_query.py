@@ -0,0 +1,158 @@
+"""
+Benchmark bounding-box and nearest-pub lookups.
+
+Seeds a throwaway database with pubs (most clustered around city centres,
+the rest spread over the country), then times map-viewport bbox pages and
+/api/pubs/near lookups through the geo_cell index against a scan on the
+coordinates, checking every answer against a brute-force filter.
+
+    python bench_geo_query.py --pubs 100000 --queries 500
+    python bench_geo_query.py --limit 500
+    python bench_geo_query.py --db-url postgresql://localhost/gsplit_bench
+
+The database at --db-url is dropped and recreated.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from flask import Flask
+
+from geo import GEOHASH_PRECISION, encode_geohash, haversine_m
+from models import db, Pub
+from pub_queries import parse_fields, pub_page, pubs_near
+
+# (lat, lng) of the clusters
+CITIES = [(53.3498, -6.2603), (51.8985, -8.4756), (53.2707, -9.0568),
+          (52.6638, -8.6267), (54.5973, -5.9301), (52.2593, -7.1101)]
+
+MAP_FIELDS = parse_fields('place_id,name,lat,lng,topSplit')
+
+
+def seed(pub_count: int, rng: random.Random):
+    """Fill the database; returns [(id, lat, lng)] for the brute-force check."""
+    db.drop_all()
+    db.create_all()
+
+    pubs, points = [], []
+    for i in range(pub_count):
+        if rng.random() < 0.6:
+            city_lat, city_lng = rng.choice(CITIES)
+            # ~3km spread around the centre
+            lat, lng = rng.gauss(city_lat, 0.027), rng.gauss(city_lng, 0.045)
+        else:
+            lat, lng = rng.uniform(51.4, 55.4), rng.uniform(-10.5, -5.5)
+        lat, lng = round(lat, 6), round(lng, 6)
+        pub_id = str(uuid.uuid4())
+        pubs.append({
+            'id': pub_id, 'place_id': f'place-{i}', 'name': f'Pub {i}', 'address': f'{i} Main St',
+            'lat': lat, 'lng': lng, 'created_at': datetime(2024, 1, 1),
+            # Bulk inserts skip the ORM event that sets geo_cell
+            'geo_cell': encode_geohash(lat, lng, GEOHASH_PRECISION),
+        })
+        points.append((pub_id, lat, lng))
+
+    db.session.bulk_insert_mappings(Pub, pubs)
+    db.session.commit()
+    return points
+
+
+def scan_bbox(bbox, limit):
+    """The same page filtered on the coordinates alone (no usable index)."""
+    south, west, north, east = bbox
+    return db.session.query(Pub).filter(Pub.lat.between(south, north), Pub.lng.between(west, east))\
+        .order_by(Pub.id).limit(limit).all()
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<26} p50 {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms  "
+          f"max {samples[-1]:7.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark bbox and nearest-pub lookups')
+    parser.add_argument('--pubs', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500, help='Lookups of each kind')
+    parser.add_argument('--radius', type=float, default=1000, help='Near radius in metres')
+    parser.add_argument('--limit', type=int, default=100, help='Page size / near limit (API default: 100)')
+    parser.add_argument('--db-url', default=None, help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.db_url is None:
+        args.db_url = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_geo.db")}'
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.db_url
+    db.init_app(app)
+
+    print("=" * 80)
+    print("GEO LOOKUPS")
+    print("=" * 80)
+    print(f"Database: {args.db_url}")
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        points = seed(args.pubs, rng)
+        print(f"{args.pubs} pubs, {args.queries} lookups of each kind, limit {args.limit}\n")
+
+        bbox_times, scan_times, near_times = [], [], []
+        bbox_rows = near_rows = errors = 0
+        for _ in range(args.queries):
+            _pub_id, lat, lng = rng.choice(points)
+            # A phone-sized map viewport (~2.2km x 1.7km) around a pub
+            bbox = (lat - 0.0075, lng - 0.0165, lat + 0.0075, lng + 0.0165)
+            south, west, north, east = bbox
+
+            db.session.expire_all()
+            (page, _cursor), ms = timed(lambda: pub_page(args.limit, None, MAP_FIELDS, bbox=bbox))
+            bbox_times.append(ms)
+            bbox_rows += len(page)
+            _rows, ms = timed(lambda: scan_bbox(bbox, args.limit))
+            scan_times.append(ms)
+
+            inside = sorted(pub_id for pub_id, p_lat, p_lng in points
+                            if south <= p_lat <= north and west <= p_lng <= east)[:args.limit]
+            errors += sorted(pub['id'] for pub in pub_page(args.limit, None, ('id',), bbox=bbox)[0]) != inside
+
+            db.session.expire_all()
+            near, ms = timed(lambda: pubs_near(lat, lng, args.radius, args.limit, MAP_FIELDS))
+            near_times.append(ms)
+            near_rows += len(near)
+
+            # A degree of latitude is ~111km; anything further is skipped before haversine
+            reach = args.radius / 100000
+            distances = ((haversine_m(lat, lng, p_lat, p_lng), pub_id) for pub_id, p_lat, p_lng in points
+                         if abs(p_lat - lat) <= reach)
+            within = sorted(item for item in distances if item[0] <= args.radius)[:args.limit]
+            found = pubs_near(lat, lng, args.radius, args.limit, ('id',))
+            errors += [pub['id'] for pub in found] != [pub_id for _distance, pub_id in within]
+
+        report('bbox page (geo_cell)', bbox_times)
+        report('bbox page (lat/lng scan)', scan_times)
+        report(f'near {args.radius:.0f}m (geo_cell)', near_times)
+        print(f"\n  mean pubs per bbox page {bbox_rows / args.queries:.1f}, "
+              f"per near lookup {near_rows / args.queries:.1f}")
+        print(f"  {errors} lookups differ from the brute-force answer")
+
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
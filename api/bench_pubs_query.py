@@ -0,0 +1,211 @@
+"""
+Benchmark GET /api/pubs data loading.
+
+Seeds a throwaway database with pubs, scores and ratings (and builds their
+pub_stats rows), then counts the queries and times pub_summaries against the previous per-pub queries (four
+per pub), checking that both return the same data. Then times one page from
+the middle of the table with pub_page, in full and with the map view's
+field list, to show a page costs the same however large the table is.
+
+    python bench_pubs_query.py --pubs 1000 10000
+    python bench_pubs_query.py --db-url postgresql://localhost/gsplit_bench
+
+The database at --db-url is dropped and recreated.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, Pub, PubRating, Score
+from pub_queries import encode_cursor, parse_fields, pub_page, pub_summaries
+from pub_stats import reconcile
+
+
+def per_pub_summaries():
+    """get_pubs before pub_queries, kept as the baseline."""
+    pubs = Pub.query.all()
+    result = []
+
+    for pub in pubs:
+        top_score = Score.query.filter_by(pub_id=pub.id)\
+            .order_by(Score.score.desc()).first()
+
+        ratings = PubRating.query.filter_by(pub_id=pub.id).all()
+        avg_rating = None
+        if ratings:
+            avg_rating = sum(float(r.overall_rating) for r in ratings) / len(ratings)
+            avg_rating = round(avg_rating, 1)
+
+        pints_logged = Score.query.filter_by(pub_id=pub.id).count()
+
+        top_scores = Score.query.filter_by(pub_id=pub.id)\
+            .order_by(Score.score.desc()).limit(5).all()
+        leaderboard = [
+            {
+                'rank': idx + 1,
+                'username': score.username or 'Anonymous',
+                'score': float(score.score)
+            }
+            for idx, score in enumerate(top_scores)
+        ]
+
+        pub_data = pub.to_dict()
+        pub_data.update({
+            'topSplit': {
+                'score': float(top_score.score),
+                'username': top_score.username or 'Anonymous'
+            } if top_score else None,
+            'qualityRating': avg_rating,
+            'pintsLogged': pints_logged,
+            'leaderboard': leaderboard
+        })
+        result.append(pub_data)
+
+    return result
+
+
+def seed(pub_count: int, scores_per_pub: float, ratings_per_pub: float, rng: random.Random):
+    """Fill the database; score and rating counts per pub vary around the means."""
+    db.drop_all()
+    db.create_all()
+
+    started = datetime(2024, 1, 1)
+    pubs, scores, ratings = [], [], []
+    for i in range(pub_count):
+        pub_id = str(uuid.uuid4())
+        pubs.append({
+            'id': pub_id, 'place_id': f'place-{i}', 'name': f'Pub {i}', 'address': f'{i} Main St',
+            'lat': round(rng.uniform(51.3, 53.5), 6), 'lng': round(rng.uniform(-10.0, -6.0), 6),
+            'created_at': started,
+        })
+        for _ in range(int(rng.expovariate(1 / scores_per_pub))):
+            scores.append({
+                'id': str(uuid.uuid4()), 'pub_id': pub_id,
+                'username': rng.choice([None, 'paddy', 'siobhan', 'ciaran', 'aoife']),
+                # Unique scores keep the baseline's unordered ties out of the comparison
+                'score': round(rng.uniform(0, 100), 2),
+                'created_at': started + timedelta(seconds=len(scores)),
+            })
+        for _ in range(int(rng.expovariate(1 / ratings_per_pub))):
+            ratings.append({
+                'id': str(uuid.uuid4()), 'pub_id': pub_id,
+                'overall_rating': round(rng.uniform(1, 5), 1), 'taste': 4, 'temperature': 4, 'head': 4,
+                'created_at': started,
+            })
+
+    db.session.bulk_insert_mappings(Pub, pubs)
+    db.session.bulk_insert_mappings(Score, scores)
+    db.session.bulk_insert_mappings(PubRating, ratings)
+    db.session.commit()
+    # Bulk inserts bypass record_score / record_rating
+    reconcile(chunk_size=1000)
+    return len(scores), len(ratings)
+
+
+def measure(fn, counter):
+    db.session.expire_all()
+    counter['queries'] = 0
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started, counter['queries']
+
+
+def unique_top_scores(result):
+    """Pubs whose leaderboard has no tied scores (ordering of ties differs by design)."""
+    return {
+        pub['id']: pub for pub in result
+        if len({entry['score'] for entry in pub['leaderboard']}) == len(pub['leaderboard'])
+    }
+
+
+def same_summary(old, new) -> bool:
+    """
+    Whether two pub summaries match.
+
+    The baseline averages float ratings while pub_stats sums them exactly,
+    so averages that land on a rounding tie (e.g. 2.15) may round either way.
+    """
+    if old is None or new is None:
+        return old is new
+    old, new = dict(old), dict(new)
+    old_rating, new_rating = old.pop('qualityRating'), new.pop('qualityRating')
+    if (old_rating is None) != (new_rating is None):
+        return False
+    if old_rating is not None and abs(old_rating - new_rating) > 0.1 + 1e-9:
+        return False
+    return old == new
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark GET /api/pubs queries')
+    parser.add_argument('--pubs', type=int, nargs='+', default=[1000, 10000], help='Pub counts to test')
+    parser.add_argument('--scores-per-pub', type=float, default=8)
+    parser.add_argument('--ratings-per-pub', type=float, default=3)
+    parser.add_argument('--db-url', default=None, help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db_url is None:
+        tmpdir = tempfile.mkdtemp()
+        args.db_url = f'sqlite:///{os.path.join(tmpdir, "bench_pubs.db")}'
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.db_url
+    db.init_app(app)
+
+    print("=" * 80)
+    print("GET /api/pubs QUERIES")
+    print("=" * 80)
+    print(f"Database: {args.db_url}")
+
+    with app.app_context():
+        counter = {'queries': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def _count(*_args):
+            counter['queries'] += 1
+
+        rng = random.Random(args.seed)
+        for pub_count in args.pubs:
+            score_count, rating_count = seed(pub_count, args.scores_per_pub, args.ratings_per_pub, rng)
+            print(f"\n{pub_count} pubs, {score_count} scores, {rating_count} ratings")
+
+            new, new_seconds, new_queries = measure(pub_summaries, counter)
+            old, old_seconds, old_queries = measure(per_pub_summaries, counter)
+
+            old_by_id, new_by_id = unique_top_scores(old), unique_top_scores(new)
+            mismatched = sum(1 for pub_id, pub in old_by_id.items() if not same_summary(pub, new_by_id.get(pub_id)))
+
+            print(f"  per-pub queries   {old_queries:7d} queries  {old_seconds * 1000:9.1f} ms")
+            print(f"  pub_summaries     {new_queries:7d} queries  {new_seconds * 1000:9.1f} ms  "
+                  f"({old_seconds / new_seconds:.1f}x)")
+            print(f"  results: {len(new)} pubs, {mismatched} differ from the baseline")
+
+            # A page from the middle of the table (keyset cursor on pub id)
+            middle = sorted(pub['id'] for pub in new)[len(new) // 2]
+            full_bytes = len(json.dumps(new))
+            for label, fields in (('page, all fields', None),
+                                  ('page, map fields', parse_fields('place_id,name,lat,lng,topSplit'))):
+                (page, _cursor), seconds, queries = measure(
+                    lambda: pub_page(args.page_size, encode_cursor(middle), fields), counter)
+                print(f"  {label:<17} {queries:7d} queries  {seconds * 1000:9.1f} ms  "
+                      f"{len(json.dumps(page)):9d} bytes (all pubs: {full_bytes})")
+
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark roast bank lookups.
+
+Times the compiled get_roast / get_roast_tier / get_roasts against the
+previous implementation (a scan of FEEDBACK_LIBRARY and str.format on each
+call), over scores spread across every tier.
+
+    python bench_roast_bank.py --n 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from roast_bank import FEEDBACK_LIBRARY, MID_HIGH_ROASTS, get_roast, get_roast_tier, get_roasts
+
+
+def scan_roast(score: float, distance_mm: float) -> str:
+    """get_roast before the bank was compiled, kept as the baseline."""
+    import random
+
+    roast_options = []
+    for (min_score, max_score), roasts in FEEDBACK_LIBRARY.items():
+        if min_score <= score <= max_score:
+            roast_options = roasts
+            break
+
+    if not roast_options:
+        roast_options = MID_HIGH_ROASTS
+
+    roast = random.choice(roast_options)
+
+    if '{distance_mm' in roast:
+        roast = roast.format(distance_mm=distance_mm)
+
+    return roast
+
+
+def time_per_call(fn, scores, distances) -> float:
+    """Best of three passes, in nanoseconds per score."""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for score, distance_mm in zip(scores, distances):
+            fn(score, distance_mm)
+        best = min(best, time.perf_counter() - started)
+    return best / len(scores) * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark roast bank lookups')
+    parser.add_argument('--n', type=int, default=200000, help='Scores per pass')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    # API scores have one decimal; include the gaps between tiers (e.g. 89.5)
+    scores = [round(rng.uniform(0, 100), 1) for _ in range(args.n)]
+    distances = [rng.uniform(-40, 40) for _ in range(args.n)]
+
+    results = {
+        'scan get_roast (previous)': time_per_call(scan_roast, scores, distances),
+        'get_roast': time_per_call(get_roast, scores, distances),
+        'get_roast_tier': time_per_call(lambda score, _: get_roast_tier(score), scores, distances),
+    }
+
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        get_roasts(scores, distances)
+        best = min(best, time.perf_counter() - started)
+    results['get_roasts (per score)'] = best / args.n * 1e9
+
+    gap_scores = sum(1 for score in scores if score % 1 and int(score) in (24, 49, 64, 74, 84, 89))
+
+    print("=" * 80)
+    print("ROAST BANK LOOKUP")
+    print("=" * 80)
+    print(f"Scores: {args.n} ({gap_scores} between tier bounds, previously served MID HIGH)")
+    baseline = results['scan get_roast (previous)']
+    for name, ns in results.items():
+        print(f"  {name:<28} {ns:8.1f} ns/score  ({baseline / ns:4.1f}x)")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,6 @@ Configuration settings for the Guinness Split the G API
 """
 
 import os
-from pathlib import Path
 
 
 class Config:
@@ -13,8 +12,7 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
 
-    # Upload settings
-    UPLOAD_FOLDER = Path('uploads')
+    # Upload settings (uploads are processed in memory, never written to disk)
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
     # API settings
@@ -37,6 +35,108 @@ class Config:
     MIN_IMAGE_SIZE = 200  # Minimum width/height in pixels
     MAX_IMAGE_SIZE = 4000  # Maximum width/height in pixels
 
+    # Roboflow workflow client
+    ROBOFLOW_API_URL = os.environ.get('ROBOFLOW_API_URL', 'https://detect.roboflow.com')
+    ROBOFLOW_POOL_SIZE = int(os.environ.get('ROBOFLOW_POOL_SIZE', 10))  # Keep-alive connections per worker
+    ROBOFLOW_CONNECT_TIMEOUT = float(os.environ.get('ROBOFLOW_CONNECT_TIMEOUT', 3.05))
+    ROBOFLOW_READ_TIMEOUT = float(os.environ.get('ROBOFLOW_READ_TIMEOUT', 30))
+    ROBOFLOW_MAX_RETRIES = int(os.environ.get('ROBOFLOW_MAX_RETRIES', 2))
+    ROBOFLOW_BACKOFF_BASE = float(os.environ.get('ROBOFLOW_BACKOFF_BASE', 0.25))
+    ROBOFLOW_BACKOFF_MAX = float(os.environ.get('ROBOFLOW_BACKOFF_MAX', 4.0))
+
+    # Hedged requests: once a call runs past this percentile of recent request
+    # latencies, send one duplicate and take whichever answers first (0 disables)
+    ROBOFLOW_HEDGE_PERCENTILE = float(os.environ.get('ROBOFLOW_HEDGE_PERCENTILE', 0.95))
+    ROBOFLOW_HEDGE_BUDGET = float(os.environ.get('ROBOFLOW_HEDGE_BUDGET', 0.05))  # Max share of calls hedged
+    ROBOFLOW_HEDGE_MIN_SAMPLES = int(os.environ.get('ROBOFLOW_HEDGE_MIN_SAMPLES', 20))
+
+    # Seconds an analysis may take before it fails fast (or falls back to the
+    # local detector when the client sent a G-logo box); 0 = no deadline
+    ANALYSIS_DEADLINE_SECONDS = float(os.environ.get('ANALYSIS_DEADLINE_SECONDS', 30))
+
+    # GET /api/pubs pagination (?limit=&cursor=); pubs per page by default and at most
+    PUBS_PAGE_SIZE = int(os.environ.get('PUBS_PAGE_SIZE', 100))
+    PUBS_PAGE_MAX = int(os.environ.get('PUBS_PAGE_MAX', 500))
+
+    # GET /api/pubs/near radius in metres when none is given, and the largest accepted
+    PUBS_NEAR_RADIUS_M = float(os.environ.get('PUBS_NEAR_RADIUS_M', 1000))
+    PUBS_NEAR_MAX_RADIUS_M = float(os.environ.get('PUBS_NEAR_MAX_RADIUS_M', 50000))
+
+    # Upload preprocessing: longest side sent to Roboflow, clamped to
+    # MIN_IMAGE_SIZE..MAX_IMAGE_SIZE; smaller images are sent untouched
+    ROBOFLOW_MAX_DIMENSION = int(os.environ.get('ROBOFLOW_MAX_DIMENSION', 1280))
+    ROBOFLOW_UPLOAD_FORMAT = os.environ.get('ROBOFLOW_UPLOAD_FORMAT', 'jpeg')  # 'jpeg' or 'webp'
+    ROBOFLOW_UPLOAD_QUALITY = int(os.environ.get('ROBOFLOW_UPLOAD_QUALITY', 85))
+
+    # Decoded pixels held at once by concurrent image decodes (per process)
+    IMAGE_DECODE_BUDGET_MB = float(os.environ.get('IMAGE_DECODE_BUDGET_MB', 128))  # ~3 full 12MP decodes
+
+    # Worker processes for image decode/crop work; 0 runs it in the request thread
+    CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', 0))
+
+    # Batch analysis (/analyze-split/batch)
+    BATCH_MAX_IMAGES = int(os.environ.get('BATCH_MAX_IMAGES', 20))
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 8))  # Concurrent workflow calls per worker
+    BATCH_MAX_CONTENT_LENGTH = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+
+    # Async analysis jobs (/analyze-split?async=1)
+    ASYNC_QUEUE_BACKEND = os.environ.get('ASYNC_QUEUE_BACKEND', 'memory')  # 'memory' or 'sqlite'
+    ASYNC_QUEUE_PATH = os.environ.get('ASYNC_QUEUE_PATH', 'cache/analysis_jobs.db')
+    ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', 4))
+    ASYNC_QUEUE_MAX_DEPTH = int(os.environ.get('ASYNC_QUEUE_MAX_DEPTH', 100))
+    ASYNC_JOB_TTL_SECONDS = int(os.environ.get('ASYNC_JOB_TTL_SECONDS', 3600))
+    # SQLite jobs running longer than this are assumed abandoned and run again
+    ASYNC_JOB_LEASE_SECONDS = float(os.environ.get('ASYNC_JOB_LEASE_SECONDS', 300))
+
+    # AI roasts (served from a pool generated in the background)
+    AI_ROAST_RATE = float(os.environ.get('AI_ROAST_RATE', 0.2))  # Share of roasts taken from the AI pool
+    AI_ROAST_MODEL = os.environ.get('AI_ROAST_MODEL', 'claude-sonnet-4-20250514')
+    AI_ROAST_POOL_LOW_WATER = int(os.environ.get('AI_ROAST_POOL_LOW_WATER', 5))
+    AI_ROAST_POOL_BATCH_SIZE = int(os.environ.get('AI_ROAST_POOL_BATCH_SIZE', 10))
+    AI_ROAST_POOL_MAX_SIZE = int(os.environ.get('AI_ROAST_POOL_MAX_SIZE', 40))
+    AI_ROAST_REFILL_INTERVAL = float(os.environ.get('AI_ROAST_REFILL_INTERVAL', 60))
+
+    # /analyze-split responses omit debug fields unless ?debug=1
+    COMPACT_RESPONSES = os.environ.get('COMPACT_RESPONSES', '1') == '1'
+
+    # Debug artifacts (written on a background thread)
+    DEBUG_ARTIFACTS_DIR = os.environ.get('DEBUG_ARTIFACTS_DIR', 'debug_crops')
+    DEBUG_ARTIFACTS_SAMPLE_RATE = float(os.environ.get(
+        'DEBUG_ARTIFACTS_SAMPLE_RATE', 1.0 if os.environ.get('SAVE_DEBUG_CROPS') == '1' else 0.0
+    ))
+    DEBUG_ARTIFACTS_ON_FAILURE = os.environ.get('DEBUG_ARTIFACTS_ON_FAILURE', '1') == '1'  # Always keep Model 2 failure crops
+    DEBUG_ARTIFACTS_QUEUE_SIZE = int(os.environ.get('DEBUG_ARTIFACTS_QUEUE_SIZE', 64))
+
+    # Archive of parsed workflow outputs for offline re-scoring (workflow_archive.py replay)
+    WORKFLOW_ARCHIVE_ENABLED = os.environ.get('WORKFLOW_ARCHIVE_ENABLED', '1') == '1'
+    WORKFLOW_ARCHIVE_PATH = os.environ.get('WORKFLOW_ARCHIVE_PATH', 'cache/workflow_archive.db')
+    WORKFLOW_ARCHIVE_CROPS = os.environ.get('WORKFLOW_ARCHIVE_CROPS', '0') == '1'  # Needed by bench_beer_line_detector.py
+
+    # Local beer line detector (beer_line_detector.py)
+    # Off until bench_beer_line_detector.py has been run on archived crops
+    # (WORKFLOW_ARCHIVE_CROPS=1); fast mode and Roboflow failures use it regardless
+    LOCAL_DETECTOR_FALLBACK = os.environ.get('LOCAL_DETECTOR_FALLBACK', '0') == '1'  # Use when Model 2 finds no split
+    LOCAL_DETECTOR_MIN_CONTRAST = float(os.environ.get('LOCAL_DETECTOR_MIN_CONTRAST', 0.08))
+
+    # Concurrent analyses of the same image share one workflow call
+    SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', '1') == '1'
+    SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_WAIT_TIMEOUT', 60))  # Seconds a duplicate waits; 0 = no limit
+
+    # Load shedding (load_governor.py): thresholds that start shed levels 1/2/3
+    # (debug artifacts, AI roasts, debug_info payloads) in each worker
+    LOAD_SHED_ENABLED = os.environ.get('LOAD_SHED_ENABLED', '1') == '1'
+    LOAD_SHED_IN_FLIGHT = tuple(float(v) for v in os.environ.get('LOAD_SHED_IN_FLIGHT', '12,24,48').split(','))
+    LOAD_SHED_QUEUE_DEPTH = tuple(float(v) for v in os.environ.get('LOAD_SHED_QUEUE_DEPTH', '25,50,75').split(','))
+    LOAD_SHED_LATENCY_P95 = tuple(float(v) for v in os.environ.get('LOAD_SHED_LATENCY_P95', '8,15,25').split(','))  # Seconds
+    LOAD_SHED_RECOVERY_RATIO = float(os.environ.get('LOAD_SHED_RECOVERY_RATIO', 0.7))  # Step down below this share of the threshold
+    LOAD_SHED_COOLDOWN_SECONDS = float(os.environ.get('LOAD_SHED_COOLDOWN_SECONDS', 10))
+
+    # Analysis result cache ('memory', 'sqlite' or 'none')
+    ANALYSIS_CACHE_BACKEND = os.environ.get('ANALYSIS_CACHE_BACKEND', 'memory')
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 1024))
+    ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS', 24 * 3600))
+    ANALYSIS_CACHE_PATH = os.environ.get('ANALYSIS_CACHE_PATH', 'cache/analysis_cache.db')
+
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 
@@ -0,0 +1,214 @@
+"""
+CPU Process Pool
+Runs the CPU-heavy image stages (reduced decode + resize + re-encode for the
+upload, full-resolution decode for the G-logo crop) in worker processes so
+request threads don't queue behind each other's OpenCV and NumPy work.
+
+Encoded images go to the workers through multiprocessing.shared_memory and
+crops come back the same way; only small metadata is pickled. The parent
+owns every segment (created, read and unlinked on the request thread), and
+decoded bytes still count against the parent's DecodeBudget while a worker
+holds them.
+
+Workers are spawned (not forked - the server is multithreaded) on first use.
+If the pool breaks, the call runs in-thread and the pool is rebuilt next time.
+"""
+
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional
+
+import numpy as np
+
+from image_loader import DecodeBudget, SourceImage
+from image_preprocess import prepare_source_upload
+
+logger = logging.getLogger(__name__)
+
+# Workers don't limit themselves; the parent reserved the memory already
+_UNBOUNDED_BUDGET = DecodeBudget(sys.maxsize)
+
+
+def _init_worker():
+    import cv2
+    # One process per core already; OpenCV's own threads would oversubscribe
+    cv2.setNumThreads(1)
+
+
+def _upload_task(shm_name: str, size: int, max_dimension: int, upload_format: str,
+                 quality: int) -> Optional[Dict]:
+    shm = SharedMemory(shm_name)
+    data = shm.buf[:size]
+    try:
+        prepared = prepare_source_upload(SourceImage(data, _UNBOUNDED_BUDGET), max_dimension,
+                                         upload_format, quality)
+        if prepared is not None and prepared['upload'] is data:
+            prepared['upload'] = None  # Parent sends its own copy of the original
+        return prepared
+    finally:
+        data.release()
+        shm.close()
+
+
+def _crop_task(shm_name: str, size: int, out_name: str, offset_x: int, offset_y: int,
+               width: int, height: int) -> Optional[tuple]:
+    shm = SharedMemory(shm_name)
+    out = SharedMemory(out_name)
+    data = shm.buf[:size]
+    try:
+        crop = SourceImage(data, _UNBOUNDED_BUDGET).crop(offset_x, offset_y, width, height)
+        if crop is None:
+            return None
+        target = np.ndarray(crop.shape, dtype=np.uint8, buffer=out.buf)
+        target[...] = crop
+        del target
+        return crop.shape
+    finally:
+        data.release()
+        shm.close()
+        out.close()
+
+
+class CpuPool:
+    """Process pool for image decode/encode work, fed through shared memory."""
+
+    def __init__(self, workers: int):
+        """
+        Args:
+            workers: Worker processes (typically one per core)
+        """
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self.tasks = 0
+        self.fallbacks = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            self.tasks += 1
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            logger.error("CPU pool broke (worker died), rebuilding on next use")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                self.fallbacks += 1
+            executor.shutdown(wait=False)
+            raise
+
+    @staticmethod
+    def _share(data: memoryview) -> SharedMemory:
+        shm = SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        return shm
+
+    def prepare_upload(self, source: SourceImage, max_dimension: int,
+                       upload_format: str = 'jpeg', quality: int = 85) -> Optional[Dict]:
+        """
+        prepare_source_upload in a worker process.
+
+        Returns:
+            Same dictionary as image_preprocess.prepare_source_upload
+        """
+        factor, _flags = source.reduction_for(max_dimension)
+        with source.budget.reserve(source.decoded_bytes(factor)):
+            shm = self._share(source.data)
+            try:
+                prepared = self._run(_upload_task, shm.name, len(source.data),
+                                     max_dimension, upload_format, quality)
+            except BrokenProcessPool:
+                prepared = None
+                fallback = True
+            else:
+                fallback = False
+            finally:
+                shm.close()
+                shm.unlink()
+
+        if fallback:
+            return prepare_source_upload(source, max_dimension, upload_format, quality)
+        if prepared is not None and prepared['upload'] is None:
+            prepared['upload'] = source.data
+        return prepared
+
+    def crop(self, source: SourceImage, offset_x: int, offset_y: int,
+             width: int, height: int) -> Optional[np.ndarray]:
+        """
+        SourceImage.crop in a worker process.
+
+        Images whose size isn't known from the header are cropped in-thread,
+        since the output segment has to be sized up front.
+
+        Returns:
+            Contiguous BGR crop, or None if undecodable
+        """
+        if not source.header_ok:
+            return source.crop(offset_x, offset_y, width, height)
+
+        # Clip so the output segment matches what the worker can return
+        width = max(0, min(width, source.width - offset_x))
+        height = max(0, min(height, source.height - offset_y))
+
+        with source.budget.reserve(source.decoded_bytes()):
+            shm = self._share(source.data)
+            out = SharedMemory(create=True, size=max(1, width * height * 3))
+            try:
+                shape = self._run(_crop_task, shm.name, len(source.data), out.name,
+                                  offset_x, offset_y, width, height)
+            except BrokenProcessPool:
+                crop = None
+                fallback = True
+            else:
+                crop = None if shape is None else np.ndarray(shape, dtype=np.uint8, buffer=out.buf).copy()
+                fallback = False
+            finally:
+                shm.close()
+                shm.unlink()
+                out.close()
+                out.unlink()
+
+        if fallback:
+            return source.crop(offset_x, offset_y, width, height)
+        return crop
+
+    def stats(self) -> Dict:
+        """Worker count, tasks run and in-thread fallbacks after pool failures."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'tasks': self.tasks,
+                'fallbacks': self.fallbacks,
+            }
+
+
+def create_cpu_pool(config) -> Optional[CpuPool]:
+    """
+    Build the CPU pool described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+
+    Returns:
+        CpuPool, or None if CPU_POOL_WORKERS is 0 (stages run in the request thread)
+    """
+    if config.CPU_POOL_WORKERS <= 0:
+        return None
+    return CpuPool(config.CPU_POOL_WORKERS)
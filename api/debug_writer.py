@@ -0,0 +1,127 @@
+"""
+Background Debug Artifact Writer
+Annotates and writes debug crops on a background thread so JPEG encoding
+and disk I/O never sit on the request path.
+
+Artifacts are sampled (DEBUG_ARTIFACTS_SAMPLE_RATE), optionally always
+written for Model 2 failures, and dropped rather than queued when the
+writer falls behind.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DebugArtifactWriter:
+    """Bounded queue of debug images drained by one daemon thread."""
+
+    def __init__(self, output_dir: str, sample_rate: float = 0.0,
+                 write_failures: bool = True, queue_size: int = 64):
+        """
+        Initialize the writer. The thread starts on the first submit.
+
+        Args:
+            output_dir: Directory artifacts are written to
+            sample_rate: Fraction of analyses (0-1) that get full debug artifacts
+            write_failures: Always write the crop when Model 2 found no split
+            queue_size: Max artifacts waiting to be written before new ones are dropped
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.write_failures = write_failures
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'DebugArtifactWriter':
+        """Build a writer using the DEBUG_ARTIFACTS_* settings of a configuration class."""
+        return cls(
+            config.DEBUG_ARTIFACTS_DIR,
+            sample_rate=config.DEBUG_ARTIFACTS_SAMPLE_RATE,
+            write_failures=config.DEBUG_ARTIFACTS_ON_FAILURE,
+            queue_size=config.DEBUG_ARTIFACTS_QUEUE_SIZE
+        )
+
+    def should_sample(self) -> bool:
+        """Roll whether this analysis gets full debug artifacts."""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def submit(self, filename: str, render: Callable[[], np.ndarray]) -> Optional[str]:
+        """
+        Queue an artifact for writing.
+
+        Args:
+            filename: File name within output_dir
+            render: Called on the writer thread; returns the image to save.
+                It must only use data that stays valid after the request
+                returns (e.g. a copied crop).
+
+        Returns:
+            Path the artifact will be written to, or None if it was dropped
+        """
+        self._ensure_started()
+
+        path = os.path.join(self.output_dir, filename)
+        try:
+            self._queue.put_nowait((path, render))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return None
+
+        return path
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='gsplit-debug-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path, render = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                if not cv2.imwrite(path, render()):
+                    raise IOError(f'cv2.imwrite returned False for {path}')
+                with self._stats_lock:
+                    self.written += 1
+            except Exception as e:
+                logger.warning(f"Failed to write debug artifact {path}: {e}")
+                with self._stats_lock:
+                    self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued artifact has been written (for scripts)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self) -> Dict:
+        """Written/dropped/error counters and current queue depth."""
+        with self._stats_lock:
+            return {
+                'written': self.written,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'sample_rate': self.sample_rate,
+            }
@@ -0,0 +1,212 @@
+"""
+Geohash Spatial Index
+Bounding-box and radius lookups on a plain B-tree index, without PostGIS.
+
+Every pub stores the geohash of its location (Pub.geo_cell). A geohash
+interleaves longitude and latitude bits, so all points inside one cell share
+the cell's code as a prefix, and a prefix is a contiguous range of the sorted
+index. A box is answered by covering it with cells, turning each run of
+neighbouring cells into one range (geo_cell >= low AND geo_cell < high), and
+post-filtering the candidates on exact coordinates (haversine for radii).
+
+The cell size is picked per query: the finest precision whose cover of the
+box needs at most max_cells cells, so small boxes scan little more than the
+box itself and large boxes stay a handful of ranges.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+# Geohash base32 alphabet, in sort order
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Characters stored per pub (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_M = 6371008.8
+
+# (south, west, north, east) in degrees
+BBox = Tuple[float, float, float, float]
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Geohash of a point.
+
+    Args:
+        lat: Latitude in degrees
+        lng: Longitude in degrees
+        precision: Characters in the code
+
+    Returns:
+        Geohash string
+    """
+    lat_low, lat_high = -90.0, 90.0
+    lng_low, lng_high = -180.0, 180.0
+    code = []
+    bits, value, even = 0, 0, True
+
+    while len(code) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        if even:
+            middle = (lng_low + lng_high) / 2
+            if lng >= middle:
+                value = value << 1 | 1
+                lng_low = middle
+            else:
+                value <<= 1
+                lng_high = middle
+        else:
+            middle = (lat_low + lat_high) / 2
+            if lat >= middle:
+                value = value << 1 | 1
+                lat_low = middle
+            else:
+                value <<= 1
+                lat_high = middle
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[value])
+            bits, value = 0, 0
+
+    return ''.join(code)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell at this precision."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _next_prefix(prefix: str) -> Optional[str]:
+    """Smallest geohash greater than every code starting with prefix (None if there is none)."""
+    while prefix:
+        index = BASE32.index(prefix[-1])
+        if index < len(BASE32) - 1:
+            return prefix[:-1] + BASE32[index + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def _covering_cells(south: float, west: float, north: float, east: float,
+                    max_cells: int, max_precision: int) -> List[str]:
+    """Geohash cells covering a box that does not cross the antimeridian."""
+    precision = 1
+    for candidate in range(max_precision, 0, -1):
+        height, width = cell_size(candidate)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns <= max_cells:
+            precision = candidate
+            break
+
+    height, width = cell_size(precision)
+    cells = set()
+    row = math.floor(south / height)
+    while row * height <= north:
+        # Centre of the cell row, kept inside the valid range
+        lat = min(max((row + 0.5) * height, -90.0), 90.0)
+        column = math.floor(west / width)
+        while column * width <= east:
+            lng = min(max((column + 0.5) * width, -180.0), 180.0)
+            cells.add(encode_geohash(lat, lng, precision))
+            column += 1
+        row += 1
+    return sorted(cells)
+
+
+def cell_ranges(bbox: BBox, max_cells: int = 32,
+                max_precision: int = GEOHASH_PRECISION) -> List[Tuple[str, Optional[str]]]:
+    """
+    Index ranges of geohashes covering a box.
+
+    Args:
+        bbox: (south, west, north, east); west > east crosses the antimeridian
+        max_cells: Most cells the box may be covered with, per side of the antimeridian
+        max_precision: Finest precision to use (the stored precision)
+
+    Returns:
+        Sorted list of (low, high) with every covered geohash in
+        low <= code < high; high is None for a range open to the end
+    """
+    south, west, north, east = bbox
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west <= east:
+        boxes = [(south, west, north, east)]
+    else:
+        boxes = [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+    cells = sorted({cell for box in boxes for cell in _covering_cells(*box, max_cells, max_precision)})
+
+    # Cells whose ranges touch (a cell followed by its successor) merge into one range
+    ranges = []
+    for cell in cells:
+        high = _next_prefix(cell)
+        if ranges and (ranges[-1][1] is None or ranges[-1][1] >= cell):
+            low, previous_high = ranges[-1]
+            if previous_high is not None and (high is None or high > previous_high):
+                ranges[-1] = (low, high)
+        else:
+            ranges.append((cell, high))
+    return ranges
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat: float, lng: float, radius_m: float) -> BBox:
+    """
+    Box containing every point within radius_m of (lat, lng).
+
+    Near the poles the box spans all longitudes.
+    """
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    south, north = lat - d_lat, lat + d_lat
+    if south <= -90.0 or north >= 90.0:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+
+    d_lng = math.degrees(radius_m / (EARTH_RADIUS_M * math.cos(math.radians(lat))))
+    if d_lng >= 180.0:
+        return south, -180.0, north, 180.0
+    west, east = lng - d_lng, lng + d_lng
+    # Wrap across the antimeridian (west > east)
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def parse_bbox(raw: str) -> BBox:
+    """
+    Parse a 'west,south,east,north' bbox parameter (GeoJSON order).
+
+    Args:
+        raw: e.g. '-6.30,53.33,-6.24,53.36'
+
+    Returns:
+        (south, west, north, east)
+
+    Raises:
+        ValueError: If the box is malformed or out of range
+    """
+    try:
+        west, south, east, north = (float(value) for value in raw.split(','))
+    except ValueError:
+        raise ValueError('bbox must be four numbers: west,south,east,north')
+    if not all(math.isfinite(value) for value in (west, south, east, north)):
+        raise ValueError('bbox values must be finite')
+    if not (-90.0 <= south <= north <= 90.0):
+        raise ValueError('bbox latitudes must satisfy -90 <= south <= north <= 90')
+    if not (-180.0 <= west <= 180.0 and -180.0 <= east <= 180.0):
+        raise ValueError('bbox longitudes must be within -180..180')
+    return south, west, north, east
@@ -0,0 +1,323 @@
+"""
+Memory-Bounded Image Loading
+Decodes uploads at the resolution each step actually needs.
+
+A 12MP phone photo is ~36 MB of BGR pixels, but the pipeline only needs:
+
+- the dimensions (read from the JPEG/PNG/WebP header, no decode)
+- an upload-sized preview for Roboflow (decoded with IMREAD_REDUCED_*, which
+  lets libjpeg skip most of the IDCT work and never materializes the full image)
+- the G-logo region at full resolution (decoded on demand after the workflow
+  call; only the small crop is kept)
+
+Every decode reserves its pixel buffer against a per-process DecodeBudget, so
+a burst of concurrent uploads waits for memory instead of multiplying it.
+An image whose header could not be read reserves the whole budget, since its
+decoded size is only known afterwards.
+"""
+
+import logging
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# IMREAD_REDUCED_* flag per downscale factor (largest first)
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+def _jpeg_exif_orientation(segment: bytes) -> int:
+    """Orientation tag (1-8) from an APP1 Exif segment body, 1 if absent."""
+    if not segment.startswith(b'Exif\x00\x00') or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None:
+        return 1
+    try:
+        ifd_offset = struct.unpack_from(endian + 'I', tiff, 4)[0]
+        count = struct.unpack_from(endian + 'H', tiff, ifd_offset)[0]
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag, _type, _count, value = struct.unpack_from(endian + 'HHIH', tiff, entry)
+            if tag == _EXIF_ORIENTATION_TAG:
+                return value if 1 <= value <= 8 else 1
+    except struct.error:
+        pass
+    return 1
+
+
+def _jpeg_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    size = None
+    orientation = 1
+    pos = 2
+    end = len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):  # End of image / start of scan
+            break
+
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        if marker == 0xE1 and orientation == 1:
+            orientation = _jpeg_exif_orientation(bytes(data[pos + 4:pos + 2 + length]))
+        elif marker in _JPEG_SOF_MARKERS and pos + 9 <= end:
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            size = (width, height)
+            break
+        pos += 2 + length
+
+    if size is None:
+        return None
+    # cv2.imdecode applies the EXIF rotation; orientations 5-8 swap the axes
+    return (size[1], size[0]) if orientation >= 5 else size
+
+
+def _png_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    if len(data) < 24 or bytes(data[12:16]) != b'IHDR':
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def _webp_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    if len(data) < 30:
+        return None
+    chunk = bytes(data[12:16])
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and data[20] == 0x2F:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def read_image_size(data) -> Optional[Tuple[int, int]]:
+    """
+    Read image dimensions from the encoded header without decoding.
+
+    JPEG sizes account for EXIF orientation, matching what cv2.imdecode returns.
+
+    Args:
+        data: Encoded image (bytes, bytearray or memoryview)
+
+    Returns:
+        Tuple of (width, height), or None for unknown formats / corrupt headers
+    """
+    data = memoryview(data).cast('B')
+    try:
+        if bytes(data[:2]) == b'\xff\xd8':
+            return _jpeg_size(data)
+        if bytes(data[:8]) == b'\x89PNG\r\n\x1a\n':
+            return _png_size(data)
+        if bytes(data[:4]) == b'RIFF' and bytes(data[8:12]) == b'WEBP':
+            return _webp_size(data)
+    except (IndexError, struct.error, ValueError):
+        return None
+    return None
+
+
+class DecodeBudget:
+    """Counting semaphore over bytes of decoded pixels held by in-flight decodes."""
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: Decoded bytes allowed at once; a single decode larger
+                than this still runs, but only when nothing else is reserved
+        """
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        """Hold nbytes of the budget for the duration of the block."""
+        with self._cond:
+            if self.in_use and self.in_use + nbytes > self.max_bytes:
+                self.waits += 1
+                self._cond.wait_for(lambda: not self.in_use or self.in_use + nbytes <= self.max_bytes)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Budget size, bytes reserved now, peak reservation and waits."""
+        with self._cond:
+            return {
+                'budget_bytes': self.max_bytes,
+                'in_use_bytes': self.in_use,
+                'peak_bytes': self.peak,
+                'waits': self.waits,
+            }
+
+
+class SourceImage:
+    """An encoded upload whose pixels are decoded on demand."""
+
+    def __init__(self, data: memoryview, budget: DecodeBudget):
+        self.data = data
+        self.budget = budget
+        size = read_image_size(data)
+        self.width, self.height = size if size else (None, None)
+
+    @property
+    def header_ok(self) -> bool:
+        """True when the dimensions were read from the header."""
+        return self.width is not None
+
+    def reduction_for(self, min_dimension: int) -> Tuple[int, int]:
+        """
+        Largest power-of-two reduction whose longest side still exceeds min_dimension.
+
+        Returns:
+            Tuple of (factor, cv2.imdecode flags); (1, IMREAD_COLOR) when the
+            image is already small or its size is unknown
+        """
+        if self.header_ok:
+            longest = max(self.width, self.height)
+            for factor, flags in REDUCED_FLAGS:
+                if longest / factor > min_dimension:
+                    return factor, flags
+        return 1, cv2.IMREAD_COLOR
+
+    def decoded_bytes(self, factor: int = 1) -> int:
+        """Size of a BGR decode at 1/factor scale (the whole budget when the size is unknown)."""
+        if not self.header_ok:
+            return self.budget.max_bytes
+        return self.width * self.height * 3 // (factor * factor)
+
+    def _decode(self, flags: int) -> Optional[np.ndarray]:
+        return cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), flags)
+
+    @contextmanager
+    def preview(self, min_dimension: int) -> Iterator[Tuple[Optional[np.ndarray], float]]:
+        """
+        Decode the smallest power-of-two reduction whose longest side still
+        exceeds min_dimension (the full image if it is already small).
+
+        The decoded pixels count against the budget until the block exits;
+        don't keep references to the image past it.
+
+        Args:
+            min_dimension: Longest side the caller will resize down to
+
+        Yields:
+            Tuple of (BGR image or None if undecodable, scale from preview
+            to full-resolution coordinates along the vertical axis)
+        """
+        factor, flags = self.reduction_for(min_dimension)
+        full_bytes = self.decoded_bytes()
+        with self.budget.reserve(self.decoded_bytes(factor)):
+            image = self._decode(flags)
+            if image is None:
+                yield None, 1.0
+                return
+
+            preview_height, preview_width = image.shape[:2]
+            if factor == 1:
+                self.width, self.height = preview_width, preview_height
+                yield image, 1.0
+                return
+
+            # Reduced decodes round each side up; anything else means the
+            # header disagreed with the decoder about the orientation
+            if (abs(-(-self.height // factor) - preview_height) <= 1
+                    and abs(-(-self.width // factor) - preview_width) <= 1):
+                yield image, self.height / preview_height
+                return
+
+        logger.warning(f"Header size {self.width}x{self.height} does not match reduced decode "
+                       f"{preview_width}x{preview_height}; decoding at full resolution")
+        del image
+        with self.budget.reserve(full_bytes):
+            image = self._decode(cv2.IMREAD_COLOR)
+            if image is not None:
+                self.height, self.width = image.shape[:2]
+            yield image, 1.0
+
+    def crop(self, offset_x: int, offset_y: int, width: int, height: int) -> Optional[np.ndarray]:
+        """
+        Cut a region out of the full-resolution image.
+
+        The full image is decoded inside the budget and released as soon as
+        the region is copied out.
+
+        Args:
+            offset_x: Left edge in full-resolution pixels
+            offset_y: Top edge
+            width: Region width
+            height: Region height
+
+        Returns:
+            Contiguous BGR crop (clipped to the image), or None if undecodable
+        """
+        with self.budget.reserve(self.decoded_bytes()):
+            image = self._decode(cv2.IMREAD_COLOR)
+            if image is None:
+                return None
+            self.height, self.width = image.shape[:2]
+            crop = image[offset_y:offset_y + height, offset_x:offset_x + width].copy()
+            del image
+        return crop
+
+
+class ImageLoader:
+    """Opens uploads as SourceImages sharing one decode budget."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget = DecodeBudget(budget_bytes)
+
+    @classmethod
+    def from_config(cls, config) -> 'ImageLoader':
+        """Build a loader from IMAGE_DECODE_BUDGET_MB."""
+        return cls(int(config.IMAGE_DECODE_BUDGET_MB * 1024 * 1024))
+
+    def open(self, data) -> SourceImage:
+        """
+        Wrap encoded image bytes without decoding them.
+
+        Args:
+            data: Encoded image (bytes, bytearray or memoryview)
+
+        Returns:
+            SourceImage
+        """
+        return SourceImage(memoryview(data).cast('B'), self.budget)
+
+    def stats(self) -> Dict:
+        """Decode budget counters."""
+        return self.budget.stats()
@@ -0,0 +1,151 @@
+"""
+Image Preprocessing for Roboflow Uploads
+Downscales and re-encodes phone photos before they are base64-encoded into
+the workflow request, and maps the returned predictions back to the
+full-resolution image so G-logo crops still line up with the original.
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FORMATS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+def upload_max_dimension(config) -> int:
+    """
+    Longest side sent to Roboflow, clamped to the configured image size limits.
+
+    Args:
+        config: Configuration class (see config.Config)
+
+    Returns:
+        Maximum width/height in pixels
+    """
+    return max(config.MIN_IMAGE_SIZE, min(config.ROBOFLOW_MAX_DIMENSION, config.MAX_IMAGE_SIZE))
+
+
+def prepare_upload(image: np.ndarray, image_bytes: bytes, max_dimension: int,
+                   upload_format: str = 'jpeg', quality: int = 85) -> Tuple[bytes, float]:
+    """
+    Shrink an image for upload if its longest side exceeds max_dimension.
+
+    Args:
+        image: Decoded BGR image
+        image_bytes: Original encoded bytes (returned untouched when no resize is needed)
+        max_dimension: Longest side allowed in the upload
+        upload_format: 'jpeg' or 'webp'
+        quality: Encoder quality (0-100)
+
+    Returns:
+        Tuple of (encoded bytes to upload, scale factor from upload to original coordinates)
+    """
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if longest <= max_dimension:
+        return image_bytes, 1.0
+
+    ratio = max_dimension / longest
+    resized = cv2.resize(
+        image,
+        (max(1, round(width * ratio)), max(1, round(height * ratio))),
+        interpolation=cv2.INTER_AREA
+    )
+
+    extension, quality_flag = UPLOAD_FORMATS[upload_format]
+    ok, encoded = cv2.imencode(extension, resized, [quality_flag, quality])
+    if not ok:
+        logger.warning(f"Failed to re-encode upload as {upload_format}, sending original bytes")
+        return image_bytes, 1.0
+
+    # Scale per axis can differ by a rounding pixel; use height since every
+    # score is computed along the vertical axis
+    scale = height / resized.shape[0]
+    return encoded.tobytes(), scale
+
+
+def prepare_source_upload(source, max_dimension: int, upload_format: str = 'jpeg',
+                          quality: int = 85) -> Optional[Dict]:
+    """
+    Decode a reduced preview of a SourceImage and encode it for upload.
+
+    Args:
+        source: image_loader.SourceImage
+        max_dimension: Longest side allowed in the upload
+        upload_format: 'jpeg' or 'webp'
+        quality: Encoder quality (0-100)
+
+    Returns:
+        Dictionary with 'upload' (bytes to send; source.data itself when the
+        original is small enough), 'scale' (upload to full-resolution
+        coordinates), 'preview_shape', 'decode_seconds' and
+        'encode_seconds', or None if the image can't be decoded
+    """
+    started = time.perf_counter()
+    with source.preview(max_dimension) as (preview, preview_scale):
+        decoded = time.perf_counter()
+        if preview is None:
+            return None
+        upload, upload_scale = prepare_upload(preview, source.data, max_dimension, upload_format, quality)
+        return {
+            'upload': upload,
+            'scale': upload_scale * preview_scale,
+            'preview_shape': preview.shape,
+            'decode_seconds': decoded - started,
+            'encode_seconds': time.perf_counter() - decoded,
+        }
+
+
+def _scale_model_result(model_result: Dict, scale: float):
+    """Scale one model result (image size, boxes, crop origins) in place."""
+    # Image sizes stay fractional so normalised positions (y / height) are
+    # unchanged by the round trip; callers round when slicing pixels
+    image_info = model_result.get('image')
+    if isinstance(image_info, dict):
+        for key in ('width', 'height'):
+            if key in image_info:
+                image_info[key] = image_info[key] * scale
+
+    for pred in model_result.get('predictions', []) or []:
+        for key in ('x', 'y', 'width', 'height'):
+            if key in pred:
+                pred[key] = pred[key] * scale
+
+        parent_origin = pred.get('parent_origin')
+        if isinstance(parent_origin, dict):
+            for key in ('offset_x', 'offset_y', 'width', 'height'):
+                if key in parent_origin:
+                    parent_origin[key] = int(round(parent_origin[key] * scale))
+
+
+def rescale_workflow_outputs(outputs: Dict, scale: float) -> Dict:
+    """
+    Map Model 1 and Model 2 coordinates from the uploaded image back to the original.
+
+    Args:
+        outputs: Parsed workflow outputs (modified in place)
+        scale: Factor returned by prepare_upload
+
+    Returns:
+        The same outputs dictionary
+    """
+    if scale == 1.0:
+        return outputs
+
+    pint_results = outputs.get('pint results')
+    if isinstance(pint_results, dict):
+        _scale_model_result(pint_results, scale)
+
+    for split_result in outputs.get('split_results', []) or []:
+        if isinstance(split_result, dict):
+            _scale_model_result(split_result, scale)
+
+    return outputs
@@ -0,0 +1,470 @@
+"""
+Analysis Job Queue
+Runs /analyze-split jobs on a local worker pool so the request thread can
+return a job id immediately.
+
+No external broker is needed: jobs live either in process memory or in a
+SQLite file. The SQLite store lets every gunicorn worker claim jobs from,
+and report status for, the same queue. A claimed SQLite job is leased: it
+keeps its image until it finishes, and a job whose lease runs out (its worker
+died mid-analysis) is queued again, up to max_attempts claims.
+
+Each job carries the image plus a JSON-serializable dict of options that is
+passed to the handler as keyword arguments.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+# (job_id, image_bytes, image_name, submitted_at, options) handed to a worker
+ClaimedJob = Tuple[str, bytes, Optional[str], float, Dict[str, Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at max depth."""
+
+
+class MemoryJobStore:
+    """Job store for a single process."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._pending = deque()
+        self._cond = threading.Condition()
+
+    def put(self, job_id: str, image_bytes: bytes, image_name: Optional[str],
+            submitted_at: float, max_depth: int, options: Optional[Dict] = None):
+        with self._cond:
+            if len(self._pending) >= max_depth:
+                raise QueueFullError()
+
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'submitted_at': submitted_at,
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None,
+                '_payload': (image_bytes, image_name, dict(options or {})),
+            }
+            self._pending.append(job_id)
+            self._cond.notify()
+
+    def claim(self, timeout: float) -> Optional[ClaimedJob]:
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+
+            job = self._jobs[self._pending.popleft()]
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            image_bytes, image_name, options = job.pop('_payload')
+            return job['job_id'], image_bytes, image_name, job['submitted_at'], options
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def prune(self, finished_before: float):
+        with self._cond:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished_at'] is not None and job['finished_at'] < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore:
+    """Job store shared between processes through a SQLite file."""
+
+    def __init__(self, path: str, poll_interval: float = 0.2, lease_seconds: float = 300,
+                 max_attempts: int = 3):
+        """
+        Open (and create if needed) a queue file.
+
+        Args:
+            path: SQLite file path
+            poll_interval: Seconds between polls while waiting for a job
+            lease_seconds: How long a claimed job may run before it is
+                considered abandoned and queued again
+            max_attempts: Claims per job; an abandoned job that has used them
+                all is marked failed instead of queued again
+        """
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_jobs ('
+                ' job_id TEXT PRIMARY KEY,'
+                ' status TEXT NOT NULL,'
+                ' image BLOB,'
+                ' image_name TEXT,'
+                ' options TEXT,'
+                ' result TEXT,'
+                ' error TEXT,'
+                ' submitted_at REAL NOT NULL,'
+                ' started_at REAL,'
+                ' finished_at REAL,'
+                ' lease_expires_at REAL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_analysis_jobs_status_submitted '
+                'ON analysis_jobs (status, submitted_at)'
+            )
+            # Queue files created before jobs carried options
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(analysis_jobs)')}
+            if 'options' not in columns:
+                conn.execute('ALTER TABLE analysis_jobs ADD COLUMN options TEXT')
+            # ... and before claims were leased
+            if 'lease_expires_at' not in columns:
+                conn.execute('ALTER TABLE analysis_jobs ADD COLUMN lease_expires_at REAL')
+                conn.execute('ALTER TABLE analysis_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+                # Their running jobs already lost their image and cannot be retried
+                conn.execute(
+                    "UPDATE analysis_jobs SET status = 'failed', error = 'Analysis abandoned', "
+                    "finished_at = ? WHERE status = 'running'", (time.time(),)
+                )
+
+            conn.execute('BEGIN IMMEDIATE')
+            self._requeue_expired(conn)
+            conn.execute('COMMIT')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def _requeue_expired(self, conn):
+        """Queue running jobs whose lease ran out again (inside the caller's transaction)."""
+        now = time.time()
+        conn.execute(
+            "UPDATE analysis_jobs SET status = 'failed', error = 'Analysis abandoned', "
+            'image = NULL, finished_at = ?, lease_expires_at = NULL '
+            "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+            (now, now, self.max_attempts)
+        )
+        conn.execute(
+            "UPDATE analysis_jobs SET status = 'queued', started_at = NULL, lease_expires_at = NULL "
+            "WHERE status = 'running' AND lease_expires_at < ?", (now,)
+        )
+
+    def put(self, job_id: str, image_bytes: bytes, image_name: Optional[str],
+            submitted_at: float, max_depth: int, options: Optional[Dict] = None):
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so the depth check and
+            # insert are atomic across processes
+            conn.execute('BEGIN IMMEDIATE')
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+            if depth >= max_depth:
+                conn.execute('ROLLBACK')
+                raise QueueFullError()
+
+            conn.execute(
+                'INSERT INTO analysis_jobs (job_id, status, image, image_name, options, submitted_at) '
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, bytes(image_bytes), image_name, json.dumps(options or {}), submitted_at)
+            )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def claim(self, timeout: float) -> Optional[ClaimedJob]:
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                self._requeue_expired(conn)
+                row = conn.execute(
+                    'SELECT job_id, image, image_name, submitted_at, options FROM analysis_jobs '
+                    "WHERE status = 'queued' ORDER BY submitted_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    # The image stays until finish so an abandoned job can run again
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE analysis_jobs SET status = 'running', started_at = ?, "
+                        'lease_expires_at = ?, attempts = attempts + 1 WHERE job_id = ?',
+                        (now, now + self.lease_seconds, row[0])
+                    )
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+
+            if row is not None:
+                return row[0], row[1], row[2], row[3], json.loads(row[4]) if row[4] else {}
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE analysis_jobs SET status = ?, result = ?, error = ?, finished_at = ?, '
+                'image = NULL, lease_expires_at = NULL WHERE job_id = ?',
+                (status, json.dumps(result, default=str) if result is not None else None,
+                 error, time.time(), job_id)
+            )
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT job_id, status, result, error, submitted_at, started_at, finished_at '
+                'FROM analysis_jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'status': row[1],
+            'result': json.loads(row[2]) if row[2] is not None else None,
+            'error': row[3],
+            'submitted_at': row[4],
+            'started_at': row[5],
+            'finished_at': row[6],
+        }
+
+    def depth(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def prune(self, finished_before: float):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'DELETE FROM analysis_jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                (finished_before,)
+            )
+        finally:
+            conn.close()
+
+
+class AnalysisJobQueue:
+    """Bounded job queue drained by a pool of worker threads."""
+
+    def __init__(self, store, handler: Callable[..., Dict],
+                 workers: int = 4, max_depth: int = 100, job_ttl_seconds: float = 3600,
+                 wait_window: int = 512):
+        """
+        Initialize the queue. Worker threads start on the first submit.
+
+        Args:
+            store: MemoryJobStore or SQLiteJobStore
+            handler: Called as handler(image_bytes, image_name, **options) and
+                returns the analysis result; results containing 'error' mark
+                the job failed
+            workers: Number of worker threads in this process
+            max_depth: Queued (not yet running) jobs allowed before rejecting
+            job_ttl_seconds: How long finished jobs stay queryable
+            wait_window: Number of recent queue wait times kept for stats
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.job_ttl_seconds = job_ttl_seconds
+
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=wait_window)
+        self._last_prune = time.monotonic()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, image_bytes: bytes, image_name: Optional[str] = None,
+               options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Queue an image for analysis.
+
+        Args:
+            image_bytes: Encoded image bytes
+            image_name: Name used for debug artifacts
+            options: Keyword arguments for the handler (must be JSON-serializable)
+
+        Returns:
+            Job id
+
+        Raises:
+            QueueFullError: The queue already holds max_depth pending jobs
+        """
+        self._ensure_started()
+
+        job_id = str(uuid.uuid4())
+        try:
+            self.store.put(job_id, image_bytes, image_name, time.time(), self.max_depth, options)
+        except QueueFullError:
+            with self._stats_lock:
+                self.rejected += 1
+            raise
+
+        with self._stats_lock:
+            self.submitted += 1
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job.
+
+        Returns:
+            Dictionary with status, timestamps and result/error, or None if unknown
+        """
+        job = self.store.get(job_id)
+        if job is not None and job['started_at'] is not None:
+            job['queue_wait_seconds'] = round(job['started_at'] - job['submitted_at'], 4)
+        return job
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f'gsplit-job-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker_loop(self):
+        while True:
+            try:
+                claimed = self.store.claim(timeout=1.0)
+                if claimed is None:
+                    self._maybe_prune()
+                    continue
+
+                job_id, image_bytes, image_name, submitted_at, options = claimed
+                with self._stats_lock:
+                    self._waits.append(max(0.0, time.time() - submitted_at))
+
+                self._run_job(job_id, image_bytes, image_name, options)
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                time.sleep(1.0)
+
+    def _run_job(self, job_id: str, image_bytes: bytes, image_name: Optional[str],
+                 options: Dict[str, Any]):
+        try:
+            result = self.handler(image_bytes, image_name, **options)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            result = {'error': 'Analysis failed', 'message': str(e)}
+
+        if 'error' in result:
+            self.store.finish(job_id, 'failed', result=result, error=result['error'])
+            with self._stats_lock:
+                self.failed += 1
+        else:
+            self.store.finish(job_id, 'done', result=result)
+            with self._stats_lock:
+                self.completed += 1
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        self.store.prune(time.time() - self.job_ttl_seconds)
+
+    def stats(self) -> Dict:
+        """
+        Queue depth, throughput counters and queue wait percentiles (seconds).
+        """
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            counters = {
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+        return dict(
+            counters,
+            backend=type(self.store).__name__,
+            depth=self.store.depth(),
+            max_depth=self.max_depth,
+            workers=self.workers,
+            wait_p50=round(percentile(waits, 0.50), 4),
+            wait_p95=round(percentile(waits, 0.95), 4),
+            wait_max=round(waits[-1], 4) if waits else 0.0,
+        )
+
+
+def create_job_queue(config, handler: Callable[..., Dict]) -> AnalysisJobQueue:
+    """
+    Build the job queue described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+        handler: Function that analyzes one image
+
+    Returns:
+        AnalysisJobQueue
+    """
+    if config.ASYNC_QUEUE_BACKEND == 'memory':
+        store = MemoryJobStore()
+    elif config.ASYNC_QUEUE_BACKEND == 'sqlite':
+        store = SQLiteJobStore(config.ASYNC_QUEUE_PATH, lease_seconds=config.ASYNC_JOB_LEASE_SECONDS)
+    else:
+        raise ValueError(f"Unknown ASYNC_QUEUE_BACKEND: {config.ASYNC_QUEUE_BACKEND}")
+
+    return AnalysisJobQueue(
+        store, handler,
+        workers=config.ASYNC_WORKERS,
+        max_depth=config.ASYNC_QUEUE_MAX_DEPTH,
+        job_ttl_seconds=config.ASYNC_JOB_TTL_SECONDS
+    )
@@ -0,0 +1,219 @@
+"""
+Load-Aware Feature Shedding
+Turns off optional analysis work when a worker is overloaded, so the score
+itself keeps its latency.
+
+The governor watches three signals:
+
+- analyses in flight in this process
+- async job queue depth
+- p95 analysis latency over a recent window
+
+Each signal has one threshold per shed level. The level is the highest one
+any signal has reached. Levels are cumulative:
+
+    1  SHED_DEBUG_ARTIFACTS  no debug crops or visualisations are queued
+    2  SHED_AI_ROASTS        feedback comes from the static roast bank only
+    3  SHED_DEBUG_INFO       responses drop debug_info, even with ?debug=1
+
+Stepping up is immediate. Stepping down needs hysteresis: every signal must
+be below recovery_ratio times its threshold for the current level, and stay
+there for the cooldown. The level then drops by one step.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+SHED_NONE = 0
+SHED_DEBUG_ARTIFACTS = 1
+SHED_AI_ROASTS = 2
+SHED_DEBUG_INFO = 3
+
+LEVEL_NAMES = {
+    SHED_NONE: 'none',
+    SHED_DEBUG_ARTIFACTS: 'debug_artifacts',
+    SHED_AI_ROASTS: 'ai_roasts',
+    SHED_DEBUG_INFO: 'debug_info',
+}
+MAX_LEVEL = SHED_DEBUG_INFO
+
+
+def _level_for(value: float, thresholds: Sequence[float]) -> int:
+    """Highest level whose threshold value has reached (0 if none)."""
+    level = SHED_NONE
+    for index, threshold in enumerate(thresholds[:MAX_LEVEL]):
+        if value >= threshold:
+            level = index + 1
+    return level
+
+
+class LoadGovernor:
+    """Per-process shed level driven by in-flight count, queue depth and latency."""
+
+    def __init__(self, in_flight_thresholds: Sequence[float],
+                 queue_depth_thresholds: Sequence[float],
+                 latency_thresholds: Sequence[float],
+                 recovery_ratio: float = 0.7, cooldown: float = 10.0,
+                 latency_window: float = 30.0, eval_interval: float = 0.5,
+                 queue_depth: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            in_flight_thresholds: Analyses in flight that start levels 1, 2 and 3
+            queue_depth_thresholds: Pending async jobs that start levels 1, 2 and 3
+            latency_thresholds: p95 analysis seconds that start levels 1, 2 and 3
+            recovery_ratio: A signal counts as recovered below this fraction
+                of its threshold for the current level
+            cooldown: Seconds every signal must stay recovered before the
+                level drops a step
+            latency_window: Seconds of analysis latencies the p95 covers
+            eval_interval: Least seconds between re-evaluations (the queue
+                depth may be a database query)
+            queue_depth: Callable returning the async queue depth (set later
+                by the app once the queue exists)
+        """
+        self.in_flight_thresholds = tuple(in_flight_thresholds)
+        self.queue_depth_thresholds = tuple(queue_depth_thresholds)
+        self.latency_thresholds = tuple(latency_thresholds)
+        self.recovery_ratio = recovery_ratio
+        self.cooldown = cooldown
+        self.latency_window = latency_window
+        self.eval_interval = eval_interval
+        self.queue_depth = queue_depth
+
+        self.level = SHED_NONE
+        self.in_flight = 0
+        self._latencies = deque(maxlen=1024)  # (finished_at, seconds)
+        self._recovered_since = None
+        self._last_eval = 0.0
+        self._signals = {'in_flight': 0, 'queue_depth': 0, 'latency_p95': 0.0}
+        self._lock = threading.Lock()
+
+        self.transitions = 0
+        self.shed = {name: 0 for level, name in LEVEL_NAMES.items() if level}
+
+    @contextmanager
+    def track(self):
+        """Count an analysis as in flight and record its latency."""
+        started = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+        self._maybe_evaluate(started)
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.in_flight -= 1
+                self._latencies.append((finished, finished - started))
+
+    def sheds(self, level: int) -> bool:
+        """
+        Whether the feature shed at this level is currently off.
+
+        Counts each shed decision for stats.
+
+        Args:
+            level: One of SHED_DEBUG_ARTIFACTS, SHED_AI_ROASTS, SHED_DEBUG_INFO
+
+        Returns:
+            True when the feature should be skipped
+        """
+        self._maybe_evaluate(time.monotonic())
+        if self.level < level:
+            return False
+        with self._lock:
+            self.shed[LEVEL_NAMES[level]] += 1
+        return True
+
+    def current_level(self) -> int:
+        """The shed level, re-evaluated if the last evaluation is stale."""
+        self._maybe_evaluate(time.monotonic())
+        return self.level
+
+    def _maybe_evaluate(self, now: float):
+        if now - self._last_eval < self.eval_interval:
+            return
+        queue_depth = self.queue_depth() if self.queue_depth is not None else 0
+        with self._lock:
+            if now - self._last_eval < self.eval_interval:
+                return
+            self._last_eval = now
+            self._evaluate(now, queue_depth)
+
+    def _evaluate(self, now: float, queue_depth: int):
+        """Recompute the level from the current signals (lock held)."""
+        while self._latencies and self._latencies[0][0] < now - self.latency_window:
+            self._latencies.popleft()
+        latency_p95 = percentile(sorted(seconds for _, seconds in self._latencies), 0.95)
+        self._signals = {'in_flight': self.in_flight, 'queue_depth': queue_depth,
+                         'latency_p95': latency_p95}
+
+        signals = (
+            (self.in_flight, self.in_flight_thresholds),
+            (queue_depth, self.queue_depth_thresholds),
+            (latency_p95, self.latency_thresholds),
+        )
+        target = max(_level_for(value, thresholds) for value, thresholds in signals)
+
+        if target > self.level:
+            self._set_level(target)
+            self._recovered_since = None
+            return
+        if self.level == SHED_NONE:
+            return
+
+        # Step down only once every signal is well clear of the threshold
+        # that holds the current level, and has stayed clear for the cooldown
+        recovered = all(
+            len(thresholds) < self.level or value < thresholds[self.level - 1] * self.recovery_ratio
+            for value, thresholds in signals
+        )
+        if not recovered:
+            self._recovered_since = None
+        elif self._recovered_since is None:
+            self._recovered_since = now
+        elif now - self._recovered_since >= self.cooldown:
+            self._set_level(self.level - 1)
+            self._recovered_since = now if self.level else None
+
+    def _set_level(self, level: int):
+        logger.warning(f"Shed level {self.level} -> {level} ({LEVEL_NAMES[level]}), signals {self._signals}")
+        self.level = level
+        self.transitions += 1
+
+    def stats(self) -> Dict:
+        """Current level, the signals it was computed from, transitions and shed counts."""
+        with self._lock:
+            stats = {'level': self.level, 'transitions': self.transitions}
+            stats.update(self._signals)
+            stats.update({f'shed_{name}': count for name, count in self.shed.items()})
+            return stats
+
+
+def create_load_governor(config) -> Optional[LoadGovernor]:
+    """
+    Build the load governor described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+
+    Returns:
+        LoadGovernor, or None if LOAD_SHED_ENABLED is off
+    """
+    if not config.LOAD_SHED_ENABLED:
+        return None
+    return LoadGovernor(
+        config.LOAD_SHED_IN_FLIGHT,
+        config.LOAD_SHED_QUEUE_DEPTH,
+        config.LOAD_SHED_LATENCY_P95,
+        recovery_ratio=config.LOAD_SHED_RECOVERY_RATIO,
+        cooldown=config.LOAD_SHED_COOLDOWN_SECONDS,
+    )
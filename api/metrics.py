@@ -0,0 +1,247 @@
+"""
+Metrics for the Guinness Split the G API
+Minimal in-process counters and histograms rendered in the Prometheus text
+exposition format at /metrics.
+
+Each gunicorn worker keeps its own registry; Prometheus scrapes and sums
+them per instance.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; covers sub-millisecond decode stages up to slow Roboflow calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2]))
+                           for key, series in self._series.items())
+
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+# A collector returns (name, help, [(labels_dict, value), ...]) gauge families
+Collector = Callable[[], Iterable[Tuple[str, str, Iterable[Tuple[Dict, float]]]]]
+
+
+class MetricsRegistry:
+    """Holds metrics and gauge collectors and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector):
+        """Register a callable producing gauge values at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            for name, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} gauge')
+                for labels, value in samples:
+                    label_str = _format_labels(list(labels), list(labels.values()))
+                    lines.append(f'{name}{label_str} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'gsplit_analysis_stage_seconds',
+    'Time spent in each stage of analyze_guinness_split',
+    ['stage']
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'gsplit_http_requests_total',
+    'HTTP requests by route, method and status',
+    ['route', 'method', 'status']
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'gsplit_http_request_seconds',
+    'HTTP request latency by route',
+    ['route', 'method']
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'gsplit_db_query_seconds',
+    'Database query latency by statement type',
+    ['statement']
+)
+
+
+def timed_stage(stage: str):
+    """Context manager recording one analysis stage duration."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def observe_stage(stage: str, started: float):
+    """Record an analysis stage that began at time.perf_counter() == started."""
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_stage(stage: str, seconds: float):
+    """Record an analysis stage timed elsewhere (e.g. in a worker process)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def instrument_sqlalchemy(engine):
+    """
+    Time every query executed on an SQLAlchemy engine.
+
+    Args:
+        engine: sqlalchemy Engine
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('gsplit_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['gsplit_query_start'].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement=verb)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('gsplit_query_start'):
+            connection.info['gsplit_query_start'].pop()
+
+
+def stats_collector(prefix: str, stats_fn: Callable[[], Dict], documentation: str) -> Collector:
+    """
+    Expose the numeric fields of a stats() dictionary as gauges.
+
+    Args:
+        prefix: Metric name prefix, e.g. 'gsplit_analysis_cache'
+        stats_fn: Callable returning a flat dictionary of stats
+        documentation: Help text prefix
+
+    Returns:
+        Collector for MetricsRegistry.add_collector
+    """
+    def collect():
+        families = []
+        for key, value in (stats_fn() or {}).items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            families.append((f'{prefix}_{key}', f'{documentation}: {key}', [({}, value)]))
+        return families
+
+    return collect
@@ -1,7 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime
 import uuid
 
+from geo import GEOHASH_PRECISION, encode_geohash
+
 db = SQLAlchemy()
 
 class Pub(db.Model):
@@ -13,6 +16,8 @@ class Pub(db.Model):
     address = db.Column(db.Text, nullable=False)
     lat = db.Column(db.Numeric(10, 8), nullable=False)
     lng = db.Column(db.Numeric(11, 8), nullable=False)
+    # Geohash of (lat, lng) for bounding-box and radius lookups (see geo.py)
+    geo_cell = db.Column(db.String(12), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -31,6 +36,13 @@ class Pub(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+@event.listens_for(Pub, 'before_insert')
+@event.listens_for(Pub, 'before_update')
+def _set_geo_cell(mapper, connection, pub):
+    """Keep geo_cell in step with the pub's coordinates."""
+    if pub.lat is not None and pub.lng is not None:
+        pub.geo_cell = encode_geohash(float(pub.lat), float(pub.lng), GEOHASH_PRECISION)
+
 class Score(db.Model):
     __tablename__ = 'scores'
 
@@ -86,6 +98,56 @@ class PubRating(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class PubStats(db.Model):
+    """
+    Running aggregates of a pub's scores and ratings, kept in step with
+    inserts by pub_stats.record_score / record_rating so reads never scan
+    the raw rows. pub_stats.py reconcile rebuilds them from scratch.
+    """
+    __tablename__ = 'pub_stats'
+
+    # Ratings at or above this count as good in percentGood
+    GOOD_RATING = 4.0
+
+    pub_id = db.Column(db.String(36), db.ForeignKey('pubs.id', ondelete='CASCADE'), primary_key=True)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Numeric(5, 2))
+    best_username = db.Column(db.String(100))
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    overall_sum = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    taste_sum = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    temperature_sum = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    head_sum = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    taste_good = db.Column(db.Integer, nullable=False, default=0)
+    temperature_good = db.Column(db.Integer, nullable=False, default=0)
+    head_good = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def quality_rating(self):
+        """Average overall rating, or None without ratings."""
+        if not self.rating_count:
+            return None
+        return float(self.overall_sum) / self.rating_count
+
+    def top_split(self):
+        """Best score and its holder, or None without scores."""
+        if self.best_score is None:
+            return None
+        return {'score': float(self.best_score), 'username': self.best_username or 'Anonymous'}
+
+    def rating_stats(self):
+        """Average and percent-good per rating dimension, or None without ratings."""
+        if not self.rating_count:
+            return None
+        count = self.rating_count
+        return {
+            dimension: {
+                'average': round(float(getattr(self, f'{dimension}_sum')) / count, 1),
+                'percentGood': round(getattr(self, f'{dimension}_good') / count * 100)
+            }
+            for dimension in ('taste', 'temperature', 'head')
+        }
+
 class TwitterSubmission(db.Model):
     __tablename__ = 'twitter_submissions'
 
@@ -0,0 +1,282 @@
+"""
+Pub Aggregate Queries
+Set-based queries behind the pub map endpoints.
+
+GET /api/pubs needs, per pub, the number of pints logged, the average
+overall rating, the top split and a top-5 leaderboard. Fetching those pub by
+pub costs four queries per pub; here they come from two queries however
+many pubs there are:
+
+- the pubs joined to their pub_stats row (pint count, rating sums and best
+  score, kept up to date on every submission - see pub_stats.py)
+- a window query ranking each pub's scores (ROW_NUMBER() OVER (PARTITION BY
+  pub_id ...)) that keeps the top N rows
+
+pub_page serves the same data a page at a time. Pages are keyset-paginated
+on the pub id (WHERE id > :cursor ORDER BY id LIMIT n, on the primary key
+index), so a page costs the same however deep it is and pubs are not
+repeated; pubs inserted behind the cursor appear on the next full traversal.
+A field list trims the response, and the stats join or leaderboard query is
+skipped when none of their fields are asked for.
+
+A bbox narrows a page to the pubs in a box, and pubs_near finds the pubs
+within a radius, both through the geohash index on pubs.geo_cell (see
+geo.py) followed by an exact check of the coordinates.
+
+Works on SQLite (3.25+, for window functions) and Postgres.
+"""
+
+import base64
+import binascii
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, and_, func, or_, select, type_coerce
+
+from geo import BBox, bbox_around, cell_ranges, haversine_m
+from models import db, Pub, PubStats, Score
+
+# Leaderboard entries per pub on the map
+MAP_LEADERBOARD_SIZE = 5
+
+# Fields a pub summary can contain, in response order
+PUB_FIELDS = ('id', 'place_id', 'name', 'address', 'lat', 'lng', 'created_at',
+              'topSplit', 'qualityRating', 'pintsLogged', 'leaderboard')
+STATS_FIELDS = frozenset(('topSplit', 'qualityRating', 'pintsLogged'))
+
+
+def ranked_scores(limit: int, pub_ids: Optional[Sequence[str]] = None):
+    """
+    Each pub's top scores with their rank.
+
+    Ties on score go to the earlier pint.
+
+    Args:
+        limit: Scores kept per pub
+        pub_ids: Only rank these pubs' scores (all pubs if None)
+
+    Returns:
+        Query of (pub_id, username, score, rank) rows ordered by pub and rank
+    """
+    ranked = db.session.query(
+        Score.pub_id,
+        Score.username,
+        Score.score,
+        func.row_number().over(
+            partition_by=Score.pub_id,
+            order_by=(Score.score.desc(), Score.created_at, Score.id)
+        ).label('rank'),
+    )
+    if pub_ids is not None:
+        ranked = ranked.filter(Score.pub_id.in_(pub_ids))
+    ranked = ranked.subquery()
+
+    return db.session.query(ranked).filter(ranked.c.rank <= limit)\
+        .order_by(ranked.c.pub_id, ranked.c.rank)
+
+
+def parse_fields(raw: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated 'fields' parameter.
+
+    Args:
+        raw: e.g. 'place_id,name,lat,lng,topSplit', or None/empty for all fields
+
+    Returns:
+        Requested fields in PUB_FIELDS order, or None for all fields
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not raw:
+        return None
+
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = requested.difference(PUB_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))} "
+                         f"(valid: {', '.join(PUB_FIELDS)})")
+    return tuple(field for field in PUB_FIELDS if field in requested)
+
+
+def encode_cursor(pub_id: str) -> str:
+    """Opaque cursor for the page after this pub."""
+    return base64.urlsafe_b64encode(pub_id.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Pub id a cursor from encode_cursor points after.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    padded = cursor.replace('-', '+').replace('_', '/') + '=' * (-len(cursor) % 4)
+    try:
+        pub_id = base64.b64decode(padded, validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        pub_id = ''
+    if not pub_id:
+        raise ValueError('malformed cursor')
+    return pub_id
+
+
+def _rows_query(fields: Sequence[str]):
+    """(Pub, PubStats) rows, or (Pub, None) when no stats field is needed."""
+    if STATS_FIELDS.intersection(fields):
+        return db.session.query(Pub, PubStats).outerjoin(PubStats, PubStats.pub_id == Pub.id)
+    return db.session.query(Pub, db.null())
+
+
+def _within_bbox(query, bbox: BBox):
+    """
+    Restrict a pub query to a box.
+
+    The geohash ranges select candidates from the geo_cell index; the
+    coordinate comparisons drop the candidates outside the box itself.
+    They sit in an id IN (subquery) so the planner starts from the geo_cell
+    index: filtered inline next to ORDER BY id LIMIT ?, SQLite prefers to
+    walk the primary key in order and scans the whole table.
+    """
+    south, west, north, east = bbox
+    cells = or_(*(
+        Pub.geo_cell >= low if high is None else and_(Pub.geo_cell >= low, Pub.geo_cell < high)
+        for low, high in cell_ranges(bbox)
+    ))
+    if west <= east:
+        longitude = Pub.lng.between(west, east)
+    else:
+        longitude = or_(Pub.lng >= west, Pub.lng <= east)
+    inside = select(Pub.id).where(cells, Pub.lat.between(south, north), longitude)
+    return query.filter(Pub.id.in_(inside))
+
+
+def _summaries(rows, fields: Optional[Sequence[str]], leaderboard_size: int,
+               every_pub: bool) -> List[Dict]:
+    """
+    Pub summaries from (Pub, PubStats or None) rows.
+
+    every_pub says the rows are the whole table, so the leaderboards need no
+    pub id filter.
+    """
+    leaderboards = defaultdict(list)
+    if rows and (fields is None or 'leaderboard' in fields):
+        pub_ids = None if every_pub else [pub.id for pub, _stats in rows]
+        for pub_id, username, score, rank in ranked_scores(leaderboard_size, pub_ids):
+            leaderboards[pub_id].append({
+                'rank': rank,
+                'username': username or 'Anonymous',
+                'score': float(score)
+            })
+
+    result = []
+    for pub, stats in rows:
+        average = stats.quality_rating() if stats else None
+
+        pub_data = pub.to_dict()
+        pub_data.update({
+            'topSplit': stats.top_split() if stats else None,
+            'qualityRating': round(average, 1) if average is not None else None,
+            'pintsLogged': stats.score_count if stats else 0,
+            'leaderboard': leaderboards.get(pub.id, [])
+        })
+        if fields is not None:
+            pub_data = {field: pub_data[field] for field in fields}
+        result.append(pub_data)
+
+    return result
+
+
+def pub_summaries(leaderboard_size: int = MAP_LEADERBOARD_SIZE) -> List[Dict]:
+    """
+    Map data for every pub: details, top split, rating, pint count and leaderboard.
+
+    Args:
+        leaderboard_size: Leaderboard entries per pub
+
+    Returns:
+        One dictionary per pub
+    """
+    rows = db.session.query(Pub, PubStats).outerjoin(PubStats, PubStats.pub_id == Pub.id).all()
+    return _summaries(rows, None, leaderboard_size, every_pub=True)
+
+
+def pub_page(limit: int, cursor: Optional[str] = None,
+             fields: Optional[Sequence[str]] = None,
+             leaderboard_size: int = MAP_LEADERBOARD_SIZE,
+             bbox: Optional[BBox] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of pub summaries in pub id order.
+
+    Args:
+        limit: Pubs per page
+        cursor: nextCursor from the previous page, or None for the first page
+        fields: Fields to return (see parse_fields), or None for all
+        leaderboard_size: Leaderboard entries per pub
+        bbox: Only pubs inside this (south, west, north, east) box
+
+    Returns:
+        Tuple of (pub summaries, cursor for the next page or None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    fields = tuple(fields or PUB_FIELDS)
+
+    query = _rows_query(fields)
+    if bbox is not None:
+        query = _within_bbox(query, bbox)
+    if cursor:
+        query = query.filter(Pub.id > decode_cursor(cursor))
+    # One extra row tells whether another page follows
+    rows = query.order_by(Pub.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0].id)
+
+    return _summaries(rows, fields, leaderboard_size, every_pub=False), next_cursor
+
+
+def pubs_near(lat: float, lng: float, radius_m: float, limit: int,
+              fields: Optional[Sequence[str]] = None,
+              leaderboard_size: int = MAP_LEADERBOARD_SIZE) -> List[Dict]:
+    """
+    Pubs within a radius, nearest first.
+
+    Candidates come from the box around the circle as bare coordinates;
+    their great-circle distance decides which are inside, and only the
+    nearest `limit` are loaded in full.
+
+    Args:
+        lat: Centre latitude in degrees
+        lng: Centre longitude in degrees
+        radius_m: Radius in metres
+        limit: Most pubs to return
+        fields: Fields to return (see parse_fields), or None for all
+        leaderboard_size: Leaderboard entries per pub
+
+    Returns:
+        Pub summaries, each with distanceM (metres from the centre)
+    """
+    fields = tuple(fields or PUB_FIELDS)
+
+    # Read as floats: Numeric would build a Decimal per coordinate
+    candidates = _within_bbox(
+        db.session.query(Pub.id, type_coerce(Pub.lat, Float), type_coerce(Pub.lng, Float)),
+        bbox_around(lat, lng, radius_m)
+    )
+    distances = ((haversine_m(lat, lng, pub_lat, pub_lng), pub_id)
+                 for pub_id, pub_lat, pub_lng in candidates)
+    nearest = sorted(item for item in distances if item[0] <= radius_m)[:limit]
+    if not nearest:
+        return []
+
+    rows = {pub.id: (pub, stats) for pub, stats in
+            _rows_query(fields).filter(Pub.id.in_([pub_id for _distance, pub_id in nearest]))}
+    result = _summaries([rows[pub_id] for _distance, pub_id in nearest], fields, leaderboard_size,
+                        every_pub=False)
+    for pub_data, (distance, _pub_id) in zip(result, nearest):
+        pub_data['distanceM'] = round(distance, 1)
+    return result
@@ -0,0 +1,251 @@
+"""
+Pub Statistics Maintenance
+Keeps the pub_stats aggregates (models.PubStats) in step with new scores and
+ratings, and rebuilds them from the raw rows.
+
+record_score / record_rating run in the same transaction as the insert they
+account for. Each is one UPDATE with relative assignments (score_count =
+score_count + 1, ...), so concurrent submissions for a pub serialize on its
+stats row instead of overwriting each other.
+
+Reconcile recomputes every pub's aggregates in chunks, fixing any drift
+(rows written before the table existed, manual deletes):
+
+    python pub_stats.py reconcile --chunk-size 500
+    python pub_stats.py reconcile --dry-run
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, or_
+
+from models import db, Pub, PubRating, PubStats, Score
+
+logger = logging.getLogger(__name__)
+
+# Aggregate columns compared and rewritten by reconcile
+STAT_COLUMNS = (
+    'score_count', 'best_score', 'best_username', 'rating_count',
+    'overall_sum', 'taste_sum', 'temperature_sum', 'head_sum',
+    'taste_good', 'temperature_good', 'head_good',
+)
+
+
+def ensure_stats_rows(pub_ids: List[str]) -> int:
+    """
+    Create empty stats rows for pubs that have none (safe under concurrent inserts).
+
+    Returns:
+        Number of rows created
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        existing = {pub_id for (pub_id,) in
+                    db.session.query(PubStats.pub_id).filter(PubStats.pub_id.in_(pub_ids))}
+        missing = [pub_id for pub_id in pub_ids if pub_id not in existing]
+        db.session.add_all(PubStats(pub_id=pub_id) for pub_id in missing)
+        db.session.flush()
+        return len(missing)
+
+    result = db.session.execute(
+        insert(PubStats).values([{'pub_id': pub_id} for pub_id in pub_ids])
+        .on_conflict_do_nothing(index_elements=['pub_id'])
+    )
+    return result.rowcount
+
+
+def record_score(score: Score):
+    """
+    Account for a new score in its pub's stats (call before committing the score).
+
+    The first of equal best scores keeps the top spot.
+    """
+    ensure_stats_rows([score.pub_id])
+    is_best = or_(PubStats.best_score.is_(None), PubStats.best_score < score.score)
+    db.session.query(PubStats).filter(PubStats.pub_id == score.pub_id).update({
+        PubStats.score_count: PubStats.score_count + 1,
+        # Both CASEs read the pre-update best_score
+        PubStats.best_score: case((is_best, score.score), else_=PubStats.best_score),
+        PubStats.best_username: case((is_best, score.username), else_=PubStats.best_username),
+    }, synchronize_session=False)
+
+
+def record_rating(rating: PubRating):
+    """Account for a new rating in its pub's stats (call before committing the rating)."""
+    ensure_stats_rows([rating.pub_id])
+    good = PubStats.GOOD_RATING
+    db.session.query(PubStats).filter(PubStats.pub_id == rating.pub_id).update({
+        PubStats.rating_count: PubStats.rating_count + 1,
+        PubStats.overall_sum: PubStats.overall_sum + rating.overall_rating,
+        PubStats.taste_sum: PubStats.taste_sum + rating.taste,
+        PubStats.temperature_sum: PubStats.temperature_sum + rating.temperature,
+        PubStats.head_sum: PubStats.head_sum + rating.head,
+        PubStats.taste_good: PubStats.taste_good + int(float(rating.taste) >= good),
+        PubStats.temperature_good: PubStats.temperature_good + int(float(rating.temperature) >= good),
+        PubStats.head_good: PubStats.head_good + int(float(rating.head) >= good),
+    }, synchronize_session=False)
+
+
+def compute_stats(pub_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Aggregates for a set of pubs computed from the raw scores and ratings.
+
+    One query: the pubs left-joined to their score count, their best score
+    (ROW_NUMBER() = 1) and their rating sums and good counts (SUM(CASE ...)),
+    so the database does the work and no score or rating rows are loaded.
+
+    Args:
+        pub_ids: Pubs to compute
+
+    Returns:
+        Dictionary of pub_id -> {column: value} for every STAT_COLUMNS column
+    """
+    counts = db.session.query(
+        Score.pub_id,
+        func.count().label('score_count'),
+    ).filter(Score.pub_id.in_(pub_ids)).group_by(Score.pub_id).subquery()
+
+    ranked = db.session.query(
+        Score.pub_id,
+        Score.score,
+        Score.username,
+        func.row_number().over(
+            partition_by=Score.pub_id,
+            order_by=(Score.score.desc(), Score.created_at, Score.id)
+        ).label('rank'),
+    ).filter(Score.pub_id.in_(pub_ids)).subquery()
+
+    good = PubStats.GOOD_RATING
+    ratings = db.session.query(
+        PubRating.pub_id,
+        func.count().label('rating_count'),
+        func.sum(PubRating.overall_rating).label('overall_sum'),
+        func.sum(PubRating.taste).label('taste_sum'),
+        func.sum(PubRating.temperature).label('temperature_sum'),
+        func.sum(PubRating.head).label('head_sum'),
+        func.sum(case((PubRating.taste >= good, 1), else_=0)).label('taste_good'),
+        func.sum(case((PubRating.temperature >= good, 1), else_=0)).label('temperature_good'),
+        func.sum(case((PubRating.head >= good, 1), else_=0)).label('head_good'),
+    ).filter(PubRating.pub_id.in_(pub_ids)).group_by(PubRating.pub_id).subquery()
+
+    rows = db.session.query(
+        Pub.id,
+        func.coalesce(counts.c.score_count, 0),
+        ranked.c.score,
+        ranked.c.username,
+        *(func.coalesce(ratings.c[column], 0) for column in STAT_COLUMNS[3:]),
+    ).filter(Pub.id.in_(pub_ids))\
+        .outerjoin(counts, counts.c.pub_id == Pub.id)\
+        .outerjoin(ranked, (ranked.c.pub_id == Pub.id) & (ranked.c.rank == 1))\
+        .outerjoin(ratings, ratings.c.pub_id == Pub.id)
+
+    return {pub_id: dict(zip(STAT_COLUMNS, values)) for pub_id, *values in rows}
+
+
+def _differs(column: str, stored, expected) -> bool:
+    if stored is None or expected is None:
+        return stored is not expected
+    if column == 'best_username':
+        return stored != expected
+    # Numeric columns come back as Decimal or float depending on the driver
+    return abs(float(stored) - float(expected)) > 0.001
+
+
+def _pub_id_chunks(chunk_size: int) -> Iterable[List[str]]:
+    """Pub ids in ascending chunks (keyset pagination, so new pubs don't shift pages)."""
+    last_id = ''
+    while True:
+        chunk = [pub_id for (pub_id,) in db.session.query(Pub.id).filter(Pub.id > last_id)
+                 .order_by(Pub.id).limit(chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def reconcile(chunk_size: int = 500, dry_run: bool = False) -> Dict:
+    """
+    Recompute pub_stats from the raw rows, one chunk of pubs per transaction.
+
+    Each chunk's stats rows are created if missing and locked (FOR UPDATE,
+    on Postgres) before the aggregates are read, so submissions racing the
+    reconcile wait for it and apply their increments on top of the rebuilt
+    values.
+
+    Args:
+        chunk_size: Pubs per transaction
+        dry_run: Only count drift, write nothing
+
+    Returns:
+        Dictionary with pubs checked, stats rows that were missing and
+        rows whose values were wrong
+    """
+    report = {'pubs': 0, 'missing': 0, 'corrected': 0}
+
+    for pub_ids in _pub_id_chunks(chunk_size):
+        try:
+            report['missing'] += ensure_stats_rows(pub_ids)
+            existing = {
+                row.pub_id: row for row in
+                PubStats.query.filter(PubStats.pub_id.in_(pub_ids)).with_for_update()
+            }
+            for pub_id, expected in compute_stats(pub_ids).items():
+                report['pubs'] += 1
+                row = existing[pub_id]
+                drift = [column for column in STAT_COLUMNS
+                         if _differs(column, getattr(row, column), expected[column])]
+                if drift:
+                    report['corrected'] += 1
+                    logger.info(f"pub_stats drift for {pub_id}: {', '.join(drift)}")
+                    if not dry_run:
+                        for column in drift:
+                            setattr(row, column, expected[column])
+
+            if dry_run:
+                # Also discards the rows ensure_stats_rows created
+                db.session.rollback()
+            else:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Pub statistics maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    reconcile_parser = subparsers.add_parser('reconcile', help='Rebuild pub_stats from scores and ratings')
+    reconcile_parser.add_argument('--chunk-size', type=int, default=500, help='Pubs per transaction')
+    reconcile_parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from flask import Flask
+    from config import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        report = reconcile(args.chunk_size, args.dry_run)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
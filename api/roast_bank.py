@@ -4,8 +4,15 @@ The Digital Barman's verdict library.
 
 Voice: Dry Irish pub wit. Never cruel, but has teeth.
 Dad-level emoji use (sparingly).
+
+The split roasts are compiled at import: a 0.1-point score -> tier table
+(tiers start at their lower bound, so 89.5 is SOLID HIGH) and each roast
+pre-split around its distance, so serving one is an index and a choice.
 """
 
+import random
+from typing import List, Optional, Sequence, Tuple
+
 PERFECT_ROASTS = [
     "That's the one. Frame it.",
     "This is what we came here for.",
@@ -137,92 +144,255 @@ FEEDBACK_LIBRARY = {
     (0, 24): CRIMINAL_ROASTS,
 }
 
-AI_ROAST_PROMPT = """You are The Digital Barman. You've pulled 10,000 pints. You've seen every split attempt imaginable. You're dry, deadpan, Irish pub wit. You say it once, mean it, move on. No sass. No explaining the joke. Conservative energy.
+# Tier names as used in AI_BATCH_ROAST_PROMPT
+FEEDBACK_TIER_NAMES = {
+    (90, 100): 'PERFECT',
+    (85, 89): 'SOLID HIGH',
+    (75, 84): 'SOLID LOW',
+    (65, 74): 'MID HIGH',
+    (50, 64): 'MID LOW',
+    (25, 49): 'ROUGH',
+    (0, 24): 'CRIMINAL',
+}
 
-This is about SPLITTING THE G — how well the beer line aligns with the G on a Guinness glass. Not pouring technique.
+# Pub rating roasts, by tier (see get_pub_tier)
+PUB_ROAST_LIBRARY = {
+    'top': [
+        "Found your local.",
+        "This pub gets it.",
+        "The barman knows what he's doing.",
+        "Worth the walk home.",
+        "Cancel your other plans.",
+        "A proper pub. Rare these days.",
+    ],
+    'solid': [
+        "Decent spot.",
+        "Would drink again.",
+        "Does the job. Quietly.",
+        "Nothing to write home about. Nothing wrong either.",
+        "A safe pair of hands.",
+        "Solid. Like the stools.",
+    ],
+    'mid': [
+        "It's a pub.",
+        "Nothing special.",
+        "One and done.",
+        "The Guinness has been better. And worse.",
+        "Fine for a wait between trains.",
+        "Forgettable. Already forgotten.",
+    ],
+    'rough': [
+        "Tourist trap energy.",
+        "Why did you stay?",
+        "The lines haven't been cleaned since Easter.",
+        "Drink up and leave quietly.",
+        "The barman's heart isn't in it.",
+        "They should stick to lager.",
+    ],
+    'bottom': [
+        "Never again.",
+        "A crime scene.",
+        "Arthur Guinness would sue.",
+        "Report them to the authorities.",
+        "The pint was an insult. So was the bill.",
+        "Walk past. Keep walking.",
+    ],
+}
+
+PUB_TIER_NAMES = {
+    'top': 'Top tier',
+    'solid': 'Solid',
+    'mid': 'Mid',
+    'rough': 'Rough',
+    'bottom': 'Bottom',
+}
 
-Score: {score}%
-Distance from perfect split: {distance_mm:.1f}mm
+# Written by the model where it wants the distance; filled in when served
+DISTANCE_PLACEHOLDER = '{distance_mm}'
 
-Generate ONE verdict. 5-12 words. Match the tier:
+# How bank roasts ask for the distance (rounded to whole millimetres)
+DISTANCE_FIELD = '{distance_mm:.0f}'
+
+# Tier for scores that can't be placed (NaN)
+DEFAULT_ROAST_TIER = (65, 74)
+
+# Tier table steps per score point
+SCORE_RESOLUTION = 10
+
+
+def _compile_roast(roast: str) -> Tuple[str, Optional[str]]:
+    """Split a roast around DISTANCE_FIELD: (text, None) if static, else (prefix, suffix)."""
+    prefix, field, suffix = roast.partition(DISTANCE_FIELD)
+    if '{' in prefix or '{' in suffix or '}' in prefix or '}' in suffix:
+        raise ValueError(f'Roast may only contain {DISTANCE_FIELD} once: {roast!r}')
+    return (prefix, suffix) if field else (prefix, None)
+
+
+def _compile_tier_table() -> Tuple[tuple, ...]:
+    """FEEDBACK_LIBRARY key for every score from 0 to 100 in 1/SCORE_RESOLUTION steps."""
+    by_lower_bound = sorted(FEEDBACK_LIBRARY, reverse=True)
+    lowest = by_lower_bound[-1]
+    return tuple(
+        next((tier for tier in by_lower_bound if step / SCORE_RESOLUTION >= tier[0]), lowest)
+        for step in range(100 * SCORE_RESOLUTION + 1)
+    )
 
-PERFECT (90-100%): Understated respect. Earned.
-- "That's the one. Frame it."
-- "Your da would be proud."
-- "Clinic."
 
-SOLID HIGH (85-89%): Backhanded praise. Almost.
-- "Not bad for a Tuesday."
-- "You can tell people you split it."
-- "Close enough for government work."
+_COMPILED_ROASTS = {
+    tier: tuple(_compile_roast(roast) for roast in roasts)
+    for tier, roasts in FEEDBACK_LIBRARY.items()
+}
 
-SOLID LOW (75-84%): Light roasting. You tried.
-- "Your ma would be proud. Your da less so."
-- "I remember my first pint."
-- "Tourist numbers."
+# Index -1 (one past the table) holds the default, for _tier_index(NaN)
+_TIER_TABLE = _compile_tier_table() + (DEFAULT_ROAST_TIER,)
+_ROAST_TABLE = tuple(_COMPILED_ROASTS[tier] for tier in _TIER_TABLE)
+_TOP_INDEX = 100 * SCORE_RESOLUTION
 
-MID HIGH (65-74%): Dry observation. Not great.
-- "Jury's still out."
-- "Your heart wasn't in it."
-- "Not your day."
+AI_BATCH_ROAST_PROMPT = """You are The Digital Barman. You've pulled 10,000 pints. You've seen every split attempt imaginable. You're dry, deadpan, Irish pub wit. You say it once, mean it, move on. No sass. No explaining the joke. Conservative energy.
 
-MID LOW (50-64%): Starting to sting. Actually bad.
-- "The split of a man with a 3-star Uber rating."
-- "Proof that confidence isn't everything."
-- "The split of someone who gives up easily."
+This is about SPLITTING THE G — how well the beer line aligns with the G on a Guinness glass. Not pouring technique.
 
-ROUGH (25-49%): Real roasts. Teeth.
-- "This is why you're not in the family photos."
-- "The split of a man with no health insurance."
-- "{distance}mm. The pint's filing for divorce."
+Write {count} different verdicts for the {tier_name} tier ({min_score}-{max_score}%). 5-12 words each.
 
-CRIMINAL (0-24%): Maximum devastation.
-- "This is why your da stopped coming to matches."
-- "{distance}mm short. You've heard that before."
-- "The glass is pressing charges."
+The tier sounds like this:
+{examples}
 
 Rules:
+- One verdict per line. No numbering, no quotes, nothing else.
 - Period at the end.
 - One emoji max. Most have none. Dad energy only.
-- Reference distance if it's funnier.
+- To mention the distance, write {{distance_mm}}mm and it will be filled in.
 - Roast the split, not the person directly. But sting on bad scores.
 - Never say "pour" — it's about the split/line/G.
-- No lazy one-worders. Substance.
-- Dry Irish wit. Dark and cheeky is fine. Not sassy. Not liberal. Not try-hard.
-- Family digs land (da, ma, ancestors).
+- Dry Irish wit. Dark and cheeky is fine. Not sassy. Not try-hard.
 - If it sounds like a greeting card, delete it.
 
-Your verdict:"""
+Your verdicts:"""
 
+AI_BATCH_PUB_ROAST_PROMPT = """You're The Digital Barman - sharp, witty, brutally honest. You're judging pubs by the Guinness they serve.
+
+Write {count} different roasts/compliments for a pub rated in the {tier_name} tier (max 8 words each). Be authentic and sharp, not forced. Use an emoji only if it fits naturally.
+
+The tier sounds like this:
+{examples}
+
+One roast per line. No numbering, no quotes, nothing else.
+
+Your roasts:"""
 
-def get_roast(score: float, distance_mm: float) -> str:
-    import random
 
-    roast_options = []
-    for (min_score, max_score), roasts in FEEDBACK_LIBRARY.items():
-        if min_score <= score <= max_score:
-            roast_options = roasts
-            break
+def _tier_index(score: float) -> int:
+    """_TIER_TABLE index for a score clamped to 0-100 (-1, the default tier, for NaN)."""
+    if score >= 100:
+        return _TOP_INDEX
+    if score >= 0:
+        return int(score * SCORE_RESOLUTION)
+    if score < 0:
+        return 0
+    return -1
 
-    if not roast_options:
-        roast_options = MID_HIGH_ROASTS
 
-    roast = random.choice(roast_options)
+def get_roast_tier(score: float) -> tuple:
+    """FEEDBACK_LIBRARY key for a score (the tier whose lower bound it has reached)."""
+    return _TIER_TABLE[_tier_index(score)]
 
-    if '{distance_mm' in roast:
-        roast = roast.format(distance_mm=distance_mm)
 
-    return roast
+def get_pub_tier(rating: float) -> str:
+    """PUB_ROAST_LIBRARY key for an overall pub rating (0-5)."""
+    if rating >= 4.5:
+        return 'top'
+    elif rating >= 3.5:
+        return 'solid'
+    elif rating >= 2.5:
+        return 'mid'
+    elif rating >= 1.5:
+        return 'rough'
+    return 'bottom'
 
 
-def get_ai_prompt(score: float, distance_mm: float, split_detected: bool) -> str:
-    return AI_ROAST_PROMPT.format(
-        score=score,
-        distance_mm=distance_mm,
-        split_detected=split_detected
+def get_roast(score: float, distance_mm: float) -> str:
+    """
+    Pick a pre-written roast for a score.
+
+    Args:
+        score: Split score (0-100)
+        distance_mm: Distance from the G-line, for roasts that quote it
+
+    Returns:
+        Roast text
+    """
+    roasts = _ROAST_TABLE[_tier_index(score)]
+    # Indexing by random() skips random.choice's rejection sampling
+    prefix, suffix = roasts[int(random.random() * len(roasts))]
+    if suffix is None:
+        return prefix
+    return f'{prefix}{distance_mm:.0f}{suffix}'
+
+
+def get_roasts(scores: Sequence[float], distances: Sequence[float]) -> List[str]:
+    """
+    Pick a pre-written roast for each of many scores.
+
+    Same choices as calling get_roast per score, without the per-call
+    overhead; used for archive replays and the Twitter mention backlog.
+
+    Args:
+        scores: Split scores (any sequence, including NumPy arrays)
+        distances: Distance from the G-line for each score
+
+    Returns:
+        One roast per score, in order
+
+    Raises:
+        ValueError: If scores and distances differ in length
+    """
+    if len(scores) != len(distances):
+        raise ValueError(f'{len(scores)} scores but {len(distances)} distances')
+
+    table = _ROAST_TABLE
+    tier_index = _tier_index
+    rand = random.random
+    roasts = []
+    append = roasts.append
+    for score, distance_mm in zip(scores, distances):
+        # Inline the common in-range case of _tier_index
+        tier_roasts = table[int(score * SCORE_RESOLUTION) if 0 <= score < 100 else tier_index(score)]
+        prefix, suffix = tier_roasts[int(rand() * len(tier_roasts))]
+        append(prefix if suffix is None else f'{prefix}{distance_mm:.0f}{suffix}')
+    return roasts
+
+
+def get_ai_batch_prompt(tier: tuple, count: int) -> str:
+    """Prompt asking for `count` split verdicts in one FEEDBACK_LIBRARY tier."""
+    min_score, max_score = tier
+    examples = '\n'.join(
+        f'- "{roast.replace("{distance_mm:.0f}", DISTANCE_PLACEHOLDER)}"'
+        for roast in FEEDBACK_LIBRARY[tier][:3]
+    )
+    return AI_BATCH_ROAST_PROMPT.format(
+        count=count,
+        tier_name=FEEDBACK_TIER_NAMES[tier],
+        min_score=min_score,
+        max_score=max_score,
+        examples=examples
     )
 
 
+def get_ai_pub_batch_prompt(tier: str, count: int) -> str:
+    """Prompt asking for `count` pub roasts in one PUB_ROAST_LIBRARY tier."""
+    examples = '\n'.join(f'- "{roast}"' for roast in PUB_ROAST_LIBRARY[tier][:3])
+    return AI_BATCH_PUB_ROAST_PROMPT.format(
+        count=count,
+        tier_name=PUB_TIER_NAMES[tier],
+        examples=examples
+    )
+
+
+def fill_distance(roast: str, distance_mm: float) -> str:
+    """Replace DISTANCE_PLACEHOLDER in a generated roast with the measured distance."""
+    return roast.replace(DISTANCE_PLACEHOLDER, f'{distance_mm:.0f}')
+
+
 def format_twitter_reply(score: float, distance_mm: float, roast: str) -> str:
     if not roast.endswith('.') and not roast.endswith('!') and not roast.endswith('?'):
         roast = roast + '.'
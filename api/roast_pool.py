@@ -0,0 +1,250 @@
+"""
+AI Roast Pool
+Keeps a small pool of pre-generated AI roasts per tier so requests never wait
+on the LLM.
+
+A background thread tops up any tier that falls below its low-water mark by
+asking for a batch of roasts in one call. The request path only pops from
+the pool; when a tier is empty the caller falls back to the static roast bank.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from roast_bank import (
+    DISTANCE_PLACEHOLDER, FEEDBACK_LIBRARY, PUB_ROAST_LIBRARY,
+    get_ai_batch_prompt, get_ai_pub_batch_prompt
+)
+
+logger = logging.getLogger(__name__)
+
+# Leading list markers the model sometimes adds despite the prompt
+_LIST_MARKER = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s*')
+
+
+def parse_batch(text: str, max_length: int = 120) -> List[str]:
+    """
+    Split a batch response into individual roasts.
+
+    Drops blank lines, list markers and surrounding quotes, and any line with
+    braces other than DISTANCE_PLACEHOLDER (so served text never contains a
+    stray format field).
+
+    Args:
+        text: Raw model output, one roast per line
+        max_length: Longest roast kept
+
+    Returns:
+        List of cleaned roasts
+    """
+    roasts = []
+    for line in text.splitlines():
+        line = _LIST_MARKER.sub('', line).strip().strip('"“”').strip()
+        if not line or len(line) > max_length:
+            continue
+        unplaced = line.replace(DISTANCE_PLACEHOLDER, '')
+        if '{' in unplaced or '}' in unplaced:
+            continue
+        roasts.append(line)
+    return roasts
+
+
+class RoastPool:
+    """Per-tier pools of AI roasts refilled in batches by one daemon thread."""
+
+    def __init__(self, client_factory: Callable[[], Any], model: str,
+                 low_water: int = 5, batch_size: int = 10, max_size: int = 40,
+                 refill_interval: float = 60.0, max_tokens: int = 600,
+                 backoff_max: float = 600.0):
+        """
+        Initialize the pool. The refill thread starts on the first pop.
+
+        Args:
+            client_factory: Returns an Anthropic-compatible client
+                (anything with messages.create); called once, on the refill thread
+            model: Model name passed to messages.create
+            low_water: Refill a tier when it holds fewer roasts than this
+            batch_size: Roasts requested per LLM call
+            max_size: Roasts kept per tier; older ones are dropped first
+            refill_interval: Seconds between periodic checks when no pop wakes the thread
+            max_tokens: max_tokens for one batch call
+            backoff_max: Longest pause after repeated LLM failures
+        """
+        self.client_factory = client_factory
+        self.model = model
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.refill_interval = refill_interval
+        self.max_tokens = max_tokens
+        self.backoff_max = backoff_max
+
+        self._prompts = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._client = None
+        self._failures_in_row = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.batches = 0
+        self.errors = 0
+
+    def add_tier(self, tier: Hashable, prompt_fn: Callable[[int], str]):
+        """
+        Register a tier.
+
+        Args:
+            tier: Key callers pop by
+            prompt_fn: Called with a count; returns the batch prompt for this tier
+        """
+        with self._lock:
+            self._prompts[tier] = prompt_fn
+            self._pools[tier] = deque(maxlen=self.max_size)
+
+    def pop(self, tier: Hashable) -> Optional[str]:
+        """
+        Take a roast for a tier without blocking.
+
+        Returns:
+            A roast, or None if the tier is empty (use the static bank)
+        """
+        self._ensure_started()
+
+        with self._lock:
+            pool = self._pools.get(tier)
+            roast = pool.popleft() if pool else None
+            if roast is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            needs_refill = pool is not None and len(pool) < self.low_water
+
+        if needs_refill:
+            self._wake.set()
+        return roast
+
+    def refill_once(self) -> int:
+        """
+        Generate one batch for every tier below its low-water mark.
+
+        Runs on the refill thread; also usable directly from scripts and tests.
+
+        Returns:
+            Number of roasts added
+        """
+        with self._lock:
+            low_tiers = [tier for tier, pool in self._pools.items() if len(pool) < self.low_water]
+
+        added = 0
+        for tier in low_tiers:
+            roasts = self._generate(tier)
+            with self._lock:
+                self._pools[tier].extend(roasts)
+                self.generated += len(roasts)
+            added += len(roasts)
+        return added
+
+    def _generate(self, tier: Hashable) -> List[str]:
+        if self._client is None:
+            self._client = self.client_factory()
+
+        message = self._client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            messages=[{"role": "user", "content": self._prompts[tier](self.batch_size)}]
+        )
+        with self._lock:
+            self.batches += 1
+        return parse_batch(message.content[0].text)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='gsplit-roast-pool', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refill_once()
+                self._failures_in_row = 0
+                wait = self.refill_interval
+            except Exception as e:
+                self._failures_in_row += 1
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"Roast pool refill failed: {type(e).__name__}: {e}")
+                wait = min(self.backoff_max, self.refill_interval * (2 ** (self._failures_in_row - 1)))
+                # Failures sleep out the backoff instead of being woken by pops
+                time.sleep(wait)
+                continue
+
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters, generation counters and roasts currently pooled."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'generated': self.generated,
+                'batches': self.batches,
+                'errors': self.errors,
+                'pooled': sum(len(pool) for pool in self._pools.values()),
+            }
+
+
+def create_roast_pool(config, client_factory: Optional[Callable[[], Any]] = None) -> Optional[RoastPool]:
+    """
+    Build the roast pool for every split and pub tier.
+
+    Args:
+        config: Configuration class (see config.Config)
+        client_factory: Optional client factory (e.g. a fake for tests); by
+            default an anthropic.Anthropic client using ANTHROPIC_API_KEY
+
+    Returns:
+        RoastPool, or None if AI roasts are disabled or no API key is set
+    """
+    if config.AI_ROAST_RATE <= 0:
+        return None
+
+    if client_factory is None:
+        api_key = os.environ.get('ANTHROPIC_API_KEY')
+        if not api_key:
+            logger.info("ANTHROPIC_API_KEY not set, AI roasts disabled")
+            return None
+
+        def client_factory():
+            import anthropic
+            return anthropic.Anthropic(api_key=api_key)
+
+    pool = RoastPool(
+        client_factory,
+        config.AI_ROAST_MODEL,
+        low_water=config.AI_ROAST_POOL_LOW_WATER,
+        batch_size=config.AI_ROAST_POOL_BATCH_SIZE,
+        max_size=config.AI_ROAST_POOL_MAX_SIZE,
+        refill_interval=config.AI_ROAST_REFILL_INTERVAL
+    )
+
+    for tier in FEEDBACK_LIBRARY:
+        pool.add_tier(('split', tier), lambda count, tier=tier: get_ai_batch_prompt(tier, count))
+    for tier in PUB_ROAST_LIBRARY:
+        pool.add_tier(('pub', tier), lambda count, tier=tier: get_ai_pub_batch_prompt(tier, count))
+
+    return pool
@@ -0,0 +1,332 @@
+"""
+Roboflow Workflow Client
+Pooled keep-alive HTTP client for the Roboflow workflow API.
+
+One client is owned by each GuinnessVisionProcessor, so every request in a
+worker reuses the same TCP/TLS connections instead of paying the handshake
+on each analysis.
+
+Calls can carry a deadline, and slow calls are hedged: once a call has run
+longer than a chosen percentile of recent request latencies, one duplicate
+request is sent and whichever answers first wins. Hedges draw from a token
+budget refilled by a fixed fraction of calls, so they stay a small share of
+upstream traffic even when Roboflow as a whole slows down.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class RoboflowError(Exception):
+    """Raised when the workflow API call fails after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RoboflowDeadlineExceeded(RoboflowError):
+    """Raised when the caller's deadline passes before the workflow answers."""
+
+
+class RoboflowClient:
+    """HTTP client for one Roboflow workflow with pooling, timeouts and retries."""
+
+    BASE_URL = "https://detect.roboflow.com"
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, api_key: str, workspace: str, workflow_id: str,
+                 base_url: str = BASE_URL, pool_size: int = 10,
+                 connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 max_retries: int = 2, backoff_base: float = 0.25,
+                 backoff_max: float = 4.0, latency_window: int = 512,
+                 hedge_percentile: float = 0.95, hedge_budget: float = 0.05,
+                 hedge_min_samples: int = 20, hedge_burst: float = 5.0,
+                 max_concurrency: int = 64):
+        """
+        Initialize the client.
+
+        Args:
+            api_key: Roboflow API key
+            workspace: Roboflow workspace name
+            workflow_id: Workflow ID within the workspace
+            base_url: API root (override to point at a local stub server)
+            pool_size: Max pooled keep-alive connections for this worker
+            connect_timeout: Seconds to wait for a TCP connection
+            read_timeout: Seconds to wait for the response
+            max_retries: Retries after the first attempt on 5xx/429/connection errors
+            backoff_base: Initial backoff in seconds (doubles per retry)
+            backoff_max: Upper bound on a single backoff sleep
+            latency_window: Number of recent call latencies kept for stats
+            hedge_percentile: Send a hedged duplicate once a call has taken
+                longer than this percentile of recent request latencies (0 disables hedging)
+            hedge_budget: Hedges earned per call, i.e. the long-run share of
+                calls that may be hedged
+            hedge_min_samples: Request latencies needed before hedging starts
+            hedge_burst: Most unused hedges that can be saved up
+            max_concurrency: Threads for hedged/deadline calls (per worker)
+        """
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/infer/workflows/{workspace}/{workflow_id}"
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_burst = hedge_burst
+        self.max_concurrency = max_concurrency
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._latencies = deque(maxlen=latency_window)
+        self._request_latencies = deque(maxlen=latency_window)  # Single successful POSTs
+        self._hedge_tokens = 0.0
+        self._executor = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    @classmethod
+    def from_config(cls, config, api_key: str, workspace: str, workflow_id: str) -> 'RoboflowClient':
+        """Build a client using the ROBOFLOW_* settings of a configuration class."""
+        return cls(
+            api_key, workspace, workflow_id,
+            base_url=config.ROBOFLOW_API_URL,
+            pool_size=config.ROBOFLOW_POOL_SIZE,
+            connect_timeout=config.ROBOFLOW_CONNECT_TIMEOUT,
+            read_timeout=config.ROBOFLOW_READ_TIMEOUT,
+            max_retries=config.ROBOFLOW_MAX_RETRIES,
+            backoff_base=config.ROBOFLOW_BACKOFF_BASE,
+            backoff_max=config.ROBOFLOW_BACKOFF_MAX,
+            hedge_percentile=config.ROBOFLOW_HEDGE_PERCENTILE,
+            hedge_budget=config.ROBOFLOW_HEDGE_BUDGET,
+            hedge_min_samples=config.ROBOFLOW_HEDGE_MIN_SAMPLES,
+        )
+
+    def run_workflow(self, image_b64: str, deadline: Optional[float] = None) -> Dict:
+        """
+        Run the workflow on a base64-encoded image.
+
+        Args:
+            image_b64: Base64-encoded image bytes
+            deadline: time.monotonic() value by which an answer is needed
+
+        Returns:
+            Parsed JSON response from Roboflow
+
+        Raises:
+            RoboflowDeadlineExceeded: The deadline passed first
+            RoboflowError: Non-retryable status, retries exhausted, or timeout
+        """
+        payload = {
+            "api_key": self.api_key,
+            "inputs": {
+                "image": {
+                    "type": "base64",
+                    "value": image_b64
+                }
+            }
+        }
+
+        started = time.perf_counter()
+        try:
+            if deadline is None and not self.hedge_percentile:
+                return self._post_with_retries(payload)
+            return self._run_hedged(payload, deadline)
+        except RoboflowError as e:
+            with self._lock:
+                self.failures += 1
+                if isinstance(e, RoboflowDeadlineExceeded):
+                    self.deadline_exceeded += 1
+            raise
+        finally:
+            with self._lock:
+                self.calls += 1
+                self._latencies.append(time.perf_counter() - started)
+
+    def _run_hedged(self, payload: Dict, deadline: Optional[float]) -> Dict:
+        """Run the call off-thread, hedging once if it runs long, until the deadline."""
+        executor = self._get_executor()
+        hedge_delay = self._hedge_delay()
+        with self._lock:
+            self._hedge_tokens = min(self.hedge_burst, self._hedge_tokens + self.hedge_budget)
+
+        started = time.monotonic()
+        primary = executor.submit(self._post_with_retries, payload, deadline)
+        pending = {primary}
+        hedge = None
+        error = None
+
+        while pending:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if hedge is None and hedge_delay is not None:
+                until_hedge = started + hedge_delay - time.monotonic()
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+            done, pending = wait(pending, timeout=max(0.0, timeout) if timeout is not None else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except RoboflowError as e:
+                    error = e
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return result
+
+            if not pending:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                # The legs run on in the background; their read timeouts
+                # are capped by the deadline so they end soon after
+                raise RoboflowDeadlineExceeded('Workflow API did not answer before the deadline')
+            if hedge is None and hedge_delay is not None and time.monotonic() >= started + hedge_delay:
+                hedge_delay = None
+                if self._take_hedge_token():
+                    logger.info("Roboflow call slower than recent p%d, sending hedged request",
+                                round(self.hedge_percentile * 100))
+                    hedge = executor.submit(self._post_with_retries, payload, deadline)
+                    pending.add(hedge)
+
+        raise error
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, or None while hedging is off or warming up."""
+        if not self.hedge_percentile or self.hedge_budget <= 0:
+            return None
+        with self._lock:
+            if len(self._request_latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._request_latencies)
+        return percentile(latencies, self.hedge_percentile)
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1.0:
+                return False
+            self._hedge_tokens -= 1.0
+            self.hedges += 1
+            return True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='gsplit-roboflow'
+                )
+            return self._executor
+
+    def _post_with_retries(self, payload: Dict, deadline: Optional[float] = None) -> Dict:
+        attempt = 0
+        while True:
+            timeout = self.timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RoboflowDeadlineExceeded('Workflow API did not answer before the deadline')
+                timeout = (min(self.timeout[0], remaining), min(self.timeout[1], remaining))
+
+            retry_after = None
+            request_started = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=timeout)
+            except requests.Timeout as e:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise RoboflowDeadlineExceeded(f'Workflow API did not answer before the deadline: {e}') from e
+                # Read timeouts are not retried: the upstream already had
+                # the full read budget and a retry would double the wait
+                if not isinstance(e, requests.ConnectionError):
+                    raise RoboflowError(f'Workflow API timed out: {e}') from e
+                error = RoboflowError(f'Workflow API connection failed: {e}')
+            except requests.ConnectionError as e:
+                error = RoboflowError(f'Workflow API connection failed: {e}')
+            else:
+                if response.status_code == 200:
+                    with self._lock:
+                        self._request_latencies.append(time.perf_counter() - request_started)
+                    return response.json()
+
+                error = RoboflowError(
+                    f'Workflow API failed: {response.status_code}', response.status_code
+                )
+                logger.warning(f"Roboflow returned {response.status_code}: {response.text[:200]}")
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    raise error
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt >= self.max_retries:
+                raise error
+
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            delay = self._backoff(attempt, retry_after)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise error
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return delay
+
+    def stats(self) -> Dict:
+        """
+        Call counters and latency percentiles over the recent window.
+
+        Returns:
+            Dictionary with calls, retries, failures, hedges, hedge wins,
+            deadline misses and p50/p95/p99/max latency (seconds)
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls, retries, failures = self.calls, self.retries, self.failures
+            hedges, hedge_wins, deadline_exceeded = self.hedges, self.hedge_wins, self.deadline_exceeded
+
+        return {
+            'calls': calls,
+            'retries': retries,
+            'failures': failures,
+            'hedges': hedges,
+            'hedge_wins': hedge_wins,
+            'deadline_exceeded': deadline_exceeded,
+            'latency_p50': round(percentile(latencies, 0.50), 4),
+            'latency_p95': round(percentile(latencies, 0.95), 4),
+            'latency_p99': round(percentile(latencies, 0.99), 4),
+            'latency_max': round(latencies[-1], 4) if latencies else 0.0,
+        }
+
+    def close(self):
+        """Close pooled connections and stop the hedging threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,271 @@
+"""
+Split Scoring Kernel (v9)
+Scores Roboflow workflow predictions with NumPy so thousands of stored
+results can be re-scored in one pass.
+
+Each image is reduced to a handful of box coordinates (NaN where a box is
+missing) and score_batch evaluates the v9 rules for every row at once:
+
+- Tier 0 (Model 2): linear distance of the split box's top edge from the
+  crop centre, clamped to 50-100%
+- Tier 1 (Model 1 fallback): zoned score from the beer box top edge to the
+  G-logo centre, in G-logo heights
+- Tier 2: hardcoded 25% floor
+
+score_workflow wraps it for a single workflow response and returns the
+dictionary GuinnessVisionProcessor has always produced. Results match the
+scalar implementation bit for bit, including Python's round() semantics.
+
+score_local_beer_line scores a beer line found by beer_line_detector with
+the Model 2 formula. The detector is not validated against Model 2, so its
+results never count as a detected split.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from workflow_model import WorkflowResult
+
+TIER_MODEL2 = 0
+TIER_MODEL1 = 1
+TIER_FLOOR = 2
+
+FLOOR_SCORE = 25.0
+FLOOR_DISTANCE_MM = 50.0
+
+# One value per image; NaN marks a missing box
+INPUT_FIELDS = (
+    'split_y',         # Model 2 split box centre y (crop pixels)
+    'split_height',    # Model 2 split box height
+    'crop_height',     # Model 2 crop image height
+    'beer_y',          # Model 1 beer box centre y (full image pixels)
+    'beer_height',     # Model 1 beer box height
+    'g_logo_y',        # Model 1 G-logo centre y
+    'g_logo_height',   # Model 1 G-logo height
+    'g_logo_width',    # Model 1 G-logo width (reported, not scored)
+    'image_height',    # Full image height
+)
+
+_NAN = float('nan')
+
+
+def extract_inputs(workflow: WorkflowResult) -> Dict[str, float]:
+    """
+    Pull the scoring inputs out of one parsed workflow response.
+
+    Model 1 contributes its first 'beer' and first 'g-logo'/'G' box.
+
+    Args:
+        workflow: Parsed workflow response (see workflow_model)
+
+    Returns:
+        Dictionary with one float per INPUT_FIELDS entry
+    """
+    inputs = dict.fromkeys(INPUT_FIELDS, _NAN)
+
+    split = workflow.split_prediction
+    if split is not None and workflow.split.image_height is not None:
+        inputs['split_y'] = split.y
+        inputs['split_height'] = split.height
+        inputs['crop_height'] = workflow.split.image_height
+
+    g_logo = workflow.g_logo
+    if g_logo is not None:
+        inputs['g_logo_y'] = g_logo.y
+        inputs['g_logo_height'] = g_logo.height
+        inputs['g_logo_width'] = g_logo.width
+    beer = workflow.beer
+    if beer is not None:
+        inputs['beer_y'] = beer.y
+        inputs['beer_height'] = beer.height
+    if workflow.pint.image_height is not None:
+        inputs['image_height'] = workflow.pint.image_height
+
+    return inputs
+
+
+def stack_inputs(rows: Iterable[Dict[str, float]]) -> Dict[str, np.ndarray]:
+    """
+    Combine per-image inputs (see extract_inputs) into column arrays.
+
+    Returns:
+        Dictionary of float64 arrays keyed by INPUT_FIELDS
+    """
+    rows = list(rows)
+    return {
+        field: np.fromiter((row[field] for row in rows), dtype=np.float64, count=len(rows))
+        for field in INPUT_FIELDS
+    }
+
+
+def round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Round an array exactly as Python's round(x, ndigits) rounds each float.
+
+    np.round rounds values * 10**ndigits, which can land on the wrong side of
+    a tie; Python rounds the exact decimal value. The two only disagree next
+    to a half-way point, so those few elements are rounded with round().
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * (10.0 ** ndigits)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_tie):
+        rounded[index] = round(float(values[index]), ndigits)
+    return rounded
+
+
+def score_batch(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Score many images at once.
+
+    A row uses Model 2 when it has a split box, else Model 1 when it has both
+    a beer and a G-logo box, else the 25% floor. Boxes with a zero reference
+    height (crop_height / g_logo_height) are treated as missing.
+
+    Args:
+        inputs: Arrays keyed by INPUT_FIELDS (see stack_inputs)
+
+    Returns:
+        Dictionary of arrays:
+            score, distance_mm: rounded as in the API response
+            in_zone: beer line within the scoring zone
+            split_detected: Model 2 result within the zone
+            beer_line_y, g_bar_y: normalized positions (NaN for the floor tier)
+            tier: TIER_MODEL2, TIER_MODEL1 or TIER_FLOOR
+    """
+    split_y = inputs['split_y']
+    crop_height = inputs['crop_height']
+    g_logo_height = inputs['g_logo_height']
+    image_height = inputs['image_height']
+
+    model2 = ~np.isnan(split_y) & (crop_height != 0)
+    model1 = (
+        ~model2
+        & ~np.isnan(inputs['beer_y'])
+        & ~np.isnan(inputs['g_logo_y'])
+        & (g_logo_height != 0)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Model 2: distance of the split box top edge from the crop centre
+        m2_beer_line_y = (split_y - (inputs['split_height'] / 2)) / crop_height
+        m2_distance = np.abs(m2_beer_line_y - 0.5)
+        m2_score = np.maximum(50.0, np.minimum(100.0, 100 - (m2_distance * 100)))
+        m2_distance_mm = m2_distance * 100
+
+        # Model 1: beer top edge to G-logo centre, in G-logo heights
+        beer_y_top = inputs['beer_y'] - (inputs['beer_height'] / 2)
+        m1_distance = np.abs(beer_y_top - inputs['g_logo_y']) / g_logo_height
+        m1_score = np.where(
+            m1_distance < 0.5,
+            49 - (m1_distance * 20),
+            np.where(
+                m1_distance < 1.0,
+                39 - ((m1_distance - 0.5) * 20),
+                np.maximum(15, 29 - ((m1_distance - 1.0) * 10))
+            )
+        )
+        m1_distance_mm = m1_distance * 100
+        m1_beer_line_y = beer_y_top / image_height
+        m1_g_bar_y = inputs['g_logo_y'] / image_height
+
+    m2_in_zone = m2_distance < 0.25
+    m1_in_zone = m1_distance < 0.5
+
+    return {
+        'score': np.where(model2, round_like_python(m2_score, 1),
+                          np.where(model1, round_like_python(m1_score, 1), FLOOR_SCORE)),
+        'distance_mm': np.where(model2, round_like_python(m2_distance_mm, 2),
+                                np.where(model1, round_like_python(m1_distance_mm, 2), FLOOR_DISTANCE_MM)),
+        'in_zone': np.where(model2, m2_in_zone, model1 & m1_in_zone),
+        'split_detected': model2 & m2_in_zone,
+        'beer_line_y': np.where(model2, m2_beer_line_y, np.where(model1, m1_beer_line_y, np.nan)),
+        'g_bar_y': np.where(model2, 0.5, np.where(model1, m1_g_bar_y, np.nan)),
+        'tier': np.where(model2, TIER_MODEL2, np.where(model1, TIER_MODEL1, TIER_FLOOR)),
+    }
+
+
+def score_workflow(workflow: WorkflowResult) -> Dict:
+    """
+    Score one workflow response.
+
+    Args:
+        workflow: Parsed workflow response
+
+    Returns:
+        Score dictionary in the GuinnessVisionProcessor format
+    """
+    inputs = extract_inputs(workflow)
+    scored = score_batch({field: np.array([value], dtype=np.float64) for field, value in inputs.items()})
+    tier = int(scored['tier'][0])
+
+    has_g_logo = not np.isnan(inputs['g_logo_height'])
+    in_zone = bool(scored['in_zone'][0])
+    result = {
+        'score': float(scored['score'][0]),
+        'distance_mm': float(scored['distance_mm'][0]),
+        'split_detected': bool(scored['split_detected'][0]),
+        'model2_available': tier == TIER_MODEL2,
+        'model3_fallback_used': tier != TIER_FLOOR,  # Repurposed: a fallback tier produced the score
+        'beer_line_in_zone': in_zone,
+        'beer_line_y': None,
+        'g_bar_y': None,
+        'g_curve_y': None,
+        'debug_crop_path': None,
+        'g_logo_width': inputs['g_logo_width'] if has_g_logo else None,
+        'g_logo_height': inputs['g_logo_height'] if has_g_logo else None,
+        'local_detector_used': False,
+    }
+
+    if tier != TIER_FLOOR:
+        result['beer_line_y'] = float(scored['beer_line_y'][0])
+        result['g_bar_y'] = float(scored['g_bar_y'][0])
+    if tier == TIER_MODEL2:
+        result['g_curve_y'] = 0.5
+
+    return result
+
+
+def score_local_beer_line(beer_line_y: float, g_logo_width: Optional[float] = None,
+                          g_logo_height: Optional[float] = None) -> Dict:
+    """
+    Score a beer line found locally in a G-logo crop.
+
+    The crop is centred on the G-logo like the Model 2 crop, so the Model 2
+    linear formula applies unchanged. split_detected stays False: the
+    detector can lock onto the G's own strokes, so a local line is never
+    reported as a detected split (local_detector_used marks the result).
+
+    Args:
+        beer_line_y: Beer line position in the crop (0-1, from the top)
+        g_logo_width: Model 1 / client G-logo width, reported only
+        g_logo_height: Model 1 / client G-logo height, reported only
+
+    Returns:
+        Score dictionary in the score_workflow format
+    """
+    inputs = dict.fromkeys(INPUT_FIELDS, np.array([np.nan]))
+    inputs.update(
+        split_y=np.array([beer_line_y], dtype=np.float64),
+        split_height=np.array([0.0]),
+        crop_height=np.array([1.0])
+    )
+    scored = score_batch(inputs)
+    in_zone = bool(scored['in_zone'][0])
+
+    return {
+        'score': float(scored['score'][0]),
+        'distance_mm': float(scored['distance_mm'][0]),
+        'split_detected': False,
+        'model2_available': False,
+        'model3_fallback_used': True,
+        'beer_line_in_zone': in_zone,
+        'beer_line_y': float(beer_line_y),
+        'g_bar_y': 0.5,
+        'g_curve_y': 0.5,
+        'debug_crop_path': None,
+        'g_logo_width': g_logo_width,
+        'g_logo_height': g_logo_height,
+        'local_detector_used': True,
+    }
@@ -0,0 +1,124 @@
+"""
+Single-Flight Request Coalescing
+Collapses concurrent calls for the same key into one execution.
+
+The first caller for a key (the leader) runs the work; callers arriving while
+it is in flight wait for the leader's result instead of repeating the work.
+Each waiter has its own timeout, so a slow upstream call can't hold every
+duplicate request for longer than it is willing to wait. Nothing is kept
+once the call finishes - this caps upstream fan-out, it is not a cache.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A waiter gave up before the in-flight call finished."""
+
+
+class _Call:
+    """One in-flight execution and its outcome."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Per-key deduplication of concurrent calls."""
+
+    def __init__(self, wait_timeout: Optional[float] = None):
+        """
+        Initialize the group.
+
+        Args:
+            wait_timeout: Default seconds a waiter waits for the leader
+                (None waits indefinitely)
+        """
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Deduplication key
+            fn: Work to run when this caller is the leader
+            timeout: Seconds to wait as a waiter (defaults to wait_timeout)
+
+        Returns:
+            Tuple of (result, shared). shared is True when the result came
+            from another caller's execution.
+
+        Raises:
+            SingleFlightTimeout: The in-flight call didn't finish in time
+            Exception: Whatever the leader's fn raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result, False
+
+        if not call.done.wait(self.wait_timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise SingleFlightTimeout(f'Timed out waiting for in-flight call {key!r}')
+
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def stats(self) -> Dict:
+        """Leader/coalesced/timeout counters and calls currently in flight."""
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'in_flight': len(self._calls),
+            }
+
+
+def create_single_flight(config) -> Optional[SingleFlight]:
+    """
+    Build the in-flight deduplication group described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+
+    Returns:
+        SingleFlight, or None if SINGLE_FLIGHT_ENABLED is off
+    """
+    if not config.SINGLE_FLIGHT_ENABLED:
+        return None
+    return SingleFlight(wait_timeout=config.SINGLE_FLIGHT_WAIT_TIMEOUT or None)
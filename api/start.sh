@@ -26,8 +26,10 @@ if [ ! -f "venv/lib/python*/site-packages/flask/__init__.py" ]; then
     echo ""
 fi
 
-# Create uploads directory if it doesn't exist
-mkdir -p uploads
+# Bring the database schema up to date (pub_stats backfill, geo_cell column)
+echo "🗄️  Running database migrations..."
+python -m flask --app app db upgrade --directory ../migrations || exit 1
+echo ""
 
 # Start the Flask app
 echo "🚀 Starting Flask API..."
@@ -0,0 +1,34 @@
+"""
+API tests.
+
+Run from api/:
+
+    python -m pytest tests
+    python -m unittest discover -s tests -t .
+
+The API modules import each other as top-level modules (from config import
+Config), so api/ goes on the path here. The environment is set before any of
+them is imported, since Config reads it at import time.
+"""
+
+import os
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix='gsplit-tests-')
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(TEST_DIR, "test.db")}'
+# Nothing in the tests may reach the real workflow API
+os.environ['ROBOFLOW_API_URL'] = 'http://127.0.0.1:9'
+os.environ['WORKFLOW_ARCHIVE_ENABLED'] = '0'
+os.environ['DEBUG_ARTIFACTS_SAMPLE_RATE'] = '0'
+os.environ['DEBUG_ARTIFACTS_ON_FAILURE'] = '0'
+os.environ['ANALYSIS_CACHE_BACKEND'] = 'memory'
+os.environ['ASYNC_QUEUE_BACKEND'] = 'memory'
+os.environ['CPU_POOL_WORKERS'] = '0'
+os.environ.pop('ANTHROPIC_API_KEY', None)
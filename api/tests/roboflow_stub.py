@@ -0,0 +1,87 @@
+"""
+Local stand-in for the Roboflow workflow API.
+
+Each POST takes the next planned response (status, delay, body); once the
+plan runs out every request gets the default response. Requests are counted
+so tests can check retries, hedges and coalescing.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# A workflow answer with no detections (scores the 25% floor)
+EMPTY_WORKFLOW = {'outputs': [{}]}
+
+
+class StubResponse:
+    """One planned response."""
+
+    def __init__(self, status: int = 200, delay: float = 0.0, body: Optional[Dict] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.delay = delay
+        self.body = EMPTY_WORKFLOW if body is None and status == 200 else (body or {'message': 'stub error'})
+        self.headers = headers or {}
+
+
+class RoboflowStub:
+    """HTTP server on a free localhost port; use as a context manager."""
+
+    def __init__(self, default: Optional[StubResponse] = None):
+        self.default = default or StubResponse()
+        self.plan: List[StubResponse] = []
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with stub._lock:
+                    stub.requests.append({'path': self.path, 'payload': payload})
+                    response = stub.plan.pop(0) if stub.plan else stub.default
+
+                time.sleep(response.delay)
+                body = json.dumps(response.body).encode()
+                try:
+                    self.send_response(response.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    for name, value in response.headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (deadline or hedge won) before the answer
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def queue(self, *responses: StubResponse):
+        """Plan the next responses, in order."""
+        with self._lock:
+            self.plan.extend(responses)
+
+    def __enter__(self) -> 'RoboflowStub':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
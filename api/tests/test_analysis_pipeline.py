@@ -0,0 +1,123 @@
+"""GuinnessVisionProcessor and /analyze-split with Roboflow replaced by a local stub."""
+
+import io
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from .roboflow_stub import RoboflowStub, StubResponse
+
+from analysis_cache import AnalysisCache, MemoryCacheBackend
+from roboflow_client import RoboflowClient
+from single_flight import SingleFlight
+from vision_processor import GuinnessVisionProcessor
+
+
+def make_image(seed: int = 0) -> bytes:
+    """A small JPEG; different seeds give different image hashes."""
+    pixels = np.random.default_rng(seed).integers(0, 255, (480, 360, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode('.jpg', pixels)
+    assert ok
+    return encoded.tobytes()
+
+
+def make_processor(stub: RoboflowStub) -> GuinnessVisionProcessor:
+    client = RoboflowClient('test-key', 'workspace', 'workflow', base_url=stub.url,
+                            backoff_base=0.01, backoff_max=0.05, hedge_percentile=0)
+    return GuinnessVisionProcessor(roboflow_client=client,
+                                   cache=AnalysisCache(MemoryCacheBackend(64, 3600), 'test'),
+                                   single_flight=SingleFlight(wait_timeout=10))
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_identical_uploads_share_one_workflow_call(self):
+        image = make_image()
+        results = []
+        with RoboflowStub(default=StubResponse(delay=0.5)) as stub:
+            processor = make_processor(stub)
+            threads = [
+                threading.Thread(target=lambda: results.append(processor.analyze_guinness_split(image)))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(stub.request_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all('error' not in result for result in results))
+        self.assertEqual({result['score'] for result in results}, {results[0]['score']})
+        stats = processor.single_flight_stats()
+        self.assertEqual((stats['leaders'], stats['coalesced'], stats['in_flight']), (1, 3, 0))
+
+    def test_waiter_gives_up_at_its_own_deadline(self):
+        image = make_image(3)
+        with RoboflowStub(default=StubResponse(delay=1.0)) as stub:
+            processor = make_processor(stub)
+            leader = threading.Thread(target=processor.analyze_guinness_split, args=(image,))
+            leader.start()
+            while stub.request_count == 0:
+                time.sleep(0.01)
+
+            started = time.monotonic()
+            result = processor.analyze_guinness_split(image, deadline=started + 0.2)
+            elapsed = time.monotonic() - started
+            leader.join(10)
+
+        self.assertEqual(result['error'], 'Analysis timed out')
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(processor.single_flight_stats()['timeouts'], 1)
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_repeat_upload_is_served_from_the_cache(self):
+        image = make_image(1)
+        with RoboflowStub() as stub:
+            processor = make_processor(stub)
+            first = processor.analyze_guinness_split(image)
+            second = processor.analyze_guinness_split(image)
+            processor.analyze_guinness_split(make_image(2))
+
+        self.assertEqual(first['score'], second['score'])
+        self.assertEqual(stub.request_count, 2)
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_slow_workflow_times_out(self):
+        with RoboflowStub(default=StubResponse(delay=2.0)) as stub:
+            processor = make_processor(stub)
+            started = time.monotonic()
+            result = processor.analyze_guinness_split(make_image(4), deadline=started + 0.3)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(result['error'], 'Analysis timed out')
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(processor.roboflow.stats()['deadline_exceeded'], 1)
+
+    def test_analyze_split_returns_504_at_the_timeout(self):
+        import app as app_module
+
+        with RoboflowStub(default=StubResponse(delay=2.0)) as stub:
+            original = app_module.vision_processor
+            app_module.vision_processor = make_processor(stub)
+            try:
+                client = app_module.app.test_client()
+                response = client.post('/analyze-split?timeout=0.3', data={
+                    'image': (io.BytesIO(make_image(5)), 'pint.jpg'),
+                }, content_type='multipart/form-data')
+            finally:
+                app_module.vision_processor = original
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.get_json()['error'], 'Analysis timed out')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""SQLiteJobStore claim leases: abandoned jobs are retried, then failed."""
+
+import os
+import time
+import unittest
+
+from . import TEST_DIR
+
+from job_queue import SQLiteJobStore
+
+
+class LeaseTest(unittest.TestCase):
+
+    def make_store(self, name: str, **kwargs) -> SQLiteJobStore:
+        path = os.path.join(TEST_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+        options = dict(poll_interval=0.01, lease_seconds=0.05, max_attempts=2)
+        options.update(kwargs)
+        return SQLiteJobStore(path, **options)
+
+    def test_expired_claim_is_requeued_with_its_image(self):
+        store = self.make_store('requeue.db')
+        store.put('job', b'image', 'pint.jpg', time.time(), 10, {'fast': True})
+
+        self.assertEqual(store.claim(0.1)[0], 'job')
+        self.assertIsNone(store.claim(0.01))  # Leased to the first worker
+
+        time.sleep(0.06)
+        job_id, image, name, _submitted_at, options = store.claim(0.1)
+        self.assertEqual((job_id, image, name, options), ('job', b'image', 'pint.jpg', {'fast': True}))
+
+    def test_job_fails_after_max_attempts(self):
+        store = self.make_store('abandoned.db')
+        store.put('job', b'image', 'pint.jpg', time.time(), 10)
+        for _ in range(2):
+            self.assertIsNotNone(store.claim(0.1))
+            time.sleep(0.06)
+
+        self.assertIsNone(store.claim(0.01))
+        job = store.get('job')
+        self.assertEqual((job['status'], job['error']), ('failed', 'Analysis abandoned'))
+
+    def test_finished_job_is_not_requeued(self):
+        store = self.make_store('finished.db')
+        store.put('job', b'image', 'pint.jpg', time.time(), 10)
+        store.claim(0.1)
+        store.finish('job', 'done', result={'score': 90.0})
+
+        time.sleep(0.06)
+        self.assertIsNone(store.claim(0.01))
+        self.assertEqual(store.get('job')['result'], {'score': 90.0})
+
+    def test_startup_requeues_claims_that_expired_while_down(self):
+        store = self.make_store('restart.db')
+        store.put('job', b'image', 'pint.jpg', time.time(), 10)
+        store.claim(0.1)
+        time.sleep(0.06)
+
+        restarted = SQLiteJobStore(store.path)
+        self.assertEqual(restarted.get('job')['status'], 'queued')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""RoboflowClient against a local stub server: retries, deadlines and hedging."""
+
+import time
+import unittest
+
+from .roboflow_stub import EMPTY_WORKFLOW, RoboflowStub, StubResponse
+
+from roboflow_client import RoboflowClient, RoboflowDeadlineExceeded, RoboflowError
+
+
+def make_client(stub: RoboflowStub, **kwargs) -> RoboflowClient:
+    options = dict(backoff_base=0.01, backoff_max=0.05, hedge_percentile=0)
+    options.update(kwargs)
+    return RoboflowClient('test-key', 'workspace', 'workflow', base_url=stub.url, **options)
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_retries_5xx_then_succeeds(self):
+        with RoboflowStub() as stub:
+            stub.queue(StubResponse(503), StubResponse(502))
+            client = make_client(stub, max_retries=2)
+            try:
+                self.assertEqual(client.run_workflow('aW1hZ2U='), EMPTY_WORKFLOW)
+            finally:
+                client.close()
+
+        self.assertEqual(stub.request_count, 3)
+        self.assertEqual(stub.requests[0]['path'], '/infer/workflows/workspace/workflow')
+        self.assertEqual(stub.requests[0]['payload']['inputs']['image']['value'], 'aW1hZ2U=')
+        stats = client.stats()
+        self.assertEqual((stats['calls'], stats['retries'], stats['failures']), (1, 2, 0))
+
+    def test_gives_up_after_max_retries(self):
+        with RoboflowStub(default=StubResponse(500)) as stub:
+            client = make_client(stub, max_retries=2)
+            try:
+                with self.assertRaises(RoboflowError) as raised:
+                    client.run_workflow('aW1hZ2U=')
+            finally:
+                client.close()
+
+        self.assertEqual(raised.exception.status_code, 500)
+        self.assertEqual(stub.request_count, 3)
+        self.assertEqual(client.stats()['failures'], 1)
+
+    def test_does_not_retry_client_errors(self):
+        with RoboflowStub(default=StubResponse(400)) as stub:
+            client = make_client(stub, max_retries=2)
+            try:
+                with self.assertRaises(RoboflowError) as raised:
+                    client.run_workflow('aW1hZ2U=')
+            finally:
+                client.close()
+
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(stub.request_count, 1)
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_deadline_gives_up_on_slow_upstream(self):
+        with RoboflowStub(default=StubResponse(delay=2.0)) as stub:
+            client = make_client(stub)
+            try:
+                started = time.monotonic()
+                with self.assertRaises(RoboflowDeadlineExceeded):
+                    client.run_workflow('aW1hZ2U=', deadline=started + 0.3)
+                elapsed = time.monotonic() - started
+            finally:
+                client.close()
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(client.stats()['deadline_exceeded'], 1)
+
+    def test_no_retry_that_would_end_after_the_deadline(self):
+        with RoboflowStub(default=StubResponse(503, headers={'Retry-After': '1'})) as stub:
+            client = make_client(stub, max_retries=5, backoff_max=1.0)
+            try:
+                started = time.monotonic()
+                with self.assertRaises(RoboflowError) as raised:
+                    client.run_workflow('aW1hZ2U=', deadline=started + 0.5)
+                elapsed = time.monotonic() - started
+            finally:
+                client.close()
+
+        # The 1s Retry-After wait would end past the deadline, so the 503 is final
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(stub.request_count, 1)
+        self.assertLess(elapsed, 0.5)
+
+
+class HedgeTest(unittest.TestCase):
+
+    def warm_up(self, client: RoboflowClient, calls: int):
+        for _ in range(calls):
+            client.run_workflow('aW1hZ2U=')
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        with RoboflowStub(default=StubResponse(delay=0.02)) as stub:
+            client = make_client(stub, hedge_percentile=0.5, hedge_min_samples=3, hedge_budget=1.0)
+            try:
+                self.warm_up(client, 3)
+                # The primary stalls; the hedged duplicate answers at once
+                stub.queue(StubResponse(delay=2.0), StubResponse())
+                started = time.monotonic()
+                self.assertEqual(client.run_workflow('aW1hZ2U='), EMPTY_WORKFLOW)
+                elapsed = time.monotonic() - started
+            finally:
+                client.close()
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(stub.request_count, 5)
+        stats = client.stats()
+        self.assertEqual((stats['hedges'], stats['hedge_wins']), (1, 1))
+
+    def test_hedges_limited_by_token_budget(self):
+        with RoboflowStub(default=StubResponse(delay=0.02)) as stub:
+            # 0.1 tokens per call: four calls have not earned a whole hedge
+            client = make_client(stub, hedge_percentile=0.5, hedge_min_samples=3, hedge_budget=0.1)
+            try:
+                self.warm_up(client, 3)
+                stub.queue(StubResponse(delay=0.5))
+                self.assertEqual(client.run_workflow('aW1hZ2U='), EMPTY_WORKFLOW)
+            finally:
+                client.close()
+
+        self.assertEqual(stub.request_count, 4)
+        self.assertEqual(client.stats()['hedges'], 0)
+
+    def test_no_hedging_before_enough_samples(self):
+        with RoboflowStub() as stub:
+            client = make_client(stub, hedge_percentile=0.5, hedge_min_samples=20, hedge_budget=1.0)
+            try:
+                stub.queue(StubResponse(delay=0.3))
+                client.run_workflow('aW1hZ2U=')
+            finally:
+                client.close()
+
+        self.assertEqual(stub.request_count, 1)
+        self.assertEqual(client.stats()['hedges'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,10 +8,8 @@ import requests
 import os
 import time
 from datetime import datetime
-from pathlib import Path
-import tempfile
 from models import db, TwitterSubmission
-from roast_bank import get_roast, format_twitter_reply
+from roast_bank import get_roasts, format_twitter_reply
 from app import app
 
 class GSplitTwitterBot:
@@ -64,7 +62,8 @@ class GSplitTwitterBot:
 
             print(f'   Found {len(mentions.data)} new mention(s)')
 
-            # Process each mention
+            # Score each mention, then roast the whole backlog in one pass
+            scored = []
             for tweet in reversed(mentions.data):  # Process oldest first
                 print(f'\n   📝 Processing tweet {tweet.id} from @{tweet.author_id}')
 
@@ -78,8 +77,16 @@ class GSplitTwitterBot:
                         print(f'      ⏭️  Already processed, skipping')
                         continue
 
-                # Process tweet
-                self.process_tweet(tweet, mentions.includes)
+                result = self.score_tweet(tweet, mentions.includes)
+                if result:
+                    scored.append((tweet, result))
+
+            roasts = get_roasts(
+                [result['score'] for _, result in scored],
+                [result['distance_mm'] for _, result in scored]
+            )
+            for (tweet, result), roast in zip(scored, roasts):
+                self.reply_with_roast(tweet, mentions.includes, result, roast)
 
             print(f'{"="*80}\n')
 
@@ -88,8 +95,14 @@ class GSplitTwitterBot:
             import traceback
             traceback.print_exc()
 
-    def process_tweet(self, tweet, includes):
-        """Process a single tweet with image."""
+    def score_tweet(self, tweet, includes):
+        """
+        Download and analyze the first photo attached to a tweet.
+
+        Returns:
+            Dictionary with image_url, score and distance_mm, or None if the
+            tweet has no photo or the analysis failed
+        """
         try:
             # Extract media from includes
             media_list = includes.get('media', []) if includes else []
@@ -112,17 +125,14 @@ class GSplitTwitterBot:
             image_url = image_media.url
             print(f'      📷 Image URL: {image_url}')
 
-            # Download image
-            image_path = self.download_image(image_url)
-            if not image_path:
+            # Download image into memory
+            image_bytes = self.download_image(image_url)
+            if not image_bytes:
                 print(f'      ❌ Failed to download image')
                 return
 
             # Analyze image
-            result = self.analyze_image(image_path)
-
-            # Clean up downloaded image
-            os.unlink(image_path)
+            result = self.analyze_image(image_bytes)
 
             if not result or 'error' in result:
                 print(f'      ❌ Analysis failed: {result.get("error", "Unknown error")}')
@@ -132,9 +142,20 @@ class GSplitTwitterBot:
             distance_mm = result.get('distance_from_g_line_mm', 0)
 
             print(f'      ✅ Analysis complete: {score}% ({distance_mm:.1f}mm)')
+            return {'image_url': image_url, 'score': score, 'distance_mm': distance_mm}
 
-            # Generate roast using roast bank
-            roast = get_roast(score, distance_mm)
+        except Exception as e:
+            print(f'      ❌ Error processing tweet: {e}')
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def reply_with_roast(self, tweet, includes, result, roast):
+        """Save a scored tweet with its roast and reply to it."""
+        try:
+            image_url = result['image_url']
+            score = result['score']
+            distance_mm = result['distance_mm']
 
             # Get author username
             author = next((u for u in includes.get('users', []) if u.id == tweet.author_id), None)
@@ -179,30 +200,24 @@ class GSplitTwitterBot:
             traceback.print_exc()
 
     def download_image(self, url):
-        """Download image from Twitter URL to temp file."""
+        """Download image from Twitter URL into memory."""
         try:
             response = requests.get(url, timeout=10)
             response.raise_for_status()
 
-            # Create temp file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.write(response.content)
-            temp_file.close()
-
-            return temp_file.name
+            return response.content
 
         except Exception as e:
             print(f'         Error downloading image: {e}')
             return None
 
-    def analyze_image(self, image_path):
-        """Send image to /analyze-split endpoint."""
+    def analyze_image(self, image_bytes):
+        """Send in-memory image bytes to /analyze-split endpoint."""
         try:
             url = f'{self.api_base}/analyze-split'
 
-            with open(image_path, 'rb') as f:
-                files = {'image': ('pint.jpg', f, 'image/jpeg')}
-                response = requests.post(url, files=files, timeout=30)
+            files = {'image': ('pint.jpg', image_bytes, 'image/jpeg')}
+            response = requests.post(url, files=files, timeout=30)
 
             response.raise_for_status()
             return response.json()
@@ -6,13 +6,32 @@ THREE-MODEL SYSTEM: Model 1 (Pint), Model 2 (Beer Line), Model 3 (G-bar)
 
 import cv2
 import numpy as np
-import requests
 import base64
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
 import os
-from roast_bank import get_roast, get_ai_prompt
+import sys
+from roast_bank import PUB_ROAST_LIBRARY, fill_distance, get_pub_tier, get_roast, get_roast_tier
+from roast_pool import create_roast_pool
+from analysis_cache import create_analysis_cache, image_hash
+from single_flight import SingleFlightTimeout, create_single_flight
+from load_governor import SHED_AI_ROASTS, SHED_DEBUG_ARTIFACTS, create_load_governor
+from roboflow_client import RoboflowClient, RoboflowDeadlineExceeded, RoboflowError
+from scoring import score_local_beer_line, score_workflow
+from beer_line_detector import box_region, detect_beer_line
+from workflow_archive import create_workflow_archive
+from workflow_model import WorkflowResult, unwrap_outputs
+from image_loader import ImageLoader, SourceImage
+from cpu_pool import create_cpu_pool
+from image_preprocess import prepare_source_upload, rescale_workflow_outputs, upload_max_dimension
+from config import Config
+from metrics import observe_stage, record_stage, timed_stage
+from debug_writer import DebugArtifactWriter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,16 +45,255 @@ class GuinnessVisionProcessor:
     WORKSPACE_NAME = "gsplit-shaffer"
     WORKFLOW_ID = "shaffer"
 
-    def __init__(self):
-        """Initialize the vision processor."""
-        self.debug_mode = True
+    # Bump whenever _calculate_score_from_workflow changes so cached
+    # results from the previous scoring logic are no longer served
+    SCORING_VERSION = "v10"
+
+    def __init__(self, cache=None, roboflow_client=None, debug_writer=None, roast_pool=None,
+                 archive=None, single_flight=None, cpu_pool=None, governor=None):
+        """
+        Initialize the vision processor.
 
-    def analyze_guinness_split(self, image_path: str) -> Dict:
+        Args:
+            cache: Optional AnalysisCache; built from Config when omitted
+            roboflow_client: Optional RoboflowClient; built from Config when omitted
+            debug_writer: Optional DebugArtifactWriter; built from Config when omitted
+            roast_pool: Optional RoastPool; built from Config when omitted (None
+                if ANTHROPIC_API_KEY is unset)
+            archive: Optional WorkflowArchive; built from Config when omitted
+            single_flight: Optional SingleFlight; built from Config when omitted
+            cpu_pool: Optional CpuPool; built from Config when omitted (None
+                runs image work in the calling thread)
+            governor: Optional LoadGovernor; built from Config when omitted
+                (None never sheds optional work)
+        """
+        self.debug_mode = True
+        self.cache = cache if cache is not None else create_analysis_cache(Config, self.SCORING_VERSION)
+        self.roboflow = roboflow_client or RoboflowClient.from_config(
+            Config, self.ROBOFLOW_API_KEY, self.WORKSPACE_NAME, self.WORKFLOW_ID
+        )
+        self.upload_max_dimension = upload_max_dimension(Config)
+        self.image_loader = ImageLoader.from_config(Config)
+        self.cpu_pool = cpu_pool if cpu_pool is not None else create_cpu_pool(Config)
+        self.debug_writer = debug_writer or DebugArtifactWriter.from_config(Config)
+        self.roast_pool = roast_pool if roast_pool is not None else create_roast_pool(Config)
+        self.archive = archive if archive is not None else create_workflow_archive(Config)
+        self.single_flight = single_flight if single_flight is not None else create_single_flight(Config)
+        self.governor = governor if governor is not None else create_load_governor(Config)
+        self.local_detector_fallback = Config.LOCAL_DETECTOR_FALLBACK
+        self.analysis_deadline = Config.ANALYSIS_DEADLINE_SECONDS
+        self.batch_max_workers = Config.BATCH_MAX_WORKERS
+        self._batch_executor = None
+        self._batch_executor_lock = threading.Lock()
+
+    def analyze_guinness_split(self, image: Union[str, os.PathLike, bytes, bytearray, memoryview],
+                               image_name: Optional[str] = None,
+                               g_logo_box: Optional[Dict] = None, fast: bool = False,
+                               deadline: Optional[float] = None) -> Dict:
         """
         Main analysis function using Roboflow Workflow.
 
+        Results for previously seen image bytes are served from the
+        analysis cache without calling Roboflow. Concurrent requests for the
+        same image share one workflow call.
+
+        When the deadline passes before Roboflow answers, the client G-logo
+        box (if any) is scored locally; otherwise the analysis fails fast
+        with 'Analysis timed out'.
+
+        Args:
+            image: Encoded image bytes/buffer, or a path to the image file
+            image_name: Name used for debug artifacts (defaults to the path
+                or the start of the image hash)
+            g_logo_box: Optional G-logo box (centre x, y, width, height in
+                image pixels) from the client. Enables the local beer line
+                detector when Roboflow fails.
+            fast: Skip Roboflow and score g_logo_box with the local detector
+            deadline: time.monotonic() value by which the analysis should
+                finish (defaults to ANALYSIS_DEADLINE_SECONDS from now)
+
+        Returns:
+            Dictionary with score and analysis details
+        """
+        if deadline is None and self.analysis_deadline:
+            deadline = time.monotonic() + self.analysis_deadline
+
+        if isinstance(image, (str, os.PathLike)):
+            image_name = image_name or os.fspath(image)
+            try:
+                with open(image, 'rb') as f:
+                    image = f.read()
+            except OSError as e:
+                print(f'ERROR: Failed to read image from {image_name}: {e}')
+                return {'error': 'Failed to load image'}
+
+        # Hash, decode and base64 all read from this one buffer
+        image_bytes = memoryview(image).cast('B')
+        digest = image_hash(image_bytes)
+        image_name = image_name or digest[:12]
+
+        if self.cache is not None:
+            cached = self.cache.get(digest)
+            if cached is not None:
+                print(f'=== ANALYSIS CACHE HIT: {digest[:12]} ({self.SCORING_VERSION}) ===')
+                return cached
+
+        # Analyses that reach Roboflow drive the load governor's in-flight
+        # count and latency signals (cache hits are too cheap to matter)
+        with self.governor.track() if self.governor is not None else nullcontext():
+            if fast or self.single_flight is None:
+                return self._analyze_and_cache(image_bytes, image_name, digest, g_logo_box, fast, deadline)
+
+            # A waiter gives up at its own deadline even if the leader's is later
+            wait_timeout = self.single_flight.wait_timeout
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+                wait_timeout = remaining if wait_timeout is None else min(wait_timeout, remaining)
+
+            try:
+                result, shared = self.single_flight.do(
+                    f'{self.SCORING_VERSION}:{digest}',
+                    lambda: self._analyze_and_cache(image_bytes, image_name, digest, g_logo_box,
+                                                    deadline=deadline),
+                    timeout=wait_timeout
+                )
+            except SingleFlightTimeout:
+                print(f'ERROR: Timed out waiting for in-flight analysis of {digest[:12]}')
+                return {'error': 'Analysis timed out', 'message': 'An identical image is still being analyzed'}
+
+            if shared:
+                print(f'=== COALESCED WITH IN-FLIGHT ANALYSIS: {digest[:12]} ({self.SCORING_VERSION}) ===')
+                # The leader had no G-logo box to fall back on when Roboflow failed
+                if 'error' in result and g_logo_box is not None:
+                    return self._analyze_image(image_bytes, image_name, digest, g_logo_box, fast=True,
+                                               deadline=deadline)
+
+            # Every caller adjusts top-level fields (e.g. score validation) in place
+            return dict(result)
+
+    def _analyze_and_cache(self, image_bytes: memoryview, image_name: str, digest: str,
+                           g_logo_box: Optional[Dict] = None, fast: bool = False,
+                           deadline: Optional[float] = None) -> Dict:
+        """Analyze an image that missed the cache and cache the result."""
+        result = self._analyze_image(image_bytes, image_name, digest, g_logo_box, fast, deadline)
+
+        # Only successful workflow analyses are cached; errors are retried
+        # next time and local-only results are replaced once Roboflow answers
+        if self.cache is not None and 'error' not in result and not result['debug_info'].get('fast_mode'):
+            self.cache.set(digest, result)
+
+        return result
+
+    def _archive_result(self, digest: str, result: Dict, image_name: str,
+                        g_crop: Optional[np.ndarray]):
+        """
+        Store the workflow outputs (and optionally the G crop) behind a result for offline replay.
+
+        The crop is always kept when the local detector produced the score,
+        since replay cannot reproduce that score without it.
+        """
+        try:
+            with timed_stage('archive'):
+                crop_jpeg = None
+                local_detector_used = bool(result.get('local_detector_used'))
+                keep_crop = self.archive.store_crops or local_detector_used
+                if keep_crop and g_crop is not None and g_crop.size:
+                    ok, encoded = cv2.imencode('.jpg', g_crop, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                    crop_jpeg = encoded.tobytes() if ok else None
+
+                self.archive.put(
+                    digest, self.SCORING_VERSION, result['debug_info']['workflow_outputs'],
+                    score=result['score'],
+                    distance_mm=result['distance_from_g_line_mm'],
+                    image_name=image_name,
+                    crop_jpeg=crop_jpeg,
+                    local_detector_used=local_detector_used
+                )
+        except Exception as e:
+            logger.warning(f"Failed to archive workflow outputs for {digest[:12]}: {e}")
+
+    def analyze_many(self, images: Sequence[Union[str, os.PathLike, bytes, bytearray, memoryview]],
+                     image_names: Optional[Sequence[Optional[str]]] = None) -> List[Dict]:
+        """
+        Analyze several images, running their workflow calls concurrently.
+
+        Calls fan out over a thread pool shared by every batch in this
+        process (BATCH_MAX_WORKERS threads), so upstream concurrency stays
+        bounded however many batches arrive at once.
+
+        Args:
+            images: Encoded image bytes/buffers or paths
+            image_names: Optional names for debug artifacts, one per image
+
+        Returns:
+            One result dictionary per image, in input order. Failed items
+            carry an 'error' key instead of a score.
+        """
+        if not images:
+            return []
+
+        if image_names is None:
+            image_names = [None] * len(images)
+
+        executor = self._get_batch_executor()
+        futures = [
+            executor.submit(self.analyze_guinness_split, image, name)
+            for image, name in zip(images, image_names)
+        ]
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error in analyze_many: {str(e)}", exc_info=True)
+                results.append({'error': 'Analysis failed', 'message': str(e)})
+
+        return results
+
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """Create the shared batch thread pool on first use."""
+        with self._batch_executor_lock:
+            if self._batch_executor is None:
+                self._batch_executor = ThreadPoolExecutor(
+                    max_workers=self.batch_max_workers,
+                    thread_name_prefix='gsplit-batch'
+                )
+            return self._batch_executor
+
+    def _shedding(self, level: int) -> bool:
+        """Whether the load governor currently sheds the optional work at this level."""
+        return self.governor is not None and self.governor.sheds(level)
+
+    def governor_stats(self) -> Dict:
+        """Shed level and load signals (empty if load shedding is disabled)."""
+        return self.governor.stats() if self.governor is not None else {}
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters for the analysis cache (empty if disabled)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def cpu_pool_stats(self) -> Dict:
+        """Task counters for the CPU process pool (empty if disabled)."""
+        return self.cpu_pool.stats() if self.cpu_pool is not None else {}
+
+    def single_flight_stats(self) -> Dict:
+        """Coalescing counters for in-flight analyses (empty if disabled)."""
+        return self.single_flight.stats() if self.single_flight is not None else {}
+
+    def _analyze_image(self, image_bytes: memoryview, image_name: str, digest: Optional[str] = None,
+                       g_logo_box: Optional[Dict] = None, fast: bool = False,
+                       deadline: Optional[float] = None) -> Dict:
+        """
+        Run the Roboflow workflow and score a single image.
+
         Args:
-            image_path: Path to the image file
+            image_bytes: Encoded image bytes
+            image_name: Name used for logging and debug artifacts
+            digest: Image hash, used as the workflow archive key
+            g_logo_box: Optional client G-logo box for the local detector
+            fast: Score g_logo_box locally without calling Roboflow
+            deadline: time.monotonic() value by which Roboflow must answer
 
         Returns:
             Dictionary with score and analysis details
@@ -45,19 +303,33 @@ class GuinnessVisionProcessor:
             print(f'=== VISION PROCESSOR: analyze_guinness_split ===')
             print(f'Timestamp: {datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]}')
             print(f'{"="*80}')
-            print(f'Image path: {image_path}')
-
-            # Load image to verify
-            image = cv2.imread(image_path)
-            if image is None:
-                print(f'ERROR: Failed to load image from {image_path}')
+            print(f'Image: {image_name} ({len(image_bytes)} bytes)')
+
+            # Pixels are decoded on demand: a reduced preview for the upload
+            # now, the full-resolution G-logo region after the workflow call
+            source = self.image_loader.open(image_bytes)
+            print(f'Image header: {source.width}x{source.height}' if source.header_ok
+                  else 'Image header: unknown format, decoding to check')
+
+            if fast:
+                return self._analyze_locally(source, g_logo_box, image_name)
+
+            # Decode a reduced preview and downscale it for upload;
+            # predictions are mapped back to full resolution
+            prepared = self._prepare_upload(source)
+            if prepared is None:
+                print(f'ERROR: Failed to decode image {image_name}')
                 return {'error': 'Failed to load image'}
+            record_stage('decode', prepared['decode_seconds'])
+            record_stage('preprocess', prepared['encode_seconds'])
 
-            print(f'Image loaded successfully: shape={image.shape}')
+            upload_bytes, upload_scale = prepared['upload'], prepared['scale']
+            print(f'Image loaded successfully: preview shape={prepared["preview_shape"]}')
+            print(f'Upload: {len(image_bytes)} -> {len(upload_bytes)} bytes (scale={upload_scale:.3f})')
 
             # Encode image to base64
-            with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
+            with timed_stage('base64_encode'):
+                image_data = base64.b64encode(upload_bytes).decode('utf-8')
 
             # Call Roboflow Workflow
             print(f'\n{"="*80}')
@@ -66,26 +338,18 @@ class GuinnessVisionProcessor:
             print(f'Workflow ID: {self.WORKFLOW_ID}')
             print(f'{"="*80}\n')
 
-            url = f"https://detect.roboflow.com/infer/workflows/{self.WORKSPACE_NAME}/{self.WORKFLOW_ID}"
-
-            payload = {
-                "api_key": self.ROBOFLOW_API_KEY,
-                "inputs": {
-                    "image": {
-                        "type": "base64",
-                        "value": image_data
-                    }
-                }
-            }
-
-            response = requests.post(url, json=payload)
-
-            if response.status_code != 200:
-                print(f'ERROR: Workflow API call failed: {response.status_code}')
-                print(f'Response: {response.text}')
-                return {'error': f'Workflow API failed: {response.status_code}'}
-
-            workflow_result = response.json()
+            try:
+                with timed_stage('roboflow'):
+                    workflow_result = self.roboflow.run_workflow(image_data, deadline=deadline)
+            except RoboflowError as e:
+                print(f'ERROR: {e}')
+                if g_logo_box is not None:
+                    print(f'Falling back to local beer line detector on the client G-logo box')
+                    return self._analyze_locally(source, g_logo_box, image_name)
+                if isinstance(e, RoboflowDeadlineExceeded):
+                    return {'error': 'Analysis timed out',
+                            'message': 'Roboflow did not answer before the request deadline'}
+                return {'error': str(e)}
 
             # Print full workflow response for debugging
             print(f'\n{"="*80}')
@@ -94,235 +358,79 @@ class GuinnessVisionProcessor:
             print(json.dumps(workflow_result, indent=2, default=str))
             print(f'{"="*80}\n')
 
-            # Parse workflow outputs
-            if 'outputs' in workflow_result and isinstance(workflow_result['outputs'], list):
-                outputs = workflow_result['outputs'][0]
-            else:
-                outputs = workflow_result
-
-            # Extract TWO model results (Model 3 removed in v9)
-            # CRITICAL: Roboflow uses spaces in some keys, underscores in others
-            pint_results = outputs.get('pint results', {})  # SPACE
-            split_results_array = outputs.get('split_results', [])  # UNDERSCORE
-            split_results = split_results_array[0] if split_results_array else {}
+            # Map predictions back to full resolution, then parse once for
+            # crop selection, scoring, debug output and the archive
+            outputs = rescale_workflow_outputs(unwrap_outputs(workflow_result), upload_scale)
+            workflow = WorkflowResult.from_outputs(outputs)
 
             print(f'--- Parsed Workflow Outputs ---')
-            print(f'Pint results available: {bool(pint_results)}')
-            print(f'Split results available: {bool(split_results)}')
+            print(f'Pint predictions: {len(workflow.pint.predictions)}')
+            print(f'Split predictions: {len(workflow.split.predictions)}')
 
             # ALWAYS CROP G-LOGO USING MODEL 1 (for debugging all cases)
+            crop_started = time.perf_counter()
             g_crop = None
             crop_info = None
 
             # First, try to use Model 2's crop coordinates (most precise)
-            if split_results and 'predictions' in split_results and len(split_results['predictions']) > 0:
-                pred = split_results['predictions'][0]
-                parent_origin = pred.get('parent_origin', {})
-
-                if parent_origin:
-                    offset_x = parent_origin['offset_x']
-                    offset_y = parent_origin['offset_y']
-                    crop_width = split_results['image']['width']
-                    crop_height = split_results['image']['height']
-
-                    # Crop the G-logo from original image
-                    g_crop = image[
-                        offset_y:offset_y + crop_height,
-                        offset_x:offset_x + crop_width
-                    ]
-
-                    crop_info = {
-                        'offset_x': offset_x,
-                        'offset_y': offset_y,
-                        'width': crop_width,
-                        'height': crop_height,
-                        'source': 'Model 2'
-                    }
-
-                    print(f'\n{"─"*80}')
-                    print(f'📸 G-LOGO CROP (Model 2 coordinates)')
-                    print(f'   Crop size: {crop_width}x{crop_height} pixels')
-                    print(f'   Crop offset: ({offset_x}, {offset_y})')
-                    print(f'{"─"*80}\n')
-
-                    # DEBUG: Save crop for diagnostic analysis
-                    if os.getenv('SAVE_DEBUG_CROPS') == '1':
-                        debug_dir = "/tmp/gsplit_crops"
-                        os.makedirs(debug_dir, exist_ok=True)
-
-                        # Extract image name from path
-                        image_name = os.path.basename(image_path)
-                        base_name = os.path.splitext(image_name)[0]
-
-                        # Tag filename with crop source (Model_2 or Model_1)
-                        source_tag = crop_info['source'].replace(' ', '_')
-
-                        # Save crop
-                        crop_path = f"{debug_dir}/{base_name}_{source_tag}_crop.jpg"
-                        cv2.imwrite(crop_path, g_crop)
-
-                        # Log crop metadata
-                        height, width = g_crop.shape[:2] if len(g_crop.shape) >= 2 else (0, 0)
-                        aspect_ratio = width / height if height > 0 else 0
-                        print(f"DEBUG: Saved {source_tag} crop: {crop_path}")
-                        print(f"       Size: {width}x{height} | Aspect: {aspect_ratio:.2f} | Source: {crop_info['source']}")
+            split_prediction = workflow.split_prediction
+            if split_prediction is not None and split_prediction.parent_origin:
+                offset_x, offset_y = split_prediction.parent_origin
+                crop_width = int(round(workflow.split.image_width))
+                crop_height = int(round(workflow.split.image_height))
+
+                crop_info = {
+                    'offset_x': offset_x,
+                    'offset_y': offset_y,
+                    'width': crop_width,
+                    'height': crop_height,
+                    'source': 'Model 2'
+                }
+
+                print(f'\n{"─"*80}')
+                print(f'📸 G-LOGO CROP (Model 2 coordinates)')
+                print(f'   Crop size: {crop_width}x{crop_height} pixels')
+                print(f'   Crop offset: ({offset_x}, {offset_y})')
+                print(f'{"─"*80}\n')
 
             # Fallback: Use Model 1's G-logo detection to crop (for Tier 2 cases)
-            if g_crop is None and pint_results and 'predictions' in pint_results:
-                pint_predictions = pint_results.get('predictions', [])
-                g_logo_pint = None
-
-                for pred in pint_predictions:
-                    if pred.get('class') in ['g-logo', 'G']:
-                        g_logo_pint = pred
-                        break
-
-                if g_logo_pint:
-                    img_height = pint_results['image']['height']
-                    img_width = pint_results['image']['width']
-
-                    # Get G-logo bounding box from Model 1
-                    g_x = g_logo_pint['x']
-                    g_y = g_logo_pint['y']
-                    g_width = g_logo_pint['width']
-                    g_height = g_logo_pint['height']
-
-                    # Calculate crop coordinates (with padding)
-                    padding = 20
-                    offset_x = max(0, int(g_x - g_width/2) - padding)
-                    offset_y = max(0, int(g_y - g_height/2) - padding)
-                    crop_width = min(int(g_width) + 2*padding, img_width - offset_x)
-                    crop_height = min(int(g_height) + 2*padding, img_height - offset_y)
-
-                    # Crop the G-logo
-                    g_crop = image[
-                        offset_y:offset_y + crop_height,
-                        offset_x:offset_x + crop_width
-                    ]
-
-                    crop_info = {
-                        'offset_x': offset_x,
-                        'offset_y': offset_y,
-                        'width': crop_width,
-                        'height': crop_height,
-                        'source': 'Model 1',
-                        'g_logo_full_image': g_logo_pint  # Store for coordinate transformation
-                    }
-
-                    print(f'\n{"─"*80}')
-                    print(f'📸 G-LOGO CROP (Model 1 coordinates - Tier 2 fallback)')
-                    print(f'   Crop size: {crop_width}x{crop_height} pixels')
-                    print(f'   Crop offset: ({offset_x}, {offset_y})')
-                    print(f'{"─"*80}\n')
-
-                    # DEBUG: Save crop for diagnostic analysis
-                    if os.getenv('SAVE_DEBUG_CROPS') == '1':
-                        debug_dir = "/tmp/gsplit_crops"
-                        os.makedirs(debug_dir, exist_ok=True)
-
-                        # Extract image name from path
-                        image_name = os.path.basename(image_path)
-                        base_name = os.path.splitext(image_name)[0]
-
-                        # Tag filename with crop source (Model_2 or Model_1)
-                        source_tag = crop_info['source'].replace(' ', '_')
-
-                        # Save crop
-                        crop_path = f"{debug_dir}/{base_name}_{source_tag}_crop.jpg"
-                        cv2.imwrite(crop_path, g_crop)
-
-                        # Log crop metadata
-                        height, width = g_crop.shape[:2] if len(g_crop.shape) >= 2 else (0, 0)
-                        aspect_ratio = width / height if height > 0 else 0
-                        print(f"DEBUG: Saved {source_tag} crop: {crop_path}")
-                        print(f"       Size: {width}x{height} | Aspect: {aspect_ratio:.2f} | Source: {crop_info['source']}")
-
-            # Calculate score using v9 SIMPLIFIED SYSTEM (Model 2 + Model 1 fallback)
-            score_result = self._calculate_score_from_workflow(
-                split_results, pint_results, g_crop, crop_info, image_path
+            g_logo = workflow.g_logo
+            if crop_info is None and g_logo is not None and workflow.pint.image_height is not None:
+                img_height = int(round(workflow.pint.image_height))
+                img_width = int(round(workflow.pint.image_width))
+
+                # Crop the G-logo from Model 1's bounding box (with padding)
+                crop_info = box_region(g_logo.box(), img_width, img_height)
+                crop_info['source'] = 'Model 1'
+                crop_info['g_logo_full_image'] = g_logo.box()  # Store for coordinate transformation
+                offset_x, offset_y = crop_info['offset_x'], crop_info['offset_y']
+                crop_width, crop_height = crop_info['width'], crop_info['height']
+
+                print(f'\n{"─"*80}')
+                print(f'📸 G-LOGO CROP (Model 1 coordinates - Tier 2 fallback)')
+                print(f'   Crop size: {crop_width}x{crop_height} pixels')
+                print(f'   Crop offset: ({offset_x}, {offset_y})')
+                print(f'{"─"*80}\n')
+
+            # Crop the G-logo from the original image
+            if crop_info is not None:
+                g_crop = self._crop(source, crop_info)
+
+            observe_stage('g_crop', crop_started)
+
+            # Calculate score (Model 2, local detector, Model 1 fallback, 25% floor)
+            with timed_stage('scoring'):
+                score_result = self._calculate_score_from_workflow(workflow, g_crop)
+
+            # Debug artifacts are rendered and written on a background thread
+            score_result['debug_crop_path'] = self._queue_debug_artifacts(
+                g_crop, crop_info, score_result, workflow.split.image_height, image_name
             )
 
-            # Extract values from result dictionary
-            score = score_result['score']
-            distance_mm = score_result['distance_mm']
-            split_detected = score_result['split_detected']
-
-            # DEBUG: Save annotated crop with g-bar (green) and beer line (red)
-            if os.getenv('SAVE_DEBUG_CROPS') == '1' and g_crop is not None:
-                beer_line_y = score_result.get('beer_line_y')
-                if beer_line_y is not None:
-                    debug_dir = "/tmp/gsplit_crops"
-                    image_name = os.path.basename(image_path)
-                    base_name = os.path.splitext(image_name)[0]
-                    source_tag = crop_info['source'].replace(' ', '_')
-
-                    # Create annotated copy
-                    annotated = g_crop.copy()
-                    height, width = annotated.shape[:2] if len(annotated.shape) >= 2 else (0, 0)
-
-                    if height > 0 and width > 0:
-                        # Draw green line at y=0.5 (assumed g-bar position)
-                        center_y = int(height * 0.5)
-                        cv2.line(annotated, (0, center_y), (width, center_y), (0, 255, 0), 2)
-
-                        # Draw red line at detected beer line position
-                        beer_y = int(height * beer_line_y)
-                        cv2.line(annotated, (0, beer_y), (width, beer_y), (0, 0, 255), 2)
-
-                        # Save annotated crop
-                        annotated_path = f"{debug_dir}/{base_name}_{source_tag}_annotated.jpg"
-                        cv2.imwrite(annotated_path, annotated)
-                        print(f"DEBUG: Saved annotated crop: {annotated_path}")
-                        print(f"       Green line (g-bar @ 0.5): y={center_y} | Red line (beer): y={beer_y}")
+            result = self._build_result(score_result, workflow.outputs)
 
-            print(f'\n{"="*80}')
-            print(f'=== FINAL SCORE CALCULATION ===')
-            print(f'Score: {score}%')
-            print(f'Split detected: {split_detected}')
-            print(f'Distance: {distance_mm:.2f}mm')
-            print(f'Model 2 available: {score_result["model2_available"]}')
-            print(f'{"="*80}\n')
-
-            # Save G-logo crop for Model 2 failed cases (for debugging)
-            if g_crop is not None and not score_result['model2_available']:
-                failed_crops_dir = '/Users/justinshaffer/Desktop/GSplit_Test_Results/failed_crops'
-                os.makedirs(failed_crops_dir, exist_ok=True)
-
-                base_name = os.path.splitext(os.path.basename(image_path))[0]
-                crop_filename = f'{base_name}_crop.jpg'
-                crop_path = os.path.join(failed_crops_dir, crop_filename)
-
-                cv2.imwrite(crop_path, g_crop)
-                print(f'💾 SAVED FAILED CROP: {crop_path}')
-                print(f'   (Model 2 could not detect beer-split in this crop)\n')
-
-            feedback = self._generate_feedback(distance_mm, score, split_detected)
-
-            result = {
-                'score': score,
-                'distance_from_g_line_mm': round(distance_mm, 2),
-                'g_line_detected': split_detected,
-                'confidence': 0.95 if split_detected else 0.5,
-                'feedback': feedback,
-                # Debug fields
-                'model2_available': score_result['model2_available'],
-                'model3_fallback_used': score_result['model3_fallback_used'],
-                'beer_line_in_zone': score_result['beer_line_in_zone'],
-                'beer_line_y': score_result['beer_line_y'],
-                'g_bar_y': score_result['g_bar_y'],
-                'g_curve_y': score_result['g_curve_y'],
-                'debug_crop_path': score_result['debug_crop_path'],
-                # G-logo bbox from Model 1 (for diagnostic analysis)
-                'g_logo_width': score_result.get('g_logo_width'),
-                'g_logo_height': score_result.get('g_logo_height'),
-                'debug_info': {
-                    'workflow_outputs': outputs,
-                    'split_detected': split_detected
-                }
-            }
-
-            print(f'=== ANALYSIS COMPLETE ===')
-            print(f'Final result: {result}\n')
+            if self.archive is not None and digest is not None:
+                self._archive_result(digest, result, image_name, g_crop)
 
             return result
 
@@ -336,150 +444,241 @@ class GuinnessVisionProcessor:
             logger.error(f"Error in analyze_guinness_split: {str(e)}", exc_info=True)
             return {'error': 'Analysis failed', 'message': str(e)}
 
-    def _calculate_score_from_workflow(self, split_results: Dict, pint_results: Dict,
-                                       g_crop: np.ndarray, crop_info: Dict, image_path: str) -> Dict:
-        """v5 SIMPLIFIED SCORING: Binary multiplier + exponential decay."""
+    def _prepare_upload(self, source: SourceImage) -> Optional[Dict]:
+        """Decode and re-encode the upload, in the CPU pool when enabled (see prepare_source_upload)."""
+        runner = self.cpu_pool.prepare_upload if self.cpu_pool is not None else prepare_source_upload
+        return runner(source, self.upload_max_dimension,
+                      Config.ROBOFLOW_UPLOAD_FORMAT, Config.ROBOFLOW_UPLOAD_QUALITY)
 
-        # Extract Model 1 G-logo bbox for diagnostic analysis
-        pint_predictions = pint_results.get('predictions', []) if pint_results else []
-        g_logo_model1 = next((p for p in pint_predictions if p.get('class') in ['g-logo', 'G']), None)
-        g_logo_width = g_logo_model1['width'] if g_logo_model1 else None
-        g_logo_height_full = g_logo_model1['height'] if g_logo_model1 else None
+    def _crop(self, source: SourceImage, crop_info: Dict) -> Optional[np.ndarray]:
+        """Cut the crop_info region at full resolution, in the CPU pool when enabled."""
+        runner = self.cpu_pool.crop if self.cpu_pool is not None else SourceImage.crop
+        return runner(source, crop_info['offset_x'], crop_info['offset_y'],
+                      crop_info['width'], crop_info['height'])
 
-        # v6: Use ALL Model 2 predictions (no confidence filter)
-        split_predictions = split_results.get('predictions', [])
-        model2_available = bool(split_predictions)
+    def _analyze_locally(self, source: SourceImage, g_logo_box: Dict, image_name: str) -> Dict:
+        """
+        Score an image from a client G-logo box with the local detector (no Roboflow).
 
-        if model2_available:
-            # v9 DEAD SIMPLE: Distance from center
-            img_height = split_results['image']['height']
-            beer_split = split_predictions[0]
+        Only the G-logo region is decoded.
 
-            # Step 1: Extract beer line top edge (normalized 0-1)
-            beer_line_y = (beer_split['y'] - (beer_split['height'] / 2)) / img_height
+        Args:
+            source: Image to crop
+            g_logo_box: G-logo box (centre x, y, width, height in image pixels)
+            image_name: Name used for debug artifacts
 
-            # Step 2: Calculate distance from center (0.5)
-            distance = abs(beer_line_y - 0.5)
+        Returns:
+            Result dictionary (debug_info.fast_mode is True), or an error
+        """
+        with timed_stage('local_detect'):
+            # Without header dimensions the region is clipped by crop() itself
+            crop_info = box_region(g_logo_box, source.width or sys.maxsize, source.height or sys.maxsize)
+            g_crop = self._crop(source, crop_info)
+            if g_crop is None:
+                print(f'ERROR: Failed to decode image {image_name}')
+                return {'error': 'Failed to load image'}
+            crop_info['height'], crop_info['width'] = g_crop.shape[:2]
+            detected = detect_beer_line(g_crop, min_contrast=Config.LOCAL_DETECTOR_MIN_CONTRAST)
 
-            # Step 3: Linear scoring, clamped to 50-100
-            score = 100 - (distance * 100)
-            score = max(50.0, min(100.0, score))
+        if detected is None:
+            return {
+                'error': 'Beer line not detected',
+                'message': 'Could not find the beer line around the G-logo. Try again with the G in focus.'
+            }
 
-            distance_mm = distance * 100  # For API response
+        print(f'  [Local Detector] Beer line: {detected["beer_line_y"]:.4f} (contrast {detected["contrast"]:.3f})')
+        score_result = score_local_beer_line(
+            detected['beer_line_y'], g_logo_box['width'], g_logo_box['height']
+        )
 
-            print(f"  [v9] Beer line: {beer_line_y:.4f} | Distance: {distance:.4f} | Score: {score:.1f}%")
+        crop_info['source'] = 'Local'
+        score_result['debug_crop_path'] = self._queue_debug_artifacts(
+            g_crop, crop_info, score_result, None, image_name
+        )
 
-            # For backwards compatibility, set dummy values
-            g_bar_y_normalized = 0.5
-            g_curve_y_normalized = 0.5
-            in_zone = (distance < 0.25)  # Within 25% of center
+        result = self._build_result(score_result, None)
+        result['debug_info']['fast_mode'] = True
+        return result
 
-            # Debug visualization (keep existing)
-            debug_crop_path = None
-            if g_crop is not None:
-                debug_crop_path = self._save_debug_visualization(
-                    g_crop, beer_line_y * img_height,
-                    0.5 * img_height,  # g_bar at center
-                    0.5 * img_height,  # g_curve at center
-                    distance_mm, img_height, image_path
-                )
+    def _build_result(self, score_result: Dict, outputs: Optional[Dict]) -> Dict:
+        """
+        Turn a score dictionary into the API result, adding feedback.
 
-            return {
-                'score': round(score, 1),
-                'distance_mm': round(distance_mm, 2),
-                'split_detected': in_zone,
-                'model2_available': True,
-                'model3_fallback_used': True,  # We don't use Model 3
-                'beer_line_in_zone': in_zone,
-                'beer_line_y': beer_line_y,
-                'g_bar_y': 0.5,
-                'g_curve_y': 0.5,
-                'debug_crop_path': debug_crop_path,
-                'g_logo_width': g_logo_width,
-                'g_logo_height': g_logo_height_full
+        Args:
+            score_result: Output of _calculate_score_from_workflow or score_local_beer_line
+            outputs: Parsed workflow outputs (None when Roboflow was not called)
+
+        Returns:
+            Result dictionary
+        """
+        # Extract values from result dictionary
+        score = score_result['score']
+        distance_mm = score_result['distance_mm']
+        split_detected = score_result['split_detected']
+
+        print(f'\n{"="*80}')
+        print(f'=== FINAL SCORE CALCULATION ===')
+        print(f'Score: {score}%')
+        print(f'Split detected: {split_detected}')
+        print(f'Distance: {distance_mm:.2f}mm')
+        print(f'Model 2 available: {score_result["model2_available"]}')
+        print(f'{"="*80}\n')
+
+        feedback = self._generate_feedback(distance_mm, score, split_detected)
+
+        result = {
+            'score': score,
+            'distance_from_g_line_mm': round(distance_mm, 2),
+            'g_line_detected': split_detected,
+            'confidence': 0.95 if split_detected else 0.5,
+            'feedback': feedback,
+            # Debug fields
+            'model2_available': score_result['model2_available'],
+            'model3_fallback_used': score_result['model3_fallback_used'],
+            'beer_line_in_zone': score_result['beer_line_in_zone'],
+            'beer_line_y': score_result['beer_line_y'],
+            'g_bar_y': score_result['g_bar_y'],
+            'g_curve_y': score_result['g_curve_y'],
+            'debug_crop_path': score_result['debug_crop_path'],
+            'local_detector_used': score_result['local_detector_used'],
+            # G-logo bbox from Model 1 (for diagnostic analysis)
+            'g_logo_width': score_result.get('g_logo_width'),
+            'g_logo_height': score_result.get('g_logo_height'),
+            'debug_info': {
+                'workflow_outputs': outputs,
+                'split_detected': split_detected
             }
+        }
+
+        print(f'=== ANALYSIS COMPLETE ===')
+        print(f'Final result: {result}\n')
+
+        return result
+
+    def _calculate_score_from_workflow(self, workflow: WorkflowResult,
+                                       g_crop: Optional[np.ndarray] = None) -> Dict:
+        """
+        v10 scoring: Model 2 linear distance, then the local beer line detector
+        on the G crop, then the Model 1 zoned fallback, then the 25% floor
+        (see scoring.py and beer_line_detector.py).
+        """
+        score_result = score_workflow(workflow)
+
+        if not score_result['model2_available'] and self.local_detector_fallback and g_crop is not None:
+            with timed_stage('local_detect'):
+                detected = detect_beer_line(g_crop, min_contrast=Config.LOCAL_DETECTOR_MIN_CONTRAST)
+            if detected is not None:
+                print(f"  [Local Detector] Beer line: {detected['beer_line_y']:.4f} "
+                      f"(contrast {detected['contrast']:.3f})")
+                score_result = score_local_beer_line(
+                    detected['beer_line_y'], score_result['g_logo_width'], score_result['g_logo_height']
+                )
+                print(f"  [Local Detector] Score: {score_result['score']:.1f}%")
+                return score_result
+
+        if score_result['model2_available']:
+            print(f"  [v9] Beer line: {score_result['beer_line_y']:.4f} | "
+                  f"Distance: {score_result['distance_mm'] / 100:.4f} | Score: {score_result['score']:.1f}%")
+        elif score_result['model3_fallback_used']:
+            print(f"  [Model 1 Fallback] Distance: {score_result['distance_mm'] / 100:.2f}x g-logo height")
+            print(f"  [Model 1 Fallback] Score: {score_result['score']:.1f}%")
         else:
-            # Model 2 failed - try Model 1 beer detection fallback
-            print(f"  [Model 2 Failed] Attempting Model 1 beer detection fallback...")
+            print(f"  [Ultimate Fallback] Model 1 found no beer/g-logo pair - returning hardcoded 25%")
 
-            # Check if Model 1 detected both "beer" and "g-logo"
-            beer_model1 = next((p for p in pint_predictions if p.get('class') == 'beer'), None)
+        return score_result
 
-            if beer_model1 and g_logo_model1:
-                # Both beer and g-logo detected by Model 1 - calculate fallback score
-                print(f"  [Model 1 Fallback] Both 'beer' and 'g-logo' detected!")
+    def _queue_debug_artifacts(self, g_crop: Optional[np.ndarray], crop_info: Optional[Dict],
+                               score_result: Dict, crop_height: Optional[float],
+                               image_name: str) -> Optional[str]:
+        """
+        Queue debug crops for the background writer.
 
-                # Get full image dimensions
-                img_height = pint_results['image']['height']
-                img_width = pint_results['image']['width']
+        Sampled analyses get the raw crop, the annotated crop and (for Model 2
+        results) the debug visualization. Unsampled Model 2 failures get the
+        raw crop only, when DEBUG_ARTIFACTS_ON_FAILURE is set. Nothing is
+        queued while the load governor sheds debug artifacts.
 
-                # Extract positions (all in full image coordinates)
-                beer_y_top = beer_model1['y'] - (beer_model1['height'] / 2)  # Top edge of beer
-                g_logo_center_y = g_logo_model1['y']  # Center of G-logo
-                g_logo_height = g_logo_model1['height']
+        Args:
+            crop_height: Height of the Model 2 crop (None without a Model 2 result)
 
-                # Calculate distance from beer line to g-logo center
-                distance_pixels = abs(beer_y_top - g_logo_center_y)
+        Returns:
+            Path the Model 2 debug visualization will be written to, if queued
+        """
+        if g_crop is None or g_crop.size == 0:
+            return None
+        if self._shedding(SHED_DEBUG_ARTIFACTS):
+            return None
 
-                # Normalize by g-logo height
-                distance_normalized = distance_pixels / g_logo_height
+        model2_failed = not score_result['model2_available']
+        sampled = self.debug_writer.should_sample()
+        if not sampled and not (model2_failed and self.debug_writer.write_failures):
+            return None
 
-                # Scoring zones based on distance
-                if distance_normalized < 0.5:
-                    # Close to center - score 40-49%
-                    score = 49 - (distance_normalized * 20)
-                elif distance_normalized < 1.0:
-                    # Medium distance - score 30-39%
-                    score = 39 - ((distance_normalized - 0.5) * 20)
-                else:
-                    # Far from center - score 15-29%
-                    score = max(15, 29 - ((distance_normalized - 1.0) * 10))
+        with timed_stage('debug_write'):
+            # Copy the (small) crop so queued artifacts never pin the
+            # full-resolution image in memory. The renders below share it
+            # and each draw on their own copy
+            crop = g_crop.copy()
+            base_name = os.path.splitext(os.path.basename(image_name))[0]
+            source_tag = crop_info['source'].replace(' ', '_')
 
-                score = round(score, 1)
+            if not sampled:
+                self.debug_writer.submit(f'{base_name}_{source_tag}_failed_crop.jpg', lambda: crop)
+                return None
 
-                print(f"  [Model 1 Fallback] Beer at y={beer_y_top:.1f}, G-logo at y={g_logo_center_y:.1f}")
-                print(f"  [Model 1 Fallback] Distance: {distance_normalized:.2f}x g-logo height")
-                print(f"  [Model 1 Fallback] Score: {score:.1f}%")
+            self.debug_writer.submit(f'{base_name}_{source_tag}_crop.jpg', lambda: crop)
 
-                return {
-                    'score': score,
-                    'distance_mm': round(distance_normalized * 100, 2),
-                    'split_detected': False,  # Still a failure case
-                    'model2_available': False,
-                    'model3_fallback_used': True,  # Repurposed for Model 1 fallback indicator
-                    'beer_line_in_zone': (distance_normalized < 0.5),
-                    'beer_line_y': beer_y_top / img_height,  # Normalized
-                    'g_bar_y': g_logo_center_y / img_height,
-                    'g_curve_y': None,
-                    'debug_crop_path': None,
-                    'g_logo_width': g_logo_width,
-                    'g_logo_height': g_logo_height_full
-                }
-            else:
-                # Model 1 also failed - ultimate fallback to 25%
-                print(f"  [Model 1 Fallback] Failed - beer={bool(beer_model1)}, g-logo={bool(g_logo_model1)}")
-                print(f"  [Ultimate Fallback] Returning hardcoded 25%")
+            beer_line_y = score_result.get('beer_line_y')
+            if beer_line_y is not None:
+                self.debug_writer.submit(
+                    f'{base_name}_{source_tag}_annotated.jpg',
+                    lambda: self._render_annotated_crop(crop, beer_line_y)
+                )
 
-                return {
-                    'score': 25.0,
-                    'distance_mm': 50.0,
-                    'split_detected': False,
-                    'model2_available': False,
-                    'model3_fallback_used': False,
-                    'beer_line_in_zone': False,
-                    'beer_line_y': None,
-                    'g_bar_y': None,
-                    'g_curve_y': None,
-                    'debug_crop_path': None,
-                    'g_logo_width': g_logo_width,
-                    'g_logo_height': g_logo_height_full
-                }
+            if model2_failed:
+                return None
 
-    def _save_debug_visualization(self, crop_image: np.ndarray, beer_line_y: float,
-                                  g_bar_y: float, g_curve_y: float, distance_mm: float, img_height: int,
-                                  original_filename: str) -> str:
+            distance_mm = score_result['distance_mm']
+            return self.debug_writer.submit(
+                f'{base_name}_debug.jpg',
+                lambda: self._render_debug_visualization(
+                    crop, beer_line_y * crop_height,
+                    0.5 * crop_height,  # g_bar at center
+                    0.5 * crop_height,  # g_curve at center
+                    distance_mm
+                )
+            )
+
+    @staticmethod
+    def _render_annotated_crop(crop_image: np.ndarray, beer_line_y: float) -> np.ndarray:
         """
-        Save annotated crop showing beer line, G-bar, and G-curve positions
+        Draw the assumed g-bar (green, y=0.5) and detected beer line (red) on a crop.
+
+        Args:
+            crop_image: Cropped G-logo image
+            beer_line_y: Normalized beer line position (0-1)
+
+        Returns:
+            Annotated copy of the crop
+        """
+        # The crop is shared with the other queued renders; draw on a copy
+        annotated = crop_image.copy()
+        height, width = annotated.shape[:2]
+
+        center_y = int(height * 0.5)
+        cv2.line(annotated, (0, center_y), (width, center_y), (0, 255, 0), 2)
+
+        beer_y = int(height * beer_line_y)
+        cv2.line(annotated, (0, beer_y), (width, beer_y), (0, 0, 255), 2)
+
+        return annotated
+
+    @staticmethod
+    def _render_debug_visualization(crop_image: np.ndarray, beer_line_y: float,
+                                    g_bar_y: float, g_curve_y: float,
+                                    distance_mm: float) -> np.ndarray:
+        """
+        Annotate a crop with beer line, G-bar, and G-curve positions
 
         Args:
             crop_image: Cropped G-logo image
@@ -487,11 +686,9 @@ class GuinnessVisionProcessor:
             g_bar_y: Y coordinate of G-bar in crop
             g_curve_y: Y coordinate of G-curve in crop
             distance_mm: Distance in millimeters
-            img_height: Height of crop image
-            original_filename: Original image filename for unique naming
 
         Returns:
-            Full path to saved debug crop
+            Annotated copy of the crop
         """
         annotated = crop_image.copy()
         height, width = annotated.shape[:2]
@@ -523,28 +720,14 @@ class GuinnessVisionProcessor:
         cv2.putText(annotated, f'{distance_mm:.0f}mm', (mid_x + 2, (y_beer + y_bar) // 2),
                     font, 0.22, (0, 255, 255), 1)
 
-        # Save to centralized location with original filename
-        output_dir = '/Users/justinshaffer/Desktop/GSplit_Test_Results/debug_crops'
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Extract base filename without extension
-        base_name = os.path.splitext(os.path.basename(original_filename))[0]
-        output_filename = f'{base_name}_debug.jpg'
-        output_path = os.path.join(output_dir, output_filename)
-
-        cv2.imwrite(output_path, annotated)
-
-        print(f'📊 SAVED DEBUG VISUALIZATION: {output_path}')
-        print(f'   🔵 Cyan line = G-curve (calculated)')
-        print(f'   🔴 Red line = G-bar (Model 3)')
-        print(f'   🟢 Green line = Beer line (Model 2)')
-        print(f'   🟡 Yellow = Distance\n')
-
-        return output_path
+        return annotated
 
     def _generate_feedback(self, distance_mm: float, score: float, split_detected: bool) -> str:
         """
         Generate feedback - 80% pre-written, 20% AI-generated.
+
+        AI roasts come from the pre-generated pool; the request never waits on
+        the LLM. Under load (SHED_AI_ROASTS) every roast is pre-written.
         """
         import random
 
@@ -552,82 +735,36 @@ class GuinnessVisionProcessor:
         print(f'🎲 FEEDBACK GENERATION: Rolling for AI vs Pre-written')
         print(f'   Score: {score}%, Distance: {distance_mm:.1f}mm, Split: {split_detected}')
 
-        # 20% chance: Call Claude API for fresh roast
+        # 20% chance: Serve a pre-generated AI roast
         roll = random.random()
-        print(f'   Random roll: {roll:.4f} (need < 0.2 for AI)')
+        print(f'   Random roll: {roll:.4f} (need < {Config.AI_ROAST_RATE} for AI)')
 
-        if roll < 0.2:
-            print(f'🤖 AI FEEDBACK TRIGGERED! Calling Claude API...')
-            try:
-                ai_feedback = self._generate_ai_feedback(score, distance_mm, split_detected)
+        if self.roast_pool is not None and roll < Config.AI_ROAST_RATE and not self._shedding(SHED_AI_ROASTS):
+            with timed_stage('feedback_ai'):
+                ai_feedback = self.roast_pool.pop(('split', get_roast_tier(score)))
                 if ai_feedback:
-                    print(f'✅ Using AI-generated feedback')
-                    print(f'{"─"*80}\n')
-                    return ai_feedback
-                else:
-                    print(f'⚠️  AI returned None, falling back to pre-written')
-            except Exception as e:
-                print(f"❌ AI feedback exception: {e}")
-                import traceback
-                traceback.print_exc()
+                    ai_feedback = fill_distance(ai_feedback, distance_mm)
+            if ai_feedback:
+                print(f'🤖 Using AI-generated feedback: "{ai_feedback}"')
+                print(f'{"─"*80}\n')
+                return ai_feedback
+            print(f'⚠️  AI roast pool empty, falling back to pre-written')
 
         # 80% chance: Use pre-written feedback from roast bank
-        roast = get_roast(score, distance_mm)
+        with timed_stage('feedback_roast_bank'):
+            roast = get_roast(score, distance_mm)
         print(f'📝 Using pre-written feedback: "{roast}"')
         print(f'{"─"*80}\n')
         return roast
 
-    def _generate_ai_feedback(self, score: float, distance_mm: float, split_detected: bool) -> str:
-        """
-        Call Claude API for dynamic feedback generation using new roast bank prompt.
-        """
-        print(f'\n   🔑 _generate_ai_feedback() called')
-
-        try:
-            import anthropic
-            import os
-
-            # Get API key from environment variable
-            api_key = os.environ.get("ANTHROPIC_API_KEY")
-            api_key_present = bool(api_key)
-            api_key_preview = f"{api_key[:15]}..." if api_key else "None"
-
-            print(f'   🔐 API Key check:')
-            print(f'      Present: {api_key_present}')
-            print(f'      Preview: {api_key_preview}')
-
-            if not api_key:
-                print("   ❌ ANTHROPIC_API_KEY not set in environment, skipping AI feedback")
-                return None
-
-            print(f'   ✅ API key found, initializing Anthropic client...')
-            client = anthropic.Anthropic(api_key=api_key)
-
-            # Use centralized prompt from roast bank
-            prompt = get_ai_prompt(score, distance_mm, split_detected)
-
-            print(f'   📡 Calling Claude Sonnet 4 API...')
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=50,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            feedback = message.content[0].text.strip()
-            print(f'   ✨ AI response received: "{feedback}"')
-            return feedback
-
-        except Exception as e:
-            print(f"   ❌ AI feedback error: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-
     def generate_pub_roast(self, rating: float, taste: float,
                            temperature: float, head: float, pub: str) -> Dict:
         """
         Generate pub roast - 80% pre-written, 20% AI-generated.
 
+        AI roasts come from the pre-generated pool for the rating tier, so the
+        taste/temperature/head ratings and pub name are only logged.
+
         Args:
             rating: Overall rating (0-5)
             taste: Taste rating (0-5)
@@ -644,105 +781,28 @@ class GuinnessVisionProcessor:
         print(f'🍺 PUB ROAST GENERATION: Rolling for AI vs Pre-written')
         print(f'   Rating: {rating}/5, Pub: {pub}')
 
-        # Determine tier
-        if rating >= 4.5:
-            tier = 'top'
-        elif rating >= 3.5:
-            tier = 'solid'
-        elif rating >= 2.5:
-            tier = 'mid'
-        elif rating >= 1.5:
-            tier = 'rough'
-        else:
-            tier = 'bottom'
+        tier = get_pub_tier(rating)
 
-        roast_options = self.PUB_ROAST_LIBRARY[tier]
-
-        # 20% chance: Call Claude API
+        # 20% chance: Serve a pre-generated AI roast
         roll = random.random()
-        print(f'   Random roll: {roll:.4f} (need < 0.2 for AI)')
+        print(f'   Random roll: {roll:.4f} (need < {Config.AI_ROAST_RATE} for AI)')
 
-        if roll < 0.2:
-            print(f'🤖 AI ROAST TRIGGERED! Calling Claude API...')
-            try:
-                ai_roast = self._generate_ai_pub_roast(
-                    rating, taste, temperature, head, pub, tier
-                )
-                if ai_roast:
-                    print(f'✅ Using AI-generated roast')
-                    print(f'{"─"*80}\n')
-                    return {
-                        'roast': ai_roast,
-                        'is_ai_generated': True
-                    }
-                else:
-                    print(f'⚠️  AI returned None, falling back to pre-written')
-            except Exception as e:
-                print(f"❌ AI roast exception: {e}")
+        if self.roast_pool is not None and roll < Config.AI_ROAST_RATE and not self._shedding(SHED_AI_ROASTS):
+            ai_roast = self.roast_pool.pop(('pub', tier))
+            if ai_roast:
+                print(f'🤖 Using AI-generated roast: "{ai_roast}"')
+                print(f'{"─"*80}\n')
+                return {
+                    'roast': ai_roast,
+                    'is_ai_generated': True
+                }
+            print(f'⚠️  AI roast pool empty, falling back to pre-written')
 
         # 80% chance: Use pre-written
-        selected = random.choice(roast_options)
+        selected = random.choice(PUB_ROAST_LIBRARY[tier])
         print(f'📝 Using pre-written roast: "{selected}"')
         print(f'{"─"*80}\n')
         return {
             'roast': selected,
             'is_ai_generated': False
         }
-
-    def _generate_ai_pub_roast(self, rating: float, taste: float,
-                               temperature: float, head: float,
-                               pub: str, tier: str) -> str:
-        """
-        Call Claude API for dynamic pub roast generation.
-        """
-        print(f'\n   🔑 _generate_ai_pub_roast() called')
-
-        try:
-            import anthropic
-            import os
-
-            api_key = os.environ.get("ANTHROPIC_API_KEY")
-
-            if not api_key:
-                print("   ❌ ANTHROPIC_API_KEY not set in environment")
-                return None
-
-            print(f'   ✅ API key found, initializing Anthropic client...')
-            client = anthropic.Anthropic(api_key=api_key)
-
-            ratings_context = f"""Overall: {rating}/5 stars
-Taste: {taste}/5
-Temperature: {temperature}/5
-Head: {head}/5"""
-
-            prompt = f"""You're The Digital Barman - sharp, witty, brutally honest. Judge this pub experience:
-
-{ratings_context}
-Pub: {pub}
-Tier: {tier}
-
-Generate ONE punchy roast/compliment about the pub (max 8 words). Match the {tier} tier vibe - be authentic and sharp, not forced. Use an emoji only if it fits naturally.
-
-Your style examples:
-- Top tier: "Found your local" / "This pub gets it"
-- Solid: "Decent spot" / "Would drink again"
-- Mid: "It's a pub" / "Nothing special"
-- Rough: "Tourist trap energy" / "Why did you stay"
-- Bottom: "Never again" / "A crime scene"
-
-Your response:"""
-
-            print(f'   📡 Calling Claude Sonnet 4 API...')
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=30,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            roast = message.content[0].text.strip()
-            print(f'   ✨ AI response received: "{roast}"')
-            return roast
-
-        except Exception as e:
-            print(f"   ❌ AI roast error: {type(e).__name__}: {e}")
-            return None
\ No newline at end of file
@@ -0,0 +1,357 @@
+"""
+Workflow Output Archive
+Keeps the parsed Roboflow outputs of every analysis so scoring changes can be
+checked offline instead of by re-calling the workflow API.
+
+Entries are zlib-compressed JSON in a SQLite file, keyed by image hash and the
+scoring version that produced the stored score. Only the model results the
+scorer reads ('pint results' and 'split_results') are kept, already mapped to
+full-image coordinates. With store_crops the G-logo crop is kept as a JPEG so
+the local beer line detector can be replayed and benchmarked too. Entries
+scored by the local detector record that, and always keep their crop: their
+score cannot be reproduced from the workflow outputs alone.
+
+Replay the archive with the current scoring code:
+
+    python workflow_archive.py replay --db cache/workflow_archive.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Dict, Iterator, Optional
+
+from workflow_model import PINT_RESULTS_KEY, SPLIT_RESULTS_KEY
+
+logger = logging.getLogger(__name__)
+
+# Workflow output keys the scorer depends on
+ARCHIVED_OUTPUT_KEYS = (PINT_RESULTS_KEY, SPLIT_RESULTS_KEY)
+
+
+class WorkflowArchive:
+    """SQLite store of compressed workflow outputs."""
+
+    def __init__(self, path: str, compression_level: int = 6, store_crops: bool = False):
+        """
+        Open (and create if needed) an archive file.
+
+        Args:
+            path: SQLite file path
+            compression_level: zlib level (1-9)
+            store_crops: Whether callers should archive the G-logo crop
+        """
+        self.path = str(path)
+        self.compression_level = compression_level
+        self.store_crops = store_crops
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS workflow_archive ('
+                ' image_hash TEXT NOT NULL,'
+                ' scoring_version TEXT NOT NULL,'
+                ' outputs BLOB NOT NULL,'
+                ' score REAL,'
+                ' distance_mm REAL,'
+                ' image_name TEXT,'
+                ' created_at REAL NOT NULL,'
+                ' crop BLOB,'
+                ' local_detector_used INTEGER NOT NULL DEFAULT 0,'
+                ' PRIMARY KEY (image_hash, scoring_version))'
+            )
+            # Archives created before crops were stored
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(workflow_archive)')}
+            if 'crop' not in columns:
+                conn.execute('ALTER TABLE workflow_archive ADD COLUMN crop BLOB')
+            # ... and before detector-scored entries were marked
+            if 'local_detector_used' not in columns:
+                conn.execute('ALTER TABLE workflow_archive '
+                             'ADD COLUMN local_detector_used INTEGER NOT NULL DEFAULT 0')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        # WAL makes NORMAL durable against application crashes, which is all
+        # an archive of re-derivable data needs
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def put(self, image_hash: str, scoring_version: str, outputs: Dict,
+            score: Optional[float] = None, distance_mm: Optional[float] = None,
+            image_name: Optional[str] = None, crop_jpeg: Optional[bytes] = None,
+            local_detector_used: bool = False):
+        """
+        Store the outputs for one analysis, replacing any previous entry.
+
+        Args:
+            image_hash: SHA-256 of the image bytes
+            scoring_version: Scoring version that produced score/distance_mm
+            outputs: Parsed workflow outputs (only ARCHIVED_OUTPUT_KEYS are kept)
+            score: Score produced by the scorer (before API validation)
+            distance_mm: Distance produced by the scorer
+            image_name: Original file name, for reference
+            crop_jpeg: JPEG-encoded G-logo crop the score was computed from
+            local_detector_used: Whether the local beer line detector produced the score
+        """
+        archived = {key: outputs[key] for key in ARCHIVED_OUTPUT_KEYS if key in outputs}
+        blob = zlib.compress(
+            json.dumps(archived, separators=(',', ':'), default=str).encode('utf-8'),
+            self.compression_level
+        )
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO workflow_archive '
+                '(image_hash, scoring_version, outputs, score, distance_mm, image_name, created_at, crop, '
+                'local_detector_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (image_hash, scoring_version, blob, score, distance_mm, image_name, time.time(), crop_jpeg,
+                 int(local_detector_used))
+            )
+        finally:
+            conn.close()
+
+    def get(self, image_hash: str, scoring_version: str) -> Optional[Dict]:
+        """
+        Look up one entry.
+
+        Returns:
+            Record dictionary (see iter_records) or None
+        """
+        for record in self._query('WHERE image_hash = ? AND scoring_version = ?',
+                                  (image_hash, scoring_version)):
+            return record
+        return None
+
+    def iter_records(self, scoring_version: Optional[str] = None,
+                     limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Iterate over archived analyses, oldest first.
+
+        Args:
+            scoring_version: Only entries scored by this version
+            limit: Maximum number of entries
+
+        Yields:
+            Dictionaries with image_hash, scoring_version, outputs, score,
+            distance_mm, image_name, created_at, crop (JPEG bytes or None)
+            and local_detector_used
+        """
+        clause, params = '', ()
+        if scoring_version is not None:
+            clause, params = 'WHERE scoring_version = ?', (scoring_version,)
+        clause += ' ORDER BY created_at'
+        if limit is not None:
+            clause += ' LIMIT ?'
+            params += (limit,)
+        yield from self._query(clause, params)
+
+    def _query(self, clause: str, params: tuple) -> Iterator[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'SELECT image_hash, scoring_version, outputs, score, distance_mm, image_name, created_at, crop, '
+                'local_detector_used '
+                f'FROM workflow_archive {clause}', params
+            )
+            for row in cursor:
+                yield {
+                    'image_hash': row[0],
+                    'scoring_version': row[1],
+                    'outputs': json.loads(zlib.decompress(row[2])),
+                    'score': row[3],
+                    'distance_mm': row[4],
+                    'image_name': row[5],
+                    'created_at': row[6],
+                    'crop': row[7],
+                    'local_detector_used': bool(row[8]),
+                }
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Entry count, entries with crops and stored bytes."""
+        conn = self._connect()
+        try:
+            count, crops, size = conn.execute(
+                'SELECT COUNT(*), COUNT(crop), '
+                'COALESCE(SUM(LENGTH(outputs)), 0) + COALESCE(SUM(LENGTH(crop)), 0) '
+                'FROM workflow_archive'
+            ).fetchone()
+        finally:
+            conn.close()
+        return {'entries': count, 'crops': crops, 'bytes': size}
+
+
+def create_workflow_archive(config) -> Optional[WorkflowArchive]:
+    """
+    Build the archive described by the configuration.
+
+    Args:
+        config: Configuration class (see config.Config)
+
+    Returns:
+        WorkflowArchive, or None if WORKFLOW_ARCHIVE_ENABLED is off
+    """
+    if not config.WORKFLOW_ARCHIVE_ENABLED:
+        return None
+    return WorkflowArchive(config.WORKFLOW_ARCHIVE_PATH, store_crops=config.WORKFLOW_ARCHIVE_CROPS)
+
+
+def replay(archive: WorkflowArchive, scoring_version: Optional[str] = None,
+           limit: Optional[int] = None, show: int = 10, local_detector: bool = True,
+           min_contrast: float = 0.08) -> Dict:
+    """
+    Re-score archived outputs with the current scoring kernel.
+
+    Entries without a Model 2 split go through the local beer line detector
+    first when their crop was archived, mirroring the live pipeline.
+    Detector-scored entries without a crop (archived before crops were kept
+    for them) are skipped: their stored score cannot be reproduced.
+
+    Args:
+        archive: Archive to read
+        scoring_version: Only replay entries stored under this version
+        limit: Maximum number of entries
+        show: Number of largest score changes to include
+        local_detector: Apply the local detector fallback to archived crops
+        min_contrast: Detector contrast threshold
+
+    Returns:
+        Dictionary with per-version summaries (including how many entries
+        moved to another roast tier), the number of skipped entries and the
+        largest changes, each with the roast the new score would get
+    """
+    import numpy as np
+    from roast_bank import get_roast_tier, get_roasts
+    from scoring import extract_inputs, score_batch, stack_inputs
+    from workflow_model import WorkflowResult
+
+    records = []
+    rows = []
+    skipped = 0
+    for record in archive.iter_records(scoring_version, limit):
+        if record['local_detector_used'] and record['crop'] is None:
+            skipped += 1
+            continue
+        rows.append(extract_inputs(WorkflowResult.from_outputs(record['outputs'])))
+        records.append(record)
+
+    if not records:
+        return {'entries': 0, 'skipped_without_crop': skipped, 'versions': {}, 'largest_changes': []}
+
+    started = time.perf_counter()
+    scored = score_batch(stack_inputs(rows))
+
+    if local_detector:
+        import cv2
+        from beer_line_detector import detect_beer_line
+        from scoring import TIER_MODEL2, score_local_beer_line
+
+        for i in np.flatnonzero(scored['tier'] != TIER_MODEL2):
+            if records[i]['crop'] is None:
+                continue
+            crop = cv2.imdecode(np.frombuffer(records[i]['crop'], dtype=np.uint8), cv2.IMREAD_COLOR)
+            detected = detect_beer_line(crop, min_contrast=min_contrast)
+            if detected is not None:
+                local = score_local_beer_line(detected['beer_line_y'])
+                scored['score'][i] = local['score']
+                scored['distance_mm'][i] = local['distance_mm']
+
+    elapsed = time.perf_counter() - started
+
+    old_scores = np.array([np.nan if r['score'] is None else r['score'] for r in records])
+    deltas = scored['score'] - old_scores
+    versions = np.array([r['scoring_version'] for r in records])
+
+    summary = {}
+    for version in sorted(set(versions.tolist())):
+        mask = versions == version
+        version_deltas = deltas[mask]
+        known = version_deltas[~np.isnan(version_deltas)]
+        summary[version] = {
+            'entries': int(mask.sum()),
+            'changed': int(np.count_nonzero(known)),
+            'roast_tier_changed': sum(
+                get_roast_tier(new) != get_roast_tier(old)
+                for new, old in zip(scored['score'][mask], old_scores[mask]) if not np.isnan(old)
+            ),
+            'mean_delta': round(float(known.mean()), 3) if known.size else 0.0,
+            'mean_abs_delta': round(float(np.abs(known).mean()), 3) if known.size else 0.0,
+            'max_abs_delta': round(float(np.abs(known).max()), 3) if known.size else 0.0,
+        }
+
+    order = [i for i in np.argsort(-np.nan_to_num(np.abs(deltas), nan=-1.0))[:show]
+             if not np.isnan(deltas[i]) and deltas[i] != 0]
+    # What the user would now be told, from the static bank
+    roasts = get_roasts(scored['score'][order], scored['distance_mm'][order])
+    largest = [
+        {
+            'image_hash': records[i]['image_hash'],
+            'image_name': records[i]['image_name'],
+            'scoring_version': records[i]['scoring_version'],
+            'old_score': records[i]['score'],
+            'new_score': float(scored['score'][i]),
+            'delta': round(float(deltas[i]), 3),
+            'new_roast': roast,
+        }
+        for i, roast in zip(order, roasts)
+    ]
+
+    return {
+        'entries': len(records),
+        'skipped_without_crop': skipped,
+        'scoring_seconds': round(elapsed, 4),
+        'versions': summary,
+        'largest_changes': largest,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Workflow output archive tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replay_parser = subparsers.add_parser('replay', help='Re-score archived outputs with the current scorer')
+    replay_parser.add_argument('--db', default=None, help='Archive path (default: WORKFLOW_ARCHIVE_PATH)')
+    replay_parser.add_argument('--version', default=None, help='Only entries stored under this scoring version')
+    replay_parser.add_argument('--limit', type=int, default=None, help='Maximum entries to replay')
+    replay_parser.add_argument('--show', type=int, default=10, help='Largest changes to list')
+
+    subparsers.add_parser('stats', help='Show archive size').add_argument('--db', default=None)
+
+    args = parser.parse_args(argv)
+
+    from config import Config
+    if args.db is None:
+        args.db = Config.WORKFLOW_ARCHIVE_PATH
+    if not os.path.exists(args.db):
+        print(f'Archive not found: {args.db}', file=sys.stderr)
+        return 1
+
+    archive = WorkflowArchive(args.db)
+    if args.command == 'stats':
+        print(json.dumps(archive.stats(), indent=2))
+        return 0
+
+    report = replay(archive, args.version, args.limit, args.show,
+                    local_detector=Config.LOCAL_DETECTOR_FALLBACK,
+                    min_contrast=Config.LOCAL_DETECTOR_MIN_CONTRAST)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
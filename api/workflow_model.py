@@ -0,0 +1,170 @@
+"""
+Roboflow Workflow Response Model
+Parses a workflow response once into small typed objects shared by crop
+selection, scoring, debug output and the workflow archive.
+
+The workflow mixes key styles ('pint results' with a space, 'split_results'
+with an underscore and wrapped in a list) and the G-logo class has two
+names ('g-logo', 'G'). Those quirks live here only. Each model result keeps
+its predictions in order plus an index of the first prediction per class, so
+lookups don't rescan the prediction list.
+
+The raw outputs dictionary is kept alongside (by reference, not copied) for
+the debug response and the archive.
+"""
+
+from typing import Dict, Optional, Tuple
+
+# Workflow output keys (spelled exactly as Roboflow returns them)
+PINT_RESULTS_KEY = 'pint results'
+SPLIT_RESULTS_KEY = 'split_results'
+
+BEER_CLASS = 'beer'
+G_LOGO_CLASSES = ('g-logo', 'G')
+
+
+def unwrap_outputs(response: Dict) -> Dict:
+    """
+    The outputs dictionary of a workflow API response.
+
+    Args:
+        response: JSON body from RoboflowClient.run_workflow, either
+            {'outputs': [outputs]} or the outputs dictionary itself
+
+    Returns:
+        Outputs dictionary (the same object, not a copy)
+    """
+    if isinstance(response.get('outputs'), list):
+        return response['outputs'][0]
+    return response
+
+
+class Prediction:
+    """One detection box (centre x/y, width/height in full-image pixels)."""
+
+    __slots__ = ('cls', 'x', 'y', 'width', 'height', 'confidence', 'parent_origin')
+
+    def __init__(self, cls: Optional[str], x: float, y: float, width: float, height: float,
+                 confidence: Optional[float] = None,
+                 parent_origin: Optional[Tuple[int, int]] = None):
+        self.cls = cls
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.confidence = confidence
+        self.parent_origin = parent_origin  # (offset_x, offset_y) of the crop Model 2 ran on
+
+    @classmethod
+    def from_dict(cls, pred: Dict) -> 'Prediction':
+        origin = pred.get('parent_origin')
+        return cls(
+            pred.get('class'),
+            pred['x'], pred['y'], pred['width'], pred['height'],
+            pred.get('confidence'),
+            (origin['offset_x'], origin['offset_y']) if origin else None
+        )
+
+    def box(self) -> Dict:
+        """Centre-format box dictionary (x, y, width, height)."""
+        return {'x': self.x, 'y': self.y, 'width': self.width, 'height': self.height}
+
+    def __repr__(self):
+        return (f'Prediction({self.cls!r}, x={self.x}, y={self.y}, '
+                f'width={self.width}, height={self.height})')
+
+
+class ModelResult:
+    """Predictions from one model plus the size of the image it ran on."""
+
+    __slots__ = ('image_width', 'image_height', 'predictions', '_first_index')
+
+    def __init__(self, image_width: Optional[float] = None, image_height: Optional[float] = None,
+                 predictions: Tuple[Prediction, ...] = ()):
+        self.image_width = image_width
+        self.image_height = image_height
+        self.predictions = predictions
+        self._first_index = {}
+        for index, pred in enumerate(predictions):
+            self._first_index.setdefault(pred.cls, index)
+
+    @classmethod
+    def from_dict(cls, result: Optional[Dict]) -> 'ModelResult':
+        if not result:
+            return cls()
+        image = result.get('image') or {}
+        return cls(
+            image.get('width'),
+            image.get('height'),
+            tuple([Prediction.from_dict(pred) for pred in result.get('predictions') or ()])
+        )
+
+    def __bool__(self):
+        return bool(self.predictions)
+
+    def first(self, *classes: str) -> Optional[Prediction]:
+        """
+        Earliest prediction of any of the given classes.
+
+        Args:
+            classes: Class names; with none, the first prediction of any class
+
+        Returns:
+            Prediction or None
+        """
+        if not classes:
+            return self.predictions[0] if self.predictions else None
+        indexes = [self._first_index[c] for c in classes if c in self._first_index]
+        return self.predictions[min(indexes)] if indexes else None
+
+
+class WorkflowResult:
+    """Parsed workflow response: Model 1 (pint) and Model 2 (split) results."""
+
+    __slots__ = ('outputs', 'pint', 'split')
+
+    def __init__(self, outputs: Dict, pint: ModelResult, split: ModelResult):
+        self.outputs = outputs
+        self.pint = pint
+        self.split = split
+
+    @classmethod
+    def parse(cls, response: Dict) -> 'WorkflowResult':
+        """
+        Parse a workflow API response (see unwrap_outputs).
+
+        Returns:
+            WorkflowResult
+        """
+        return cls.from_outputs(unwrap_outputs(response))
+
+    @classmethod
+    def from_outputs(cls, outputs: Optional[Dict]) -> 'WorkflowResult':
+        """
+        Parse one workflow outputs dictionary (as stored in the archive).
+
+        Returns:
+            WorkflowResult
+        """
+        outputs = outputs or {}
+        split_array = outputs.get(SPLIT_RESULTS_KEY) or []
+        return cls(
+            outputs,
+            ModelResult.from_dict(outputs.get(PINT_RESULTS_KEY)),
+            ModelResult.from_dict(split_array[0] if split_array else None)
+        )
+
+    @property
+    def split_prediction(self) -> Optional[Prediction]:
+        """Model 2's beer line box, if it found one."""
+        return self.split.first()
+
+    @property
+    def g_logo(self) -> Optional[Prediction]:
+        """Model 1's G-logo box."""
+        return self.pint.first(*G_LOGO_CLASSES)
+
+    @property
+    def beer(self) -> Optional[Prediction]:
+        """Model 1's beer box."""
+        return self.pint.first(BEER_CLASS)
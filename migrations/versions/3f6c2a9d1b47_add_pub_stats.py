@@ -0,0 +1,85 @@
+"""add pub_stats aggregate table
+
+Revision ID: 3f6c2a9d1b47
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d1b47'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# One row per pub that has none yet, built from its scores and ratings
+BACKFILL = sa.text("""
+    INSERT INTO pub_stats (
+        pub_id, score_count, best_score, best_username, rating_count,
+        overall_sum, taste_sum, temperature_sum, head_sum,
+        taste_good, temperature_good, head_good, updated_at
+    )
+    SELECT
+        p.id,
+        COALESCE(s.score_count, 0), b.score, b.username,
+        COALESCE(r.rating_count, 0),
+        COALESCE(r.overall_sum, 0), COALESCE(r.taste_sum, 0),
+        COALESCE(r.temperature_sum, 0), COALESCE(r.head_sum, 0),
+        COALESCE(r.taste_good, 0), COALESCE(r.temperature_good, 0), COALESCE(r.head_good, 0),
+        CURRENT_TIMESTAMP
+    FROM pubs p
+    LEFT JOIN (
+        SELECT pub_id, COUNT(*) AS score_count FROM scores GROUP BY pub_id
+    ) s ON s.pub_id = p.id
+    LEFT JOIN (
+        SELECT pub_id, score, username,
+               ROW_NUMBER() OVER (PARTITION BY pub_id ORDER BY score DESC, created_at, id) AS rank
+        FROM scores
+    ) b ON b.pub_id = p.id AND b.rank = 1
+    LEFT JOIN (
+        SELECT pub_id,
+               COUNT(*) AS rating_count,
+               SUM(overall_rating) AS overall_sum,
+               SUM(taste) AS taste_sum,
+               SUM(temperature) AS temperature_sum,
+               SUM(head) AS head_sum,
+               SUM(CASE WHEN taste >= 4 THEN 1 ELSE 0 END) AS taste_good,
+               SUM(CASE WHEN temperature >= 4 THEN 1 ELSE 0 END) AS temperature_good,
+               SUM(CASE WHEN head >= 4 THEN 1 ELSE 0 END) AS head_good
+        FROM pub_ratings GROUP BY pub_id
+    ) r ON r.pub_id = p.id
+    WHERE NOT EXISTS (SELECT 1 FROM pub_stats ps WHERE ps.pub_id = p.id)
+""")
+
+
+def upgrade():
+    # The app's db.create_all() may already have created the (empty) table
+    if not sa.inspect(op.get_bind()).has_table('pub_stats'):
+        op.create_table(
+            'pub_stats',
+            sa.Column('pub_id', sa.String(length=36), nullable=False),
+            sa.Column('score_count', sa.Integer(), nullable=False),
+            sa.Column('best_score', sa.Numeric(precision=5, scale=2), nullable=True),
+            sa.Column('best_username', sa.String(length=100), nullable=True),
+            sa.Column('rating_count', sa.Integer(), nullable=False),
+            sa.Column('overall_sum', sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column('taste_sum', sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column('temperature_sum', sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column('head_sum', sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column('taste_good', sa.Integer(), nullable=False),
+            sa.Column('temperature_good', sa.Integer(), nullable=False),
+            sa.Column('head_good', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['pub_id'], ['pubs.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('pub_id')
+        )
+
+    op.execute(BACKFILL)
+
+
+def downgrade():
+    op.drop_table('pub_stats')
@@ -0,0 +1,58 @@
+"""add pubs.geo_cell geohash index
+
+Revision ID: 8b41e5c07d2a
+Revises: 3f6c2a9d1b47
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from geo import GEOHASH_PRECISION, encode_geohash
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e5c07d2a'
+down_revision = '3f6c2a9d1b47'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # The app's db.create_all() may already have created the column on a new database
+    if 'geo_cell' not in {column['name'] for column in inspector.get_columns('pubs')}:
+        with op.batch_alter_table('pubs') as batch_op:
+            batch_op.add_column(sa.Column('geo_cell', sa.String(length=12), nullable=True))
+    if 'ix_pubs_geo_cell' not in {index['name'] for index in inspector.get_indexes('pubs')}:
+        op.create_index('ix_pubs_geo_cell', 'pubs', ['geo_cell'], unique=False)
+
+    # Geohashes are computed in Python (no spatial functions in SQLite or plain Postgres)
+    pubs = sa.table('pubs', sa.column('id', sa.String), sa.column('lat', sa.Numeric),
+                    sa.column('lng', sa.Numeric), sa.column('geo_cell', sa.String))
+    update = pubs.update().where(pubs.c.id == sa.bindparam('pub_id'))\
+        .values(geo_cell=sa.bindparam('cell'))
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(pubs.c.id, pubs.c.lat, pubs.c.lng)
+            .where(pubs.c.id > last_id, pubs.c.geo_cell.is_(None))
+            .order_by(pubs.c.id).limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'pub_id': pub_id, 'cell': encode_geohash(float(lat), float(lng), GEOHASH_PRECISION)}
+            for pub_id, lat, lng in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_pubs_geo_cell', table_name='pubs')
+    with op.batch_alter_table('pubs') as batch_op:
+        batch_op.drop_column('geo_cell')